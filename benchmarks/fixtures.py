@@ -0,0 +1,53 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Deterministic benchmark fixtures.
+Each fixture is a synthetic assembly graph written by simulate.AssemblySimulator
+with a fixed number of segments, together with its BLAST, kraken and
+taxonomy files. The same scale and seed always give byte-identical files.
+"""
+
+import os
+
+from simulate import AssemblySimulator
+
+# Segment numbers of the named scales
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+def fixture(scale, root, seed=0):
+    """
+    Return the dir of a fixture, generating it on first use.
+    
+    Parameters
+    ----------
+    scale : str
+        Key of SCALES
+    root : str
+        Dir holding the generated fixtures
+    seed : int
+        Random seed
+    """
+    path = os.path.join(root, f"{scale}_seed{seed}")
+    if not os.path.exists(path + "/taxonomy/nodes.dmp"):
+        AssemblySimulator(segments=SCALES[scale], seed=seed).write(path, "graph")
+    return path
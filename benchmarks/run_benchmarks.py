@@ -0,0 +1,231 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Benchmark suite of GMW.
+Times GFA parsing, backbone building, GFA and HTML output, the edge sweep of
+every unfolder, the node mergers and the sequence kernels on deterministic
+fixtures at several scales, and stores the results as JSON so runs can be
+compared over time.
+
+Usage:
+    python benchmarks/run_benchmarks.py run --scale 10k --scale 100k
+    python benchmarks/run_benchmarks.py compare OLD.json NEW.json
+"""
+
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "gmw"))
+
+import fixtures
+import config
+import shared
+import artifacts
+import gfaLib
+import pipeline
+import unfoldGraph
+import visualize
+import mergeNodes.basicFunction as merge_bs
+from mergeNodes.mergeNeighbour import NeighbourMerger
+from mergeNodes.mergeBrother import BrotherMerger
+from mergeNodes.splitParent import ParentSpliter
+from simulate import TARGET_TAXID
+
+class Context:
+    """
+    Fixture files and the parsed graph of one scale, shared by the benchmarks.
+    """
+    def __init__(self, path, work_dir):
+        self.path = path
+        self.gfa = path + "/graph.gfa"
+        self.work_dir = work_dir
+        self.parsed = gfaLib.GraphFromFile(self.gfa, packed_sequences=config.packed_sequences)
+        self.graph = gfaLib.GFANetwork.compute_backbone(self.parsed)
+
+    def backbone(self):
+        """Return a fresh backbone graph for benchmarks changing the graph."""
+        return gfaLib.GFANetwork.compute_backbone(self.parsed)
+
+    def unfolder(self, stage, **options):
+        """Build an unfolder on a fresh graph, stage outputs are not written."""
+        argv = {name: False for name in pipeline.UNFOLD_PARAMETERS}
+        argv.update(graph=self.backbone(), out_path=self.work_dir, prefix="bench", threads=1,
+                    kraken_out=None, names_dmp=None, nodes_dmp=None, taxon_id=TARGET_TAXID, taxon_name=None,
+                    kraken_db=None, blast_out=None, blast_db=None, position_distance=config.position_distance,
+                    depth_discrepancy=config.depth_discrepancy, gc_discrepancy=config.gc_discrepancy,
+                    disable_merge_neighbor=True, keep_unknown_components=True, keep_short_isolated_nodes=True,
+                    contig_shape="line")
+        argv.update(options)
+        return stage(*[argv[name] for name in pipeline.UNFOLD_PARAMETERS])
+
+def _unfold(unfolder):
+    work = unfolder.prepare()
+    unfolder.apply(work() if work is not None else None)
+
+def _sequence_pairs(context, limit=20000):
+    """Segment sequences with a deterministic SNP copy, for the consensus and similarity kernels."""
+    rng = random.Random(0)
+    pairs = []
+    for _, seq in context.graph.nodes(data='seq'):
+        pos = rng.randrange(len(seq))
+        pairs.append((seq, seq[:pos] + ("A" if seq[pos] != "A" else "C") + seq[pos + 1:]))
+        if len(pairs) == limit:
+            break
+    return pairs
+
+# name: (setup(context) -> state, timed(state)); setup runs before every repetition
+def _unchecked_backbone(c):
+    """Backbone whose twin-link check is not skipped."""
+    graph = c.backbone()
+    graph.graph['links_canonical'] = False
+    return graph
+
+def _pruned_backbone(c):
+    """Backbone with every 20th node annotated and pruned once, then cut by removing every 50th edge."""
+    graph = c.backbone()
+    for node in list(graph.nodes)[::20]:
+        graph.nodes[node]['AC'] = "bench"
+    shared.remove_unknown_components(graph)
+    graph.remove_edges_from(list(graph.edges(keys=True))[::500])
+    return graph
+
+BENCHMARKS = {
+    "gfa_parse": (lambda c: c.gfa, lambda gfa: gfaLib.GraphFromFile(gfa, packed_sequences=config.packed_sequences)),
+    "compute_backbone": (lambda c: c.parsed, gfaLib.GFANetwork.compute_backbone),
+    "save_graph": (lambda c: (gfaLib.GraphFromNetwork(c.graph), c.work_dir + "/bench.gfa"),
+                   lambda s: s[0].save_graph(s[1])),
+    "taxon_unfold": (lambda c: c.unfolder(unfoldGraph.TaxonUnfolder, kraken_out=c.path + "/graph_kraken.txt",
+                                          names_dmp=c.path + "/taxonomy/names.dmp",
+                                          nodes_dmp=c.path + "/taxonomy/nodes.dmp",
+                                          disable_ref_unfold=True), _unfold),
+    "ref_unfold": (lambda c: c.unfolder(unfoldGraph.RefUnfolder, blast_out=c.path + "/graph_blast.txt"), _unfold),
+    "depth_unfold": (lambda c: c.unfolder(unfoldGraph.DepthUnfolder), _unfold),
+    "gc_unfold": (lambda c: c.unfolder(unfoldGraph.GCUnfolder), _unfold),
+    "merge_neighbour": (lambda c: NeighbourMerger(c.backbone()), lambda m: m.merge_neibour()),
+    "merge_brother": (lambda c: BrotherMerger(c.backbone()), lambda m: m.merge_brother()),
+    "split_parent": (lambda c: ParentSpliter(c.backbone()), lambda m: m.split_parent()),
+    "remove_redundant_edges": (_unchecked_backbone, merge_bs.remove_redundant_edges),
+    "remove_unknown_components": (_pruned_backbone, shared.remove_unknown_components),
+    "reverse_complement": (lambda c: [seq for _, seq in c.graph.nodes(data='seq')],
+                           lambda seqs: [shared.reverse_complement(seq) for seq in seqs]),
+    "consensus": (_sequence_pairs, lambda pairs: [merge_bs.create_consensus_sequence(a, b) for a, b in pairs]),
+    "similarity": (_sequence_pairs, lambda pairs: [merge_bs.calculate_similarity(a, b, config.similarity_score) for a, b in pairs]),
+    "html_line": (lambda c: (c.graph, c.work_dir + "/bench.html"), lambda s: visualize.print_graph(s[0], s[1], "line")),
+    "html_dot": (lambda c: (c.graph, c.work_dir + "/bench.html"), lambda s: visualize.print_graph(s[0], s[1], "dot")),
+}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+@click.group()
+def cli():
+    """
+    GMW benchmark suite.
+    """
+    pass
+
+@cli.command()
+@click.option("--scale", "-s", "scales", multiple=True, type=click.Choice(list(fixtures.SCALES)), default=["10k"],
+              help="Fixture scale, can be given several times.(default 10k)")
+@click.option("--only", help="Comma separated benchmark names to run.")
+@click.option("--repeat", "-r", default=3, type=int, help="Timed repetitions of every benchmark.")
+@click.option("--seed", default=0, type=int, help="Seed of the generated fixtures.")
+@click.option("--fixture_dir", default=os.path.join(BENCH_DIR, "fixtures"), help="Dir of the generated fixtures.")
+@click.option("--output", "-o", help="Result JSON file.(default benchmarks/results/<time>.json)")
+def run(scales, only, repeat, seed, fixture_dir, output):
+    """
+    Run the benchmarks and write the results as JSON.
+    """
+    names = only.split(",") if only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise click.BadParameter(f"Unknown benchmarks: {', '.join(unknown)}", param_hint="--only")
+    # Stage outputs of the unfolders are not part of the sweeps
+    artifacts.writer = artifacts.ArtifactWriter("final")
+    
+    results = []
+    for scale in scales:
+        click.echo(f"Prepare fixture {scale}")
+        path = fixtures.fixture(scale, fixture_dir, seed)
+        with tempfile.TemporaryDirectory() as work_dir:
+            context = Context(path, work_dir)
+            for name in names:
+                setup, timed = BENCHMARKS[name]
+                seconds = []
+                for _ in range(repeat):
+                    state = setup(context)
+                    start = time.perf_counter()
+                    timed(state)
+                    seconds.append(time.perf_counter() - start)
+                results.append({"name": name, "scale": scale, "segments": len(context.parsed.segments),
+                                "links": context.graph.number_of_edges(), "seconds": seconds,
+                                "min": min(seconds), "median": statistics.median(seconds)})
+                click.echo(f"{scale}\t{name}\t{min(seconds):.4f} s")
+    artifacts.writer.close()
+    artifacts.writer = None
+    
+    if output is None:
+        os.makedirs(os.path.join(BENCH_DIR, "results"), exist_ok=True)
+        output = os.path.join(BENCH_DIR, "results", datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    meta = {"commit": _git_commit(), "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "repeat": repeat, "seed": seed}
+    with open(output, 'w') as f:
+        json.dump({"meta": meta, "results": results}, f, indent=1)
+    click.echo(f"Results written to {output}")
+
+@cli.command()
+@click.argument("old", type=click.Path(exists=True, dir_okay=False))
+@click.argument("new", type=click.Path(exists=True, dir_okay=False))
+def compare(old, new):
+    """
+    Compare the minimum times of two result files.
+    """
+    with open(old) as f:
+        old_results = {(r["scale"], r["name"]): r for r in json.load(f)["results"]}
+    with open(new) as f:
+        new_results = json.load(f)["results"]
+    click.echo("scale\tbenchmark\told_s\tnew_s\tspeedup")
+    for result in new_results:
+        previous = old_results.get((result["scale"], result["name"]))
+        if previous is None:
+            continue
+        speedup = previous["min"] / result["min"] if result["min"] else float("inf")
+        click.echo(f"{result['scale']}\t{result['name']}\t{previous['min']:.4f}\t{result['min']:.4f}\t{speedup:.2f}x")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,190 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Artifact writing of the GMW workflow.
+GFA and HTML files are built from a snapshot of the graph in the calling
+thread and serialized by a background thread while the next stage runs.
+A retention policy decides which per-stage intermediate files are written:
+- final  only the final outputs
+- last   stage outputs of the last iteration, each iteration overwrites them
+- all    stage outputs of every iteration, with an iteration suffix
+"""
+
+import os
+import threading
+import time
+import logging
+
+import config
+import gfaLib
+import monitor
+import visualize
+
+KEEP_POLICIES = ("final", "last", "all")
+logger = logging.getLogger("gmw")
+
+class ArtifactWriter:
+    """
+    Background writer of graph snapshots.
+    
+    Pending writes are coalesced per path: a newer snapshot replaces an older
+    one that has not been written yet. A forked process gets its own thread
+    and drops the writes pending in its parent.
+    
+    Parameters
+    ----------
+    keep : str
+        Retention policy of stage artifacts, one of KEEP_POLICIES
+    """
+    def __init__(self, keep=config.keep_artifacts):
+        if keep not in KEEP_POLICIES:
+            raise ValueError(f"Unknown artifact retention policy \"{keep}\", choose from {', '.join(KEEP_POLICIES)}.")
+        self.keep = keep
+        self.iteration = 1
+        # Seconds of the last write of every file type, e.g. "gfa"
+        self.write_seconds = {}
+        self._pid = None
+        self._closed = False
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._pending = {}
+        self._busy = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="gmw-artifacts", daemon=True)
+        self._thread.start()
+
+    def wants(self, final):
+        """Return True if an artifact of this kind is written under the retention policy."""
+        return final or self.keep != "final"
+
+    def target(self, path, final):
+        """Return the path an artifact is written to under the retention policy."""
+        if final or self.keep != "all":
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}_iter{self.iteration}{ext}"
+
+    def submit(self, path, function, *args):
+        """Queue function(path, *args) on the writer thread."""
+        self._ensure_thread()
+        with self._condition:
+            self._pending.pop(path, None)
+            self._pending[path] = (function, args)
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                path = next(iter(self._pending))
+                function, args = self._pending.pop(path)
+                self._busy = True
+            kind = os.path.splitext(path)[1][1:]
+            start = time.monotonic()
+            try:
+                function(path, *args)
+                self.write_seconds[kind] = time.monotonic() - start
+                monitor.metrics.count("bytes_written", os.path.getsize(path), kind=kind)
+            except Exception as e:
+                logger.error(f"Write \"{path}\" failed: {e}")
+                if self._error is None:
+                    self._error = e
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def flush(self):
+        """Wait until every queued artifact is written, raise the first write error."""
+        if self._pid != os.getpid():
+            return
+        with self._condition:
+            while self._pending or self._busy:
+                self._condition.wait()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        """Write the queued artifacts and stop the writer thread."""
+        self.flush()
+        if self._pid == os.getpid():
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
+        self._pid = None
+        self._closed = False
+
+# Writer used by save_gfa and save_html, None writes synchronously with the "last" policy
+writer = None
+
+def save_gfa(graph, path, final=False):
+    """
+    Write a graph into a GFA file.
+    
+    Parameters
+    ----------
+    graph : networkx.MultiDiGraph
+        Graph to write, copied before the call returns
+    path : str
+        Output GFA file path
+    final : bool
+        Whether the file is a final output rather than a stage artifact
+    """
+    if writer is None:
+        gfaLib.GraphFromNetwork(graph).save_graph(path)
+    elif writer.wants(final):
+        snapshot = gfaLib.GraphFromNetwork(graph)
+        writer.submit(writer.target(path, final), monitor.bind(lambda target: snapshot.save_graph(target), "write_gfa"))
+
+def save_html(graph, path, contig_shape, final=False):
+    """
+    Write a graph visualization into an HTML file, see save_gfa.
+    """
+    if writer is None:
+        visualize.print_graph(graph, path, contig_shape)
+    elif writer.wants(final):
+        data_dict, option_dict = visualize.html_data(graph, contig_shape)
+        writer.submit(writer.target(path, final), monitor.bind(visualize.write_html, "write_html"), data_dict, option_dict)
+
+def set_iteration(iteration):
+    """Set the unfold iteration used to name artifacts under the "all" policy."""
+    if writer is not None:
+        writer.iteration = iteration
+
+def write_seconds():
+    """Return the seconds of the last write of every file type, empty without a writer."""
+    return dict(writer.write_seconds) if writer is not None else {}
+
+def flush():
+    """Wait until every queued artifact is written."""
+    if writer is not None:
+        writer.flush()
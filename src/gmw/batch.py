@@ -0,0 +1,152 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Batch mode of GMW. Unfold many GFA files listed in a manifest with one
+process pool, loading the taxonomy once and sharing kraken2/blastn results
+between samples through a persistent tool cache.
+"""
+
+import click
+import logging
+import os
+import sys
+import time
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+import shared
+import cli as gmw_cli
+from unfoldGraph import taxon
+logger = logging.getLogger("gmw")
+
+def read_manifest(manifest):
+    """
+    Read a batch manifest.
+    
+    Each non-empty line holds tab separated columns: GFA file, sample prefix
+    and an optional output dir. Relative paths are resolved against the
+    manifest dir and lines starting with '#' are ignored.
+    
+    Parameters
+    ----------
+    manifest : str
+        Path of the manifest file
+        
+    Returns
+    -------
+    list
+        List of (gfa, prefix, outdir) tuples, outdir is None when not given
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    samples = []
+    prefixes = set()
+    with open(manifest, 'r') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split('\t')
+            if len(fields) < 2:
+                raise ValueError(f"Manifest line {line_num} needs at least a gfa file and a prefix.")
+            gfa = os.path.join(base_dir, fields[0])
+            prefix = fields[1]
+            outdir = os.path.join(base_dir, fields[2]) if len(fields) > 2 and fields[2] else None
+            if not os.path.isfile(gfa):
+                raise ValueError(f"Gfa file \"{gfa}\" in manifest line {line_num} not exist.")
+            if prefix in prefixes:
+                raise ValueError(f"Duplicated prefix \"{prefix}\" in manifest line {line_num}.")
+            prefixes.add(prefix)
+            samples.append((gfa, prefix, outdir))
+    return samples
+
+def _run_sample(gfa, prefix, outdir, options):
+    """Unfold one sample in a worker process and return its summary row."""
+    start = time.time()
+    try:
+        graph = gmw_cli.run_gmw(gfa=gfa, outdir=outdir, prefix=prefix, **options)
+        return [prefix, gfa, "done", graph.number_of_nodes(), graph.number_of_edges(), f"{time.time() - start:.1f}", ""]
+    except BaseException as e:
+        # run_gmw exits on invalid parameters, report it as a failed sample
+        logger.error(traceback.format_exc())
+        error = f"exit code {e.code}" if isinstance(e, SystemExit) else f"{type(e).__name__}: {e}"
+        return [prefix, gfa, "failed", "", "", f"{time.time() - start:.1f}", error]
+
+@click.command()
+@click.version_option(config.VERSION, "--version", "-v")
+@click.option("--manifest", "-m", required=True, type=click.Path(exists=True, dir_okay=False), 
+              help="Tab separated file of samples: gfa file, prefix and optional output dir.")
+@click.option("--outdir", "-o", default=config.output_path, help="Path of batch output files. Samples without output dir are written to outdir/prefix.")
+@click.option("--jobs", "-j", default=config.batch_jobs, type=int, help="Number of samples unfolded at the same time.")
+@click.option("--disable_tool_cache", is_flag=True, help="Do not share kraken2 and blastn results between samples.")
+@gmw_cli.unfold_options
+def batch(manifest, outdir, jobs, disable_tool_cache, **options):
+    """
+    GMW batch mode: unfold every GFA file of a manifest.
+    """
+    samples = read_manifest(manifest)
+    outdir = os.path.normpath(outdir)
+    os.makedirs(outdir, exist_ok=True)
+    gmw_cli.setup_logging(outdir, "gmw_batch")
+    logger.info(f"Read {len(samples)} samples from manifest \"{manifest}\".")
+    
+    jobs = max(1, min(jobs, len(samples)))
+    options["threads"] = max(1, options["threads"] // jobs)
+    
+    # Loaded before forking so all workers share the parsed taxonomy
+    if options["taxon_db"] is not None and not options["disable_taxon_unfold"] and not options["use_gfa_taxon"]:
+        taxon_db = os.path.normpath(options["taxon_db"])
+        logger.info(f"Load taxonomy database \"{taxon_db}\".")
+        taxon.load_taxon_parser(taxon_db + "/names.dmp", taxon_db + "/nodes.dmp")
+    if not disable_tool_cache:
+        shared.tool_cache = shared.ToolCache(outdir + "/gmw_tool_cache.sqlite")
+        logger.info(f"Share tool results through \"{shared.tool_cache.path}\".")
+    config.kraken_memory_mapping = True
+
+    # Largest graphs first so the long samples do not finish last
+    samples.sort(key=lambda sample: os.path.getsize(sample[0]), reverse=True)
+    rows = []
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+        futures = {}
+        for gfa, prefix, sample_outdir in samples:
+            sample_outdir = sample_outdir or outdir + "/" + prefix
+            futures[executor.submit(_run_sample, gfa, prefix, sample_outdir, options)] = prefix
+        for future in as_completed(futures):
+            row = future.result()
+            logger.info(f"Sample \"{row[0]}\" {row[2]} in {row[5]} s.")
+            rows.append(row)
+    
+    rows.sort(key=lambda row: row[0])
+    summary_path = outdir + "/gmw_batch_summary.tsv"
+    with open(summary_path, 'w') as f:
+        f.write("sample\tgfa\tstatus\tnodes\tedges\tseconds\terror\n")
+        for row in rows:
+            f.write("\t".join(str(column) for column in row) + "\n")
+    failed = sum(1 for row in rows if row[2] != "done")
+    logger.info(f"Batch finished, {len(rows) - failed} samples done, {failed} failed. Summary: {summary_path}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    batch(prog_name="python src/gmw/batch.py -m manifest.tsv")
@@ -35,59 +35,95 @@ import click
 import logging
 import os
 import sys
+import time
 import gfaLib
 import unfoldGraph
 import mergeNodes
 import config
 import shared
-import visualize
+import pipeline
+import artifacts
+import monitor
+import standin
 logger = logging.getLogger("gmw")
+# Handlers added by setup_logging
+_log_handlers = []
 
-@click.command()
-@click.version_option(config.VERSION, "--version", "-v")
-@click.option("--gfa", "-g", required=True, type=click.Path(exists=True, dir_okay=False), help="Input gfa file.")
-@click.option("--outdir", "-o", default=config.output_path, help="Path of output files.")
-@click.option("--prefix", "-p", default=config.prefix, help="Prefix of output dir and files.")
-@click.option("--threads", "-t", default=config.max_threads, help="Number of threads.")
-@click.option("--force", "-f", is_flag=True, help="Force overwrite existed files")
+UNFOLD_OPTIONS = [
+    click.option("--threads", "-t", default=config.max_threads, help="Number of threads."),
+    click.option("--force", "-f", is_flag=True, help="Force overwrite existed files"),
+
+    click.option("--disable_taxon_unfold", is_flag=True, help="Do not unfold graph using contigs taxonomy."),
+    click.option("--use_gfa_taxon", is_flag=True, help="Parse contig type from the gfa file."),
+    click.option("--kraken_out", help="Use kraken output file rather than run kraken in this pipeline."),
+    click.option("--taxon_db", help="Dir of taxonomy databse. the dir must contain files \"names.dmp\" and \"nodes.dmp\"."),
+    click.option("--taxon_id", help="The taxonomy id of species you want."),
+    click.option("--taxon_name", help="The scientific name of species you want."),
+    click.option("--kraken_db", help="The dir of kraken database."),
+    click.option("--bgll", is_flag=True, help="Use bgll algorithm infer taxon."),
+
+    click.option("--disable_ref_unfold", is_flag=True, help="Do not unfold graph through reference search."),
+    click.option("--use_gfa_ref", is_flag=True, help="Parse contig position from the gfa file."),
+    click.option("--blast_out", help="Use blast output file rather than run blastn in this pipeline."),
+    click.option("--blast_db", help="The path to blastn databse."),
+    click.option("--position_distance", default=config.position_distance, type=int, 
+                  help="Remove the connection if two connected contigs if distance futher than offset."),
+
+    click.option("--disable_depth_unfold", is_flag=True, help="Do not unfold graph using contigs sequencing depth."),
+    click.option("--depth_discrepancy", default=config.depth_discrepancy, type=int, 
+                  help="Remove the connection if two connected contigs depth multiple higher than offset."),
 
-@click.option("--disable_taxon_unfold", is_flag=True, help="Do not unfold graph using contigs taxonomy.")
-@click.option("--use_gfa_taxon", is_flag=True, help="Parse contig type from the gfa file.")
-@click.option("--kraken_out", help="Use kraken output file rather than run kraken in this pipeline.")
-@click.option("--taxon_db", help="Dir of taxonomy databse. the dir must contain files \"names.dmp\" and \"nodes.dmp\".")
-@click.option("--taxon_id", help="The taxonomy id of species you want.")
-@click.option("--taxon_name", help="The scientific name of species you want.")
-@click.option("--kraken_db", help="The dir of kraken database.")
-@click.option("--bgll", is_flag=True, help="Use bgll algorithm infer taxon.")
+    click.option("--disable_gc_unfold", is_flag=True, help="Do not unfold graph using through GC content and base percentage."),
+    click.option("--gc_discrepancy", default=config.gc_discrepancy, type=float, 
+                  help="Remove the connection if two connected contigs gc content discrepancy higher than offset."),
 
-@click.option("--disable_ref_unfold", is_flag=True, help="Do not unfold graph through reference search.")
-@click.option("--use_gfa_ref", is_flag=True, help="Parse contig position from the gfa file.")
-@click.option("--blast_out", help="Use blast output file rather than run blastn in this pipeline.")
-@click.option("--blast_db", help="The path to blastn databse.")
-@click.option("--position_distance", default=config.position_distance, type=int, 
-              help="Remove the connection if two connected contigs if distance futher than offset.")
+    click.option("--remove_unknown_nodes", is_flag=True, help="Remove unknown components after unfold graph."),
+    click.option("--keep_unknown_components", is_flag=True, help="Don't remove unknown components after unfold graph."),
+    click.option("--keep_short_isolated_nodes", is_flag=True, help="Don't remove short isolated nodes after unfold graph."),
 
-@click.option("--disable_depth_unfold", is_flag=True, help="Do not unfold graph using contigs sequencing depth.")
-@click.option("--depth_discrepancy", default=config.depth_discrepancy, type=int, 
-              help="Remove the connection if two connected contigs depth multiple higher than offset.")
+    click.option("--disable_merge_neighbour", is_flag=True, help="Don't merge single pair neibour nodes of the graph."),
+    click.option("--merge_brother", is_flag=True, help="Merge brother nodes into consensus contigs."),
+    click.option("--split_parent", is_flag=True, help="Split one node into two."),
 
-@click.option("--disable_gc_unfold", is_flag=True, help="Do not unfold graph using through GC content and base percentage.")
-@click.option("--gc_discrepancy", default=config.gc_discrepancy, type=float, 
-              help="Remove the connection if two connected contigs gc content discrepancy higher than offset.")
+    click.option("--fast", is_flag=True, help="Fast mode. without irretaion."),
+    click.option("--parallel_components", is_flag=True, help="Unfold weakly connected components in parallel processes. kraken2 and blastn run once before the batches, merged sequences of later iterations once per batch."),
+    click.option("--max_iterations", type=click.IntRange(min=1), help="Run at most this many unfold iterations."),
+    click.option("--max_runtime", type=click.FloatRange(min=0), help="Seconds the run should take. No unfold iteration starts when the time its stages took last time, the Polisher and the output files would exceed it, the outputs are written from the current graph."),
+    click.option("--standin_tools", is_flag=True, help="Run the offline stand-ins of kraken2 and blastn (src/gmw/standin) instead of the real tools."),
+    click.option("--pipeline_file", type=click.Path(exists=True, dir_okay=False), help="JSON file defining the order of unfold stages."),
+    click.option("--cache_dir", type=click.Path(file_okay=False), help="Checkpoint the graph after every unfold stage into this dir and resume from the checkpoints of a previous run with the same input and parameters."),
 
-@click.option("--remove_unknown_nodes", is_flag=True, help="Remove unknown components after unfold graph.")
-@click.option("--keep_unknown_components", is_flag=True, help="Don't remove unknown components after unfold graph.")
-@click.option("--keep_short_isolated_nodes", is_flag=True, help="Don't remove short isolated nodes after unfold graph.")
+    click.option("--keep_artifacts", default=config.keep_artifacts, type=click.Choice(artifacts.KEEP_POLICIES),
+                 help="Stage outputs to keep: 'final' only the final outputs, 'last' the last iteration, 'all' every iteration.(default last)"),
+    click.option("--profile", is_flag=True, help="Write the time and graph size changes of every stage to {prefix}_profile.tsv/json."),
+    click.option("--cprofile", is_flag=True, help="With --profile, also dump a cProfile of every unfold stage."),
+    click.option("--metrics", is_flag=True, help="Write live run metrics to {prefix}_metrics.prom (Prometheus text format) and {prefix}_metrics.jsonl (JSON lines events)."),
+    click.option("--profile_memory", is_flag=True, help="With --profile, also measure the memory of every stage and write {prefix}_memory.tsv. Slows the run down."),
+    click.option("--visual", is_flag=True, help="Visualize debruijn graph."),
+    click.option("--contig_shape", default="line", help="Contig shape in debruijn graph, you can choose 'line' or 'dot'.(default line)"),
+]
 
-@click.option("--disable_merge_neighbour", is_flag=True, help="Don't merge single pair neibour nodes of the graph.")
-@click.option("--merge_brother", is_flag=True, help="Merge brother nodes into consensus contigs.")
-@click.option("--split_parent", is_flag=True, help="Split one node into two.")
+def unfold_options(func):
+    """
+    Decorate a click command with the unfold options shared by the GMW commands.
+    """
+    for option in reversed(UNFOLD_OPTIONS):
+        func = option(func)
+    return func
 
-@click.option("--fast", is_flag=True, help="Fast mode. without irretaion.")
+@click.command()
+@click.version_option(config.VERSION, "--version", "-v")
+@click.option("--gfa", "-g", required=True, type=click.Path(exists=True, dir_okay=False), help="Input gfa file.")
+@click.option("--outdir", "-o", default=config.output_path, help="Path of output files.")
+@click.option("--prefix", "-p", default=config.prefix, help="Prefix of output dir and files.")
+@unfold_options
+def cli(**options):
+    """
+    GMW: A comprehensive tool for genome assembly graph manipulation and metagenome analysis.
+    """
+    run_gmw(**options)
 
-@click.option("--visual", is_flag=True, help="Visualize debruijn graph.")
-@click.option("--contig_shape", default="line", help="Contig shape in debruijn graph, you can choose 'line' or 'dot'.(default line)")
-def cli(
+def run_gmw(
     gfa, outdir, prefix, threads, force,
     disable_taxon_unfold, use_gfa_taxon, kraken_out, taxon_db, taxon_id, taxon_name, kraken_db, bgll,
     disable_ref_unfold, use_gfa_ref, blast_out, blast_db, position_distance,
@@ -95,11 +131,21 @@ def cli(
     disable_gc_unfold, gc_discrepancy,
     remove_unknown_nodes, keep_unknown_components, keep_short_isolated_nodes,
     disable_merge_neighbour, merge_brother, split_parent,
-    fast,
-    visual, contig_shape
+    fast, parallel_components, max_iterations, max_runtime, standin_tools, pipeline_file, cache_dir,
+    keep_artifacts, profile, cprofile, metrics, profile_memory, visual, contig_shape,
+    gfa_graph=None
 ):
     """
-    GMW: A comprehensive tool for genome assembly graph manipulation and metagenome analysis.
+    Run the GMW workflow on one GFA file.
+    
+    Parameters are the options of the command line interface, see `cli`,
+    and `gfa_graph`, the gfaLib.GraphFromFile of `gfa` when it is already
+    parsed, e.g. by the sweep command. It is not changed.
+    
+    Returns
+    -------
+    networkx.MultiDiGraph
+        The unfolded graph written to the output files.
     """
     
     # Validate and create output directory
@@ -169,6 +215,9 @@ def cli(
                 if kraken_db is None:
                     logger.error(f"You must specify kraken!")
                     exit(1)
+                elif standin_tools and not os.path.exists(standin.kraken_index(kraken_db)):
+                    logger.error(f"Dir \"{kraken_db}\" is not a stand-in kraken2 database, build it with standin/makeDb.py.")
+                    exit(1)
                 elif os.path.exists(kraken_db) and os.path.isdir(kraken_db):
                     logger.info(f"Kraken2 database dir: \"{kraken_db}\".")
                 else:
@@ -218,74 +267,97 @@ def cli(
         logger.info("Defined 'blast_out' or 'kraken_out' prameters, start use fast mode.")
         fast = True
         
+    """Check pipeline parameters"""
+    if pipeline_file is not None:
+        try:
+            stages, _ = pipeline.load_pipeline(pipeline_file)
+        except ValueError as e:
+            logger.error(str(e))
+            exit(1)
+        logger.info(f"Use pipeline file \"{pipeline_file}\": {' -> '.join(stage.__name__ for stage in stages)}.")
+        
     """Check visualize parameters"""
     if visual and contig_shape not in ['dot', 'line']:
         logger.error(f"The contig_shape must be 'dot' or 'line'!")
         exit(1)   
     unfold_argv.extend([visual, contig_shape])
     
-    """Add gfa paramerter"""
-    gfa_graph = gfaLib.GraphFromFile(gfa)
-    graph = gfaLib.GFANetwork.compute_backbone(gfa_graph)
-    unfold_argv.insert(0, graph)
+    if standin_tools:
+        logger.info("Use the stand-in kraken2 and blastn.")
+        standin.enable()
+    if profile:
+        monitor.start(cprofile, profile_memory)
+    if metrics:
+        monitor.metrics.start(outdir, prefix)
+        monitor.metrics.event("run_start", gfa=gfa)
+    artifacts.writer = artifacts.ArtifactWriter(keep_artifacts)
+    run_start = time.perf_counter()
+    deadline = time.monotonic() + max_runtime if max_runtime is not None else None
+    status = "failed"
+    try:
+        """Add gfa paramerter"""
+        parsed = gfa_graph is None
+        if parsed:
+            with monitor.stage("parse"):
+                gfa_graph = gfaLib.GraphFromFile(gfa, packed_sequences=config.packed_sequences)
+        segments = len(gfa_graph.segments)
+        if gfa_graph.metadata['merged_links']:
+            logger.info(f"Merged {gfa_graph.metadata['merged_links']} twin or duplicate links of the gfa file.")
+            monitor.metrics.count("edges_removed", gfa_graph.metadata['merged_links'], predicate="twin_link")
+        if parsed:
+            parse_seconds = time.perf_counter() - run_start
+            monitor.metrics.count("bytes_read", os.path.getsize(gfa), kind="gfa")
+            monitor.metrics.gauge("parse_segments_per_second", segments / max(parse_seconds, 1e-9))
+        with monitor.stage("backbone"):
+            graph = gfaLib.GFANetwork.compute_backbone(gfa_graph)
+        unfold_argv.insert(0, graph)
+        monitor.register_source("gfa_file", gfa_graph)
+        monitor.checkpoint("backbone", graph)
 
-    before_fig_path = outdir + "/" + prefix + "_before_unfold.html"
-    after_fig_path = outdir + "/" + prefix + "_after_unfold.html"
-    fasta_path = outdir + "/" + prefix + "_after_unfold.fasta"
-    
-    if visual:
-        visualize.print_graph(graph, before_fig_path, contig_shape)
+        before_fig_path = outdir + "/" + prefix + "_before_unfold.html"
+        after_fig_path = outdir + "/" + prefix + "_after_unfold.html"
+        fasta_path = outdir + "/" + prefix + "_after_unfold.fasta"
+        
+        if visual:
+            with monitor.stage("output_html"):
+                artifacts.save_html(graph, before_fig_path, contig_shape, final=True)
 
-    logging_graph_info(graph)
+        shared.logging_graph_info(graph, "backbone")
 
-    nodes_num = 0
-    edges_num = 0
-    fast_flag = True
-    run_times = 1
+        stage_cache = None
+        if cache_dir is not None:
+            with monitor.stage("cache_key"):
+                stage_cache = pipeline.StageCache(cache_dir, pipeline.file_digest(gfa))
+            logger.info(f"Checkpoint unfold stages into \"{cache_dir}\".")
 
-    while (nodes_num != graph.number_of_nodes() or edges_num != graph.number_of_edges()) and fast_flag:
-        nodes_num = graph.number_of_nodes()
-        edges_num = graph.number_of_edges()
-        logger.info(f"Start unfold {run_times} times.")
-        if not disable_taxon_unfold:    
-            taxonUnfoler = unfoldGraph.TaxonUnfolder(*unfold_argv)
-            taxonUnfoler.unfold_graph()
-            logging_graph_info(graph)
-        
-        if not disable_ref_unfold:
-            refUnfoler = unfoldGraph.RefUnfolder(*unfold_argv)
-            refUnfoler.unfold_graph()
-            logging_graph_info(graph)
-            
-        if not disable_depth_unfold:
-            depthUnfoler = unfoldGraph.DepthUnfolder(*unfold_argv)
-            depthUnfoler.unfold_graph()
-            logging_graph_info(graph)
-            
-        if not disable_gc_unfold:       
-            gcUnfoler = unfoldGraph.GCUnfolder(*unfold_argv)
-            gcUnfoler.unfold_graph()
-            logging_graph_info(graph)
-            
-        if merge_brother or split_parent:
-            emptyUnfolder = unfoldGraph.EmptyUnfolder(*unfold_argv)
-            emptyUnfolder.unfold_graph()
-            logging_graph_info(graph)
-        if fast:
-            fast_flag = False
-    polisher = unfoldGraph.Polisher(*unfold_argv)
-    polisher.polish()
-    logging_graph_info(graph)
-     
-    if visual:
-        visualize.print_graph(graph, after_fig_path, contig_shape)       
-    shared.graph2fasta(graph, fasta_path, orientation=False)
+        with monitor.stage("unfold", graph):
+            if parallel_components:
+                graph = pipeline.ComponentExecutor(gfa_graph, unfold_argv, fast, threads, pipeline_file, stage_cache,
+                                                   max_iterations, deadline).run()
+            else:
+                graph = pipeline.UnfoldPipeline(unfold_argv, fast, pipeline_file, stage_cache, max_iterations, deadline).run()
+         
+        with monitor.stage("output"):
+            if visual:
+                artifacts.save_html(graph, after_fig_path, contig_shape, final=True)
+            shared.graph2fasta(graph, fasta_path, orientation=False)
+            artifacts.writer.close()
+        if profile:
+            monitor.active().write(outdir, prefix)
+        status = "finished"
+    finally:
+        run_seconds = time.perf_counter() - run_start
+        monitor.metrics.gauge("run_seconds", run_seconds)
+        if status == "finished":
+            monitor.metrics.gauge("run_segments_per_second", segments / max(run_seconds, 1e-9))
+        monitor.metrics.event("run_end", status=status)
+        monitor.metrics.stop()
+        artifacts.writer = None
+        monitor.stop()
+        if standin_tools:
+            standin.disable()
+    return graph
     
-def logging_graph_info(graph):
-       nodes_num = graph.number_of_nodes()
-       edges_num = graph.number_of_edges()
-       logger.info(f"The graph have {nodes_num} nodes and {edges_num} edges.")
-       
 def setup_logging(output_path, prefix):
     """
     Configure logging system for the GMW application.
@@ -300,9 +372,18 @@ def setup_logging(output_path, prefix):
         Directory path where the log file will be created
     prefix : str
         Prefix for the log filename
+        
+    Notes
+    -----
+    Handlers installed by a previous call are closed and replaced, so one
+    process can run several samples one after another.
     """
     # Set main logger level
     logger.setLevel(logging.INFO)
+    for handler in _log_handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    _log_handlers.clear()
 
     # Create console and file handlers
     console_handler = logging.StreamHandler()
@@ -321,6 +402,7 @@ def setup_logging(output_path, prefix):
     # Add handlers to logger
     logger.addHandler(console_handler)  
     logger.addHandler(file_handler)  
+    _log_handlers.extend([console_handler, file_handler])
 
     # Log initial information
     logger.info(f"GMW version: {config.VERSION} ")
@@ -43,9 +43,48 @@ output_path = "./gmw_output"
 """threads config"""
 max_threads = os.cpu_count()
 #max_threads = 12
+# Threads running tools, feature computation and file writing of independent unfold stages
+stage_workers = 4
+# Run the read-only work of independent stages concurrently unless the pipeline file says otherwise
+stage_concurrency = True
+# Samples unfolded at the same time in batch mode
+batch_jobs = max(1, max_threads // 4)
+
+"""preview config"""
+# Share of the components of every size stratum unfolded by the preview command
+preview_fraction = 0.05
+preview_seed = 0
+# Fixed seconds of one call of a tool stage, e.g. {"tool_kraken2": 30.0}, used instead of a measured call
+preview_call_seconds = {}
+
+"""serve config"""
+# The server only binds loopback addresses
+serve_host = "127.0.0.1"
+serve_port = 8765
+# File holding the access token of the HTTP server, readable by its owner only
+serve_token_file = os.path.expanduser("~/.gmw_serve_token")
+# Seconds between two status requests of the submit client
+serve_poll_interval = 2
 
 #overlap_size = 77
 
+"""artifact config"""
+# Stage outputs kept: "final", "last" iteration or "all" iterations
+keep_artifacts = "last"
+
+"""memory profile config"""
+# Seconds between two RSS samples and traceback depth of traced allocations
+memory_sample_interval = 0.1
+memory_trace_frames = 1
+
+"""metrics export config"""
+# Minimum seconds between two rewrites of {prefix}_metrics.prom
+metrics_flush_interval = 1.0
+
+"""sequence storage config"""
+# Keep node sequences as gfaLib.PackedSequence (2 bits per base, 4 bits with IUPAC codes)
+packed_sequences = True
+
 """unfold position config"""
 position_distance = 150
 gc_discrepancy = 0.2
@@ -66,6 +105,8 @@ color_dict = {"unknown": "grey", "target": "pink", "contaminate": "skyblue"}
 """configs for kraken2"""
 confidence=0.8
 kraken_path = "kraken2"
+# Pass --memory-mapping to kraken2 so consecutive runs share the database pages
+kraken_memory_mapping = False
 
 """blastn_config"""
 blast_path = "blastn"
@@ -73,16 +114,35 @@ query_cover_offset=85
 match_length=70
 identity_discrepency=1.0
 
+"""configs for the stand-in kraken2/blastn (standin/)"""
+# Seconds the stand-ins wait at start up to mimic database loading,
+# kraken2 waits a tenth of it with --memory-mapping
+standin_kraken_latency = 1.0
+standin_blast_latency = 0.3
+standin_kraken_k = 31
+standin_blast_word = 28
+
 """config for merge brother contigs"""
 # length_discrepancy=0
 # blastout_discrepancy=1
 similarity_score = 90
+# Check that merged overlaps reach similarity_score, a mismatching overlap raises ValueError
+verify_overlap = False
 
 
 """config for split parent"""
 split_similarity_score = 80
 split_depth_multi = 5 
 
+"""config for neighbour merging"""
+# Merged sequences are built by --threads worker processes once the merged
+# nodes hold this many bases, smaller merges are built in the main process
+merge_pool_min_bases = 20000000
+
 """BGLL parameters"""
 resolution = 2.0
-partition_offset  = 10
\ No newline at end of file
+partition_offset  = 10
+# "native" runs the CSR based Louvain in unfoldGraph/louvain.py, "community" the python-louvain package
+bgll_engine = "native"
+bgll_seed = 0
+leiden_refinement = False
\ No newline at end of file
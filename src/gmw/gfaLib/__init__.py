@@ -26,6 +26,9 @@ working with GFA files, which represent genome assembly graphs.
 """
 from .abstractions import GFALine, GFAFormat, Orientation
 from .gfaparser import GFAParser
+from .abstractGraph import AbstractGraph
 from .graphFromFile import GraphFromFile
 from .graphFromNetwork import GraphFromNetwork
 from .nx import GFANetwork
+from .sequence import PackedSequence
+from .indexedGraph import IndexedMultiDiGraph, attribute_index, component_tracker
@@ -0,0 +1,243 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Weakly connected components of a graph maintained under its changes.
+Added edges join two components at once. Removed edges and nodes mark the
+nodes left at their ends as touched. When the components are next asked for,
+each touched node is checked against a touched node of its component by two
+interleaved searches, which stop as soon as they meet or one side is
+exhausted, so a split costs about the size of its smaller side.
+Each component counts its annotated nodes (TP 'target' or an AC other than
+'-'), so the components without any are found without visiting their nodes.
+"""
+
+from itertools import chain
+
+import networkx as nx
+
+# Annotation bits of a node
+_TARGET = 1
+_ACCESSION = 2
+_EXHAUSTED = object()
+# Past this share of touched nodes the components are computed again
+_RECOMPUTE_SHARE = 32
+
+def _annotation_bit(key, value):
+    if key == "TP":
+        return _TARGET if value == "target" else 0
+    if key == "AC":
+        return _ACCESSION if value != '-' else 0
+    return 0
+
+class ComponentTracker:
+    """
+    Weakly connected components of an IndexedMultiDiGraph.
+    
+    The tracker is inactive until the components are first asked for, so
+    building the graph costs nothing. It is then kept up to date by the
+    graph, which reports its node, edge and TP/AC attribute changes.
+    
+    Attributes
+    ----------
+    component : dict or None
+        Node -> component id, None while inactive
+    members : dict
+        Component id -> set of nodes
+    annotated : dict
+        Component id -> number of annotated nodes
+    touched : set
+        Nodes that lost an edge or a neighbour since the last query
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.reset()
+
+    def reset(self):
+        """Go back to inactive, the components are computed again when asked for."""
+        self.component = None
+        self.members = {}
+        self.annotated = {}
+        self.touched = set()
+        self._flags = {}
+        self._next_id = 0
+
+    def _new_component(self, nodes):
+        cid = self._next_id
+        self._next_id += 1
+        self.members[cid] = nodes
+        self.annotated[cid] = sum(1 for node in nodes if node in self._flags)
+        for node in nodes:
+            self.component[node] = cid
+        return cid
+
+    def _activate(self):
+        """Compute the components and annotations of the whole graph."""
+        self.reset()
+        self.component = {}
+        index = self.graph.attribute_index
+        for key in ("TP", "AC"):
+            for value, nodes in index.values[key].items():
+                bit = _annotation_bit(key, value)
+                if bit:
+                    for node in nodes:
+                        self._flags[node] = self._flags.get(node, 0) | bit
+        for nodes in nx.weakly_connected_components(self.graph):
+            self._new_component(nodes)
+
+    def node_added(self, node):
+        if self.component is not None:
+            self._new_component({node})
+
+    def node_removed(self, node):
+        """Called before the node and its edges leave the graph."""
+        if self.component is None:
+            return
+        cid = self.component.pop(node)
+        members = self.members[cid]
+        members.discard(node)
+        if self._flags.pop(node, 0):
+            self.annotated[cid] -= 1
+        self.touched.discard(node)
+        if not members:
+            del self.members[cid]
+            del self.annotated[cid]
+            return
+        self.touched.update(self.graph._succ[node])
+        self.touched.update(self.graph._pred[node])
+        self.touched.discard(node)
+
+    def edge_added(self, u, v):
+        if self.component is None:
+            return
+        first, second = self.component[u], self.component[v]
+        if first == second:
+            return
+        # Relabel the smaller component
+        if len(self.members[first]) < len(self.members[second]):
+            first, second = second, first
+        moved = self.members.pop(second)
+        for node in moved:
+            self.component[node] = first
+        self.members[first] |= moved
+        self.annotated[first] += self.annotated.pop(second)
+
+    def edge_removed(self, u, v):
+        if self.component is not None and u != v:
+            self.touched.add(u)
+            self.touched.add(v)
+
+    def edges_cleared(self):
+        self.reset()
+
+    def attribute_changed(self, key, value, node, present):
+        """Record that attribute `key` of `node` was set to or removed from `value`."""
+        if self.component is None:
+            return
+        bit = _annotation_bit(key, value)
+        if not bit:
+            return
+        old = self._flags.get(node, 0)
+        new = old | bit if present else old & ~bit
+        if new == old:
+            return
+        if new:
+            self._flags[node] = new
+        else:
+            del self._flags[node]
+        if bool(new) != bool(old):
+            self.annotated[self.component[node]] += 1 if new else -1
+
+    def _search(self, start, seen):
+        """Yield the nodes reached from `start` that are not in `seen` yet, adding them to it."""
+        succ, pred = self.graph._succ, self.graph._pred
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for other in chain(succ[node], pred[node]):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+                    yield other
+
+    def _separated_side(self, u, v):
+        """Return the nodes connected to one of `u` and `v` but not the other, None if still connected."""
+        seen_u, seen_v = {u}, {v}
+        search_u, search_v = self._search(u, seen_u), self._search(v, seen_v)
+        while True:
+            node = next(search_u, _EXHAUSTED)
+            if node is _EXHAUSTED:
+                return seen_u
+            if node in seen_v:
+                return None
+            node = next(search_v, _EXHAUSTED)
+            if node is _EXHAUSTED:
+                return seen_v
+            if node in seen_u:
+                return None
+
+    def _refresh(self):
+        if self.component is None or len(self.touched) * _RECOMPUTE_SHARE > len(self.component):
+            self._activate()
+            return
+        # A component split in pieces has a touched node in each of them
+        representative = {}
+        for node in self.touched:
+            cid = self.component[node]
+            other = representative.get(cid)
+            if other is None:
+                representative[cid] = node
+                continue
+            side = self._separated_side(other, node)
+            if side is not None:
+                self.members[cid] -= side
+                new = self._new_component(side)
+                self.annotated[cid] -= self.annotated[new]
+                if other in side:
+                    representative[new], representative[cid] = other, node
+                else:
+                    representative[new] = node
+        self.touched = set()
+
+    def components(self):
+        """
+        Return the current weakly connected components.
+        
+        Returns
+        -------
+        list
+            Sets of nodes, one per component, safe to use while removing nodes
+        """
+        self._refresh()
+        return [set(nodes) for nodes in self.members.values()]
+
+    def unknown_components(self):
+        """
+        Return the components without any target or annotated node.
+        
+        Returns
+        -------
+        list
+            Sets of nodes, one per unknown component, safe to use while removing nodes
+        """
+        self._refresh()
+        return [set(self.members[cid]) for cid, count in self.annotated.items() if not count]
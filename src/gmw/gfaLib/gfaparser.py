@@ -24,6 +24,7 @@ from typing import Callable
 from json import loads, dumps
 from os import path, stat
 from gfaLib.abstractions import Orientation, GFALine, GFAFormat
+from gfaLib.sequence import PackedSequence
 from gzip import open as gz_open
 from re import search
 
@@ -215,7 +216,7 @@ class GFAParser:
         return mapping
 
     @staticmethod
-    def read_gfa_line(datas: list[str], load_sequence_in_memory: bool = True, regexp_pattern: str = ".*", memory_mode: bool = False) -> tuple[str, GFALine, dict]:
+    def read_gfa_line(datas: list[str], load_sequence_in_memory: bool = True, regexp_pattern: str = ".*", memory_mode: bool = False, packed_sequence: bool = False) -> tuple[str, GFALine, dict]:
         """Calls methods to parse a GFA line, accordingly to it's fields described in the GFAspec github.
         Parses a single line and return the information it contains
 
@@ -229,6 +230,8 @@ class GFAParser:
             a pattern to keep for path names, by default ".*"
         memory_mode : bool, optional
             if additional information should be loaded in the struct, by default True
+        packed_sequence : bool, optional
+            if the loaded sequence should be stored as a PackedSequence, by default False
 
         Returns
         -------
@@ -243,7 +246,7 @@ class GFAParser:
         if line_type == GFALine.SEGMENT:
             line_datas["length"] = len(datas[2].strip())
             if load_sequence_in_memory:
-                line_datas["seq"] = datas[2].strip()
+                line_datas["seq"] = PackedSequence(datas[2].strip()) if packed_sequence else datas[2].strip()
             if not memory_mode:
                 supp_data = GFAParser.supplementary_datas(datas, 3)
                 if "ST" not in supp_data:
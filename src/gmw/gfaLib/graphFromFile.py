@@ -25,6 +25,17 @@ from gfaLib.abstractions import GFALine, Orientation, reverse
 from gfaLib.gfaparser import GFAParser
 from gfaLib.abstractGraph import AbstractGraph
 
+def canonical_link(source, ori_source, sink, ori_sink):
+    """
+    Return the canonical key of a link.
+    
+    A link and its reverse-complement twin (sink, reverse(ori_sink), source,
+    reverse(ori_source)) describe the same overlap and share one key.
+    """
+    link = (source, ori_source, sink, ori_sink)
+    twin = (sink, reverse(ori_sink), source, reverse(ori_source))
+    return min((link, twin), key=lambda key: (key[0], key[1].value, key[2], key[3].value))
+
 class GraphFromFile(AbstractGraph):
     """
     A class for creating a GFA graph from a GFA file.
@@ -40,6 +51,7 @@ class GraphFromFile(AbstractGraph):
         with_sequence: bool = True,
         low_memory: bool = False,
         regexp: str = ".*",
+        packed_sequences: bool = False,
     ) -> None:
         """
         Initialize a GraphFromFile object by parsing a GFA file.
@@ -49,14 +61,21 @@ class GraphFromFile(AbstractGraph):
             with_sequence: Whether to load sequence data into memory
             low_memory: If True, uses memory-efficient mode with reduced functionality
             regexp: Regular expression pattern to filter lines during parsing
+            packed_sequences: Store sequences as PackedSequence (2 or 4 bits per base)
         """
         super().__init__()
         # Declaring format attributes, generators...
         self.metadata: dict = {
             'version': GFAParser.get_gfa_format(gfa_file_path=gfa_file) if gfa_file and not low_memory else 'unknown',
             'next_node_name': (x for x in count(start=1) if str(x) not in self.segments) if not low_memory else 'unknown',
-            'with_sequence': with_sequence
+            'with_sequence': with_sequence,
+            # Twin and duplicate L-lines are merged while parsing
+            'links_canonical': True,
+            'merged_links': 0,
         }
+        # Canonical keys of the stored links and number of links per node pair
+        link_keys = set()
+        pair_links = {}
 
         with open(gfa_file, 'r', encoding='utf-8') as gfa_reader:
             for gfa_line in gfa_reader:
@@ -66,20 +85,22 @@ class GraphFromFile(AbstractGraph):
                     load_sequence_in_memory=with_sequence and not low_memory,
                     regexp_pattern=regexp,
                     memory_mode=low_memory,
+                    packed_sequence=packed_sequences,
                 )
                 if line_type == GFALine.SEGMENT:
                     self.segments[name] = datas
                 elif line_type in (GFALine.WALK, GFALine.PATH):
                     self.paths[name] = datas
                 elif line_type == GFALine.LINK:
-                    while name in self.lines:
-                        name = (name[0], name[1], name[2] + 1)
-                    self.lines[name] = datas
-                    # if name not in self.lines:
-                    #     self.lines[name] = datas
-                    # else:
-                    #     [_ors,] = datas["orientation"]
-                    #     self.lines[name]["orientation"].add((_ors[0], _ors[1]))
+                    [(ori_source, ori_sink)] = datas["orientation"]
+                    link_key = canonical_link(name[0], ori_source, name[1], ori_sink)
+                    if link_key in link_keys:
+                        self.metadata['merged_links'] += 1
+                        continue
+                    link_keys.add(link_key)
+                    pair = (name[0], name[1])
+                    pair_links[pair] = pair_links.get(pair, 0) + 1
+                    self.lines[(name[0], name[1], pair_links[pair])] = datas
 
                 elif line_type == GFALine.HEADER:
                     self.headers.append(datas)
@@ -0,0 +1,268 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+MultiDiGraph keeping secondary indexes of node attributes.
+The node classes written by the unfolders (TP, the taxonomic type, and AC, the
+reference accession) are indexed by value, so the nodes of one class are found
+without scanning the graph. The index follows every change of the attribute
+dicts, whichever code makes it.
+The graph also reports its changes to a ComponentTracker keeping its weakly
+connected components.
+"""
+
+from networkx import MultiDiGraph
+from gfaLib.componentTracker import ComponentTracker
+
+# Node attributes indexed by value
+INDEXED_ATTRIBUTES = ("TP", "AC")
+_MISSING = object()
+
+class _NodeAttributes(dict):
+    """Attribute dict of one node reporting changes of indexed attributes."""
+    __slots__ = ("_node", "_index")
+
+    def __init__(self, *args, **kwargs):
+        self._node = None
+        self._index = None
+        super().__init__(*args, **kwargs)
+
+    def __reduce__(self):
+        # Pickled and copied as a plain dict, without the index
+        return (dict, (dict(self),))
+
+    def _bind(self, node, index):
+        self._node, self._index = node, index
+        for key in INDEXED_ATTRIBUTES:
+            if key in self:
+                index.add(key, dict.__getitem__(self, key), node)
+
+    def _unbind(self):
+        if self._index is not None:
+            for key in INDEXED_ATTRIBUTES:
+                if key in self:
+                    self._index.discard(key, dict.__getitem__(self, key), self._node)
+        self._node, self._index = None, None
+
+    def __setitem__(self, key, value):
+        if self._index is not None and key in INDEXED_ATTRIBUTES:
+            if key in self:
+                self._index.discard(key, dict.__getitem__(self, key), self._node)
+            self._index.add(key, value, self._node)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if self._index is not None and key in INDEXED_ATTRIBUTES and key in self:
+            self._index.discard(key, dict.__getitem__(self, key), self._node)
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        if self._index is None:
+            return dict.update(self, *args, **kwargs)
+        if not self:
+            # First attributes of a new node
+            dict.update(self, *args, **kwargs)
+            for key in INDEXED_ATTRIBUTES:
+                if key in self:
+                    self._index.add(key, dict.__getitem__(self, key), self._node)
+            return
+        before = [dict.get(self, key, _MISSING) for key in INDEXED_ATTRIBUTES]
+        dict.update(self, *args, **kwargs)
+        for key, old in zip(INDEXED_ATTRIBUTES, before):
+            new = dict.get(self, key, _MISSING)
+            if new is not old:
+                if old is not _MISSING:
+                    self._index.discard(key, old, self._node)
+                self._index.add(key, new, self._node)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        if key in self:
+            value = dict.__getitem__(self, key)
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def clear(self):
+        for key in INDEXED_ATTRIBUTES:
+            self.pop(key, None)
+        dict.clear(self)
+
+class _IndexedNodes(dict):
+    """Node dict of the graph binding every attribute dict to the index."""
+    __slots__ = ("index", "tracker")
+
+    def __init__(self, index, tracker):
+        super().__init__()
+        self.index = index
+        self.tracker = tracker
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def __setitem__(self, node, attributes):
+        if node in self:
+            dict.__getitem__(self, node)._unbind()
+        else:
+            self.tracker.node_added(node)
+        if not isinstance(attributes, _NodeAttributes):
+            attributes = _NodeAttributes(attributes)
+        attributes._bind(node, self.index)
+        dict.__setitem__(self, node, attributes)
+
+    def __delitem__(self, node):
+        dict.__getitem__(self, node)._unbind()
+        self.tracker.node_removed(node)
+        dict.__delitem__(self, node)
+
+    def pop(self, node, *default):
+        if node in self:
+            dict.__getitem__(self, node)._unbind()
+            self.tracker.node_removed(node)
+        return dict.pop(self, node, *default)
+
+    def clear(self):
+        for attributes in self.values():
+            attributes._unbind()
+        self.tracker.reset()
+        dict.clear(self)
+
+class AttributeIndex:
+    """
+    Nodes of every value of the indexed attributes.
+    
+    Attributes
+    ----------
+    values : dict
+        Attribute name -> {value: set of nodes}
+    tracker : ComponentTracker or None
+        Told about every indexed value set or removed
+    """
+    def __init__(self, tracker=None):
+        self.values = {key: {} for key in INDEXED_ATTRIBUTES}
+        self.tracker = tracker
+
+    def add(self, key, value, node):
+        self.values[key].setdefault(value, set()).add(node)
+        if self.tracker is not None:
+            self.tracker.attribute_changed(key, value, node, True)
+
+    def discard(self, key, value, node):
+        nodes = self.values[key].get(value)
+        if nodes is not None:
+            nodes.discard(node)
+            if not nodes:
+                del self.values[key][value]
+        if self.tracker is not None:
+            self.tracker.attribute_changed(key, value, node, False)
+
+    def nodes(self, key, value):
+        """Return a list of the nodes whose attribute `key` equals `value`."""
+        return list(self.values[key].get(value, ()))
+
+    def count(self, key, value):
+        """Return the number of nodes whose attribute `key` equals `value`."""
+        return len(self.values[key].get(value, ()))
+
+    def nodes_except(self, key, value):
+        """Return a list of the nodes having attribute `key` with another value."""
+        return [node for other, nodes in self.values[key].items() if other != value for node in nodes]
+
+class IndexedMultiDiGraph(MultiDiGraph):
+    """
+    MultiDiGraph whose nodes are indexed by their TP and AC attributes.
+    
+    Use `attribute_index(graph)` to get the index and `component_tracker(graph)`
+    to get the weakly connected components, both return None for other graphs
+    and for views on this one.
+    """
+    node_attr_dict_factory = _NodeAttributes
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        self.component_tracker = ComponentTracker(self)
+        self.attribute_index = AttributeIndex(self.component_tracker)
+        super().__init__(incoming_graph_data, **attr)
+
+    def node_dict_factory(self):
+        return _IndexedNodes(self.attribute_index, self.component_tracker)
+
+    def add_edge(self, u_for_edge, v_for_edge, key=None, **attr):
+        key = super().add_edge(u_for_edge, v_for_edge, key, **attr)
+        self.component_tracker.edge_added(u_for_edge, v_for_edge)
+        return key
+
+    def remove_edge(self, u, v, key=None):
+        super().remove_edge(u, v, key)
+        self.component_tracker.edge_removed(u, v)
+
+    def clear_edges(self):
+        super().clear_edges()
+        self.component_tracker.edges_cleared()
+
+    def __reduce__(self):
+        return (IndexedMultiDiGraph, (MultiDiGraph(self),))
+
+def attribute_index(graph):
+    """
+    Return the attribute index of a graph.
+    
+    Parameters
+    ----------
+    graph : networkx.MultiDiGraph
+        Any graph
+    
+    Returns
+    -------
+    AttributeIndex or None
+        The index kept by an IndexedMultiDiGraph, None for other graphs and views
+    """
+    nodes = getattr(graph, "_node", None)
+    if isinstance(nodes, _IndexedNodes) and nodes.index is getattr(graph, "attribute_index", None):
+        return nodes.index
+    return None
+
+def component_tracker(graph):
+    """
+    Return the component tracker of a graph.
+    
+    Parameters
+    ----------
+    graph : networkx.MultiDiGraph
+        Any graph
+    
+    Returns
+    -------
+    ComponentTracker or None
+        The tracker kept by an IndexedMultiDiGraph, None for other graphs and views
+    """
+    nodes = getattr(graph, "_node", None)
+    if isinstance(nodes, _IndexedNodes) and nodes.tracker is getattr(graph, "component_tracker", None):
+        return nodes.tracker
+    return None
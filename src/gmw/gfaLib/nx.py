@@ -29,6 +29,7 @@ using the NetworkX library's algorithms and utilities.
 
 from networkx import MultiDiGraph
 from gfaLib.graphFromFile import GraphFromFile
+from gfaLib.indexedGraph import IndexedMultiDiGraph
 
 class GFANetwork:
     """
@@ -39,13 +40,29 @@ class GFANetwork:
     """
     @staticmethod
     def compute_backbone(
-        graph: GraphFromFile
+        graph: GraphFromFile,
+        nodes: set | None = None
     ) -> MultiDiGraph:
-        backbone: MultiDiGraph = MultiDiGraph()
+        """
+        Build the MultiDiGraph of a parsed GFA graph.
+        The graph is an IndexedMultiDiGraph, its nodes are indexed by TP and AC.
+
+        Parameters:
+            graph: Parsed GFA graph
+            nodes: If given, only build the subgraph induced by these segments.
+                Segments and links keep their file order.
+        """
+        backbone: MultiDiGraph = IndexedMultiDiGraph()
+        # Tells remove_redundant_edges that no link has a twin edge
+        backbone.graph['links_canonical'] = getattr(graph, 'metadata', {}).get('links_canonical', False)
 
         for node_name, node_datas in graph.segments.items():
+            if nodes is not None and node_name not in nodes:
+                continue
             backbone.add_nodes_from([( node_name, node_datas)])
         for (start, end, key), edge_data in graph.lines.items():
+            if nodes is not None and start not in nodes:
+                continue
             backbone.add_edge(
                 start,
                 end,
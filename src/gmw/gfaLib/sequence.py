@@ -0,0 +1,206 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Packed storage of nucleotide sequences.
+Sequences made of A, C, G and T only are stored with 2 bits per base, other
+IUPAC upper case sequences with 4 bits per base (one bit per nucleotide) and
+anything else is kept as plain text. Slices and reverse complements are views
+sharing the packed buffer, a string is only built when the bases are read.
+"""
+
+from re import compile as re_compile
+from sys import getsizeof
+
+_ACGT = re_compile(r"[ACGT]*")
+_IUPAC = re_compile(r"[ACGTMRWSYKVHDBN]*")
+_COMPLEMENTABLE = re_compile(r"[ACGTMKRYWSBVHDNacgtmkrywsbvhdn]*")
+
+# 2-bit code: each base is a base 4 digit, each byte holds four bases
+_TO_QUATERNARY = str.maketrans("ACGT", "0123")
+_BYTE_TO_BASES = ["".join("ACGT"[(byte >> shift) & 3] for shift in (6, 4, 2, 0)) for byte in range(256)]
+_BYTE_TO_GC = bytes(bases.count("G") + bases.count("C") for bases in _BYTE_TO_BASES)
+
+# 4-bit code: one bit per nucleotide, A=1 C=2 G=4 T=8, the padding digit is 0
+_IUPAC_MASKS = {"A": 1, "C": 2, "G": 4, "T": 8, "M": 3, "R": 5, "W": 9, "S": 6,
+                "Y": 10, "K": 12, "V": 7, "H": 11, "D": 13, "B": 14, "N": 15}
+_TO_HEX = str.maketrans({base: f"{mask:x}" for base, mask in _IUPAC_MASKS.items()})
+_HEX_TO_BASE = str.maketrans({f"{mask:x}": base for base, mask in _IUPAC_MASKS.items()} | {"0": "-"})
+
+_COMPLEMENT = str.maketrans("ACGTMKRYWSBVHDNacgtmkrywsbvhdn", "TGCAKMYRWSVBDHNtgcakmyrwsvbdhn")
+
+
+class PackedSequence:
+    """
+    Immutable nucleotide sequence stored with 2 or 4 bits per base.
+    
+    It behaves like the string it was built from: len(), indexing, slicing,
+    iteration, comparison with strings, hashing, count() and + are supported,
+    str() gives the bases back. Slices with step 1 and reverse_complement()
+    are views on the same buffer, so they cost O(1) until read.
+    
+    Parameters
+    ----------
+    seq : str or PackedSequence, optional
+        Bases to store
+    """
+    __slots__ = ("_data", "_bits", "_offset", "_length", "_reverse")
+
+    def __init__(self, seq=""):
+        if isinstance(seq, PackedSequence):
+            self._data, self._bits, self._offset = seq._data, seq._bits, seq._offset
+            self._length, self._reverse = seq._length, seq._reverse
+            return
+        length = len(seq)
+        if _ACGT.fullmatch(seq):
+            # The first byte is padded on the left up to a multiple of 4 bases
+            self._bits, self._offset = 2, -length % 4
+            self._data = int(seq.translate(_TO_QUATERNARY), 4).to_bytes((length + 3) // 4, "big") if length else b""
+        elif _IUPAC.fullmatch(seq):
+            self._bits, self._offset = 4, length % 2
+            self._data = bytes.fromhex("0" * self._offset + seq.translate(_TO_HEX))
+        else:
+            self._bits, self._offset = 0, 0
+            self._data = str(seq)
+        self._length = length
+        self._reverse = False
+
+    def _view(self, offset, length, reverse):
+        view = object.__new__(PackedSequence)
+        view._data, view._bits = self._data, self._bits
+        view._offset, view._length, view._reverse = offset, length, reverse
+        return view
+
+    def _forward(self):
+        """Bases of the viewed range in the orientation of the buffer."""
+        offset, length = self._offset, self._length
+        if self._bits == 2:
+            first = offset // 4
+            text = "".join(map(_BYTE_TO_BASES.__getitem__, self._data[first:(offset + length + 3) // 4]))
+            offset -= first * 4
+        elif self._bits == 4:
+            first = offset // 2
+            text = self._data[first:(offset + length + 1) // 2].hex().translate(_HEX_TO_BASE)
+            offset -= first * 2
+        else:
+            text = self._data
+        return text[offset:offset + length]
+
+    @property
+    def bits(self):
+        """Bits used per base, 0 for sequences kept as text."""
+        return self._bits
+
+    def reverse_complement(self):
+        """
+        Reverse complement of the sequence, as a view on the same buffer.
+        
+        Raises
+        ------
+        ValueError
+            If a sequence kept as text has characters without complement
+        """
+        if not self._bits and not _COMPLEMENTABLE.fullmatch(self._data, self._offset, self._offset + self._length):
+            raise ValueError("Invalid DNA sequence")
+        return self._view(self._offset, self._length, not self._reverse)
+
+    def gc_count(self):
+        """Number of G and C bases, ignoring case."""
+        if self._bits == 2:
+            # Count whole bytes, then drop the bases of the first and last byte outside the view
+            first, last = self._offset // 4, (self._offset + self._length + 3) // 4
+            if first == last:
+                return 0
+            head = _BYTE_TO_BASES[self._data[first]][:self._offset - first * 4]
+            tail = _BYTE_TO_BASES[self._data[last - 1]][4 - (last * 4 - self._offset - self._length):]
+            outside = head + tail
+            return sum(self._data[first:last].translate(_BYTE_TO_GC)) - outside.count("G") - outside.count("C")
+        text = self._forward()
+        if not self._bits:
+            text = text.upper()
+        return text.count("G") + text.count("C")
+
+    def count(self, sub, *args):
+        return str(self).count(sub, *args)
+
+    def __str__(self):
+        text = self._forward()
+        if self._reverse:
+            return text.translate(_COMPLEMENT)[::-1]
+        return text
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def __repr__(self):
+        text = str(self)
+        if len(text) > 20:
+            text = text[:17] + "..."
+        return f"PackedSequence({text!r}, length={self._length}, bits={self._bits})"
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __contains__(self, sub):
+        return str(sub) in str(self)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return PackedSequence(str(self)[key])
+            length = max(0, stop - start)
+            if self._reverse:
+                return self._view(self._offset + self._length - start - length, length, True)
+            return self._view(self._offset + start, length, False)
+        index = key + self._length if key < 0 else key
+        if not 0 <= index < self._length:
+            raise IndexError("PackedSequence index out of range")
+        return str(self[index:index + 1])
+
+    def __add__(self, other):
+        if isinstance(other, (str, PackedSequence)):
+            return PackedSequence(str(self) + str(other))
+        return NotImplemented
+
+    def __radd__(self, other):
+        if isinstance(other, str):
+            return PackedSequence(other + str(self))
+        return NotImplemented
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            if self._length != other._length:
+                return False
+            return str(self) == str(other)
+        if isinstance(other, str):
+            return self._length == len(other) and str(self) == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + getsizeof(self._data)
@@ -28,6 +28,7 @@ and edge management used by the node merging algorithms.
 
 import re  
 import config
+import monitor
 
 # Dictionary mapping IUPAC nucleotide codes to their corresponding base sets
 IUPAC_CODES = {
@@ -50,21 +51,125 @@ IUPAC_CODES = {
 # Reverse mapping from base sets to IUPAC codes for efficient lookup
 REVERSE_IUPAC_CODES = {frozenset(v): k for k, v in IUPAC_CODES.items()}
 
-def calculate_similarity(seq1, seq2):
+# 4-bit mask of every IUPAC code (A=1, C=2, G=4, T=8), the mask of the union
+# of two codes is the OR of their masks. Other bytes are translated to 0.
+IUPAC_MASKS = {code: sum(1 << "ACGT".index(base) for base in bases) for code, bases in IUPAC_CODES.items()}
+_TO_MASK = bytes(IUPAC_MASKS.get(chr(byte), 0) for byte in range(256))
+_FROM_MASK = bytes.maketrans(bytes(IUPAC_MASKS.values()), "".join(IUPAC_MASKS).encode())
+
+# Bases compared at once by hamming_distance before checking the mismatch budget,
+# chunks start small and double up to the largest size
+HAMMING_FIRST_CHUNK = 64
+HAMMING_CHUNK = 4096
+
+def hamming_distance(seq1, seq2, max_distance=None):
+    """
+    Count the mismatching positions of two sequences.
+    
+    The sequences are compared chunk by chunk. Identical chunks are skipped, and
+    the mismatches of the others are counted on the XOR of their bytes. With a
+    max_distance the chunks start at HAMMING_FIRST_CHUNK bases and double, so
+    short sequences stop early too. Positions past the end of the shorter
+    sequence are not compared.
+    
+    Parameters:
+        seq1 (str or PackedSequence): First nucleotide sequence
+        seq2 (str or PackedSequence): Second nucleotide sequence
+        max_distance (int, optional): Stop counting once the distance exceeds it
+        
+    Returns:
+        int: Number of mismatches, or a count above max_distance if it was exceeded
+    """
+    seq1, seq2 = str(seq1), str(seq2)
+    length = min(len(seq1), len(seq2))
+    if not (seq1.isascii() and seq2.isascii()):
+        return sum(el1 != el2 for el1, el2 in zip(seq1, seq2))
+    seq1, seq2 = seq1[:length].encode(), seq2[:length].encode()
+    if seq1 == seq2:
+        return 0
+    distance = 0
+    start = 0
+    size = HAMMING_CHUNK if max_distance is None else HAMMING_FIRST_CHUNK
+    while start < length:
+        chunk1 = seq1[start:start + size]
+        chunk2 = seq2[start:start + size]
+        start += size
+        size = min(2 * size, HAMMING_CHUNK)
+        if chunk1 == chunk2:
+            continue
+        diff = (int.from_bytes(chunk1, "big") ^ int.from_bytes(chunk2, "big")).to_bytes(len(chunk1), "big")
+        distance += len(diff) - diff.count(0)
+        if max_distance is not None and distance > max_distance:
+            break
+    return distance
+
+def _distance_budget(length, min_score):
+    """Largest mismatch count keeping a similarity score >= min_score."""
+    budget = int(length * (1 - min_score / 100))
+    # Settle float rounding with the same expression as calculate_similarity
+    while budget < length and (1 - (budget + 1) / length) * 100 >= min_score:
+        budget += 1
+    while budget >= 0 and (1 - budget / length) * 100 < min_score:
+        budget -= 1
+    return budget
+
+def calculate_similarity(seq1, seq2, min_score=None):
     """
     Calculate the similarity percentage between two sequences of equal length.
     
     Parameters:
-        seq1 (str): First nucleotide sequence
-        seq2 (str): Second nucleotide sequence of the same length as seq1
+        seq1 (str or PackedSequence): First nucleotide sequence
+        seq2 (str or PackedSequence): Second nucleotide sequence of the same length as seq1
+        min_score (float, optional): Threshold of the caller. Comparison stops as soon as
+            it cannot be reached, the returned score is then below min_score but not exact
         
     Returns:
         float: Similarity score as a percentage (0-100)
     """
-    distance = sum(el1 != el2 for el1, el2 in zip(seq1, seq2))
+    max_distance = _distance_budget(len(seq1), min_score) if min_score is not None and len(seq1) else None
+    distance = hamming_distance(seq1, seq2, max_distance)
     similarity_score = (1 - distance / len(seq1)) * 100
     return similarity_score
 
+def similar_candidates(seqs, min_score):
+    """
+    Find the pairs of equal length sequences that may reach a similarity score.
+    
+    With a budget of d mismatches, two sequences cut into the same d + 1 blocks
+    share at least one identical block when they are similar enough, so only
+    sequences sharing a block are paired (pigeonhole principle). No similar
+    pair is missed, pairs found may still fail calculate_similarity.
+    
+    Parameters:
+        seqs (list): Sequences of one length, None for a sequence to pair with all others
+        min_score (float): Similarity score the pairs have to reach
+        
+    Returns:
+        set: (i, j) index pairs into seqs with i < j
+    """
+    known = [index for index, seq in enumerate(seqs) if seq is not None]
+    pairs = {(i, j) for i in range(len(seqs)) for j in range(i + 1, len(seqs))
+             if seqs[i] is None or seqs[j] is None}
+    if not known:
+        return pairs
+    length = len(seqs[known[0]])
+    budget = _distance_budget(length, min_score) if length else 0
+    if budget < 0:
+        return pairs
+    if budget >= length:
+        return pairs | {(i, j) for i in known for j in known if i < j}
+    bounds = [block * length // (budget + 1) for block in range(budget + 2)]
+    buckets = {}
+    for index in known:
+        seq = str(seqs[index])
+        for block in range(budget + 1):
+            buckets.setdefault((block, seq[bounds[block]:bounds[block + 1]]), []).append(index)
+    for indexes in buckets.values():
+        for n, i in enumerate(indexes):
+            for j in indexes[n + 1:]:
+                pairs.add((i, j))
+    return pairs
+
 def get_degenerated_base(base1, base2):
     """
     Return the degenerate IUPAC nucleotide code that represents both input bases.
@@ -88,6 +193,7 @@ def create_consensus_sequence(seq1, seq2):
     
     For each position, if the bases are identical, that base is used.
     If they differ, the appropriate IUPAC ambiguity code is used.
+    Upper case IUPAC sequences are merged at once through their 4-bit masks.
     
     Parameters:
         seq1 (str): First nucleotide sequence
@@ -101,6 +207,16 @@ def create_consensus_sequence(seq1, seq2):
     """
     if len(seq1) != len(seq2):
         raise ValueError("Sequences must be of the same length")
+    seq1, seq2 = str(seq1), str(seq2)
+    if seq1 == seq2:
+        return seq1
+    masks1 = seq1.encode().translate(_TO_MASK)
+    masks2 = seq2.encode().translate(_TO_MASK)
+    if 0 not in masks1 and 0 not in masks2:
+        # OR the masks of both overlaps as two big integers, one byte per base
+        masks = int.from_bytes(masks1, "big") | int.from_bytes(masks2, "big")
+        return masks.to_bytes(len(seq1), "big").translate(_FROM_MASK).decode()
+    # Lower case or unknown characters keep the base by base rules
     consensus = []
     for base1, base2 in zip(seq1, seq2):
         if base1 == base2:
@@ -110,25 +226,36 @@ def create_consensus_sequence(seq1, seq2):
     return ''.join(consensus)
 
 
+# Label of the reverse-complement twin of an edge u->v, the twin runs v->u
+TWIN_LABELS = {"+/+": "-/-", "-/-": "+/+", "+/-": "+/-", "-/+": "-/+"}
+
 def remove_redundant_edges(graph):  
     """
     Remove redundant edges from the graph that represent the same connection in opposite directions.
     
     This function identifies pairs of edges between the same nodes that represent the same
     biological connection but in opposite directions, and removes one of them to simplify the graph.
+    Graphs built from a GFA file start without twins (graph.graph['links_canonical']), so the pass
+    is skipped until an operation adding edges clears the flag.
     
     Parameters:
         graph: NetworkX graph object representing the genome assembly graph
     """
-    direction_dict = {"+/+": "-/-", "-/-": "+/+", "+/-": "+/-", "-/+": "-/+"}  
-    edges_to_remove = set()  
-    for u, v, key, data in graph.edges(keys=True, data=True):  
-        if (u, v, key) not in edges_to_remove and graph.has_edge(v, u):  
-            for _, _, rev_key, rev_data in graph.edges((v, u), keys=True, data=True):   
-                if direction_dict[data['label']] == rev_data['label']:  
-                    edges_to_remove.add((v, u, rev_key))  
-                    break
+    if graph.graph.get('links_canonical'):
+        return
+    kept = set()
+    edges_to_remove = []
+    for u, v, key, label in graph.edges(keys=True, data='label'):
+        # Only node pairs linked both ways can hold twins
+        if not graph.has_edge(v, u):
+            continue
+        if (v, u, TWIN_LABELS[label]) in kept:
+            edges_to_remove.append((u, v, key))
+        else:
+            kept.add((u, v, label))
     graph.remove_edges_from(edges_to_remove) 
+    graph.graph['links_canonical'] = True
+    monitor.metrics.count("edges_removed", len(edges_to_remove), predicate="redundant")
 
 def cigar_merge(seq1, seq2, cigar):
     """
@@ -138,16 +265,18 @@ def cigar_merge(seq1, seq2, cigar):
     sequence in the overlapping region as specified by the CIGAR string.
     
     Parameters:
-        seq1 (str): First sequence (prefix sequence)
-        seq2 (str): Second sequence (suffix sequence)
+        seq1 (str or PackedSequence): First sequence (prefix sequence)
+        seq2 (str or PackedSequence): Second sequence (suffix sequence)
         cigar (str): CIGAR string describing the overlap (e.g., "10M" for 10 matching bases)
         
     Returns:
         str: Merged sequence with consensus in the overlapping region
         
     Raises:
-        ValueError: If the CIGAR string is invalid or contains unsupported operations
+        ValueError: If the CIGAR string is invalid or contains unsupported operations,
+            or with config.verify_overlap if the overlaps are not similar enough
     """
+    seq1, seq2 = str(seq1), str(seq2)
     consensus = []
     operations = re.findall(r'(\d+)([MIDNSHP])', cigar)
     if len(operations) > 1:
@@ -159,21 +288,43 @@ def cigar_merge(seq1, seq2, cigar):
             consensus.append(seq1[:-count])
             overlap1 = seq1[-count:]
             overlap2 = seq2[:count] 
+            if config.verify_overlap and calculate_similarity(overlap1, overlap2, config.similarity_score) < config.similarity_score:
+                raise ValueError("The sequences to merge are not match")
             con_seq = create_consensus_sequence(overlap1, overlap2)
             consensus.append(con_seq)
             consensus.append(seq2[count:])  # 追加 seq2 剩余部分
-            # if overlap == seq2[:count]:
-            #     consensus.append(seq2[count:])  # 追加 seq2 剩余部分
-            #     # print("connected")
-            #     break
-            # if calculate_similarity(overlap1, overlap2) < config.similarity_score:
-            #     print(f"{seq1}\n{seq2}")
-            #     raise ValueError("The sequences to merge are not match")
-            
         else:
             raise ValueError("Wrong CIGAR sequence.")
     return ''.join(consensus)
 
+def cigar_merge_length(length1, length2, cigar):
+    """
+    Length of the sequence cigar_merge builds, without building it.
+    
+    Parameters:
+        length1 (int): Length of the first sequence (prefix sequence)
+        length2 (int): Length of the second sequence (suffix sequence)
+        cigar (str): CIGAR string describing the overlap
+        
+    Returns:
+        int: Length of the merged sequence
+        
+    Raises:
+        ValueError: If the CIGAR string is invalid or contains unsupported operations
+    """
+    length = 0
+    operations = re.findall(r'(\d+)([MIDNSHP])', cigar)
+    if len(operations) > 1:
+        raise ValueError("Wrong CIGAR sequence.")
+    for count, op in operations:
+        count = int(count)
+        if op == 'M':
+            # Same slices as cigar_merge, the consensus keeps the overlap length
+            length = len(range(length1)[:-count]) + len(range(length1)[-count:]) + len(range(length2)[count:])
+        else:
+            raise ValueError("Wrong CIGAR sequence.")
+    return length
+
 def cigar_judge_connect(seq1, seq2, cigar):
     """
     Create a degenerate clipped sequence for seq2 based on its overlap with seq1.
@@ -183,16 +334,18 @@ def cigar_judge_connect(seq1, seq2, cigar):
     followed by the non-overlapping part of seq2.
     
     Parameters:
-        seq1 (str): First sequence (used to determine the overlap)
-        seq2 (str): Second sequence (to be clipped and returned with consensus)
+        seq1 (str or PackedSequence): First sequence (used to determine the overlap)
+        seq2 (str or PackedSequence): Second sequence (to be clipped and returned with consensus)
         cigar (str): CIGAR string describing the overlap (e.g., "10M" for 10 matching bases)
         
     Returns:
         str: Consensus sequence of the overlap + remaining part of seq2
         
     Raises:
-        ValueError: If the CIGAR string is invalid or contains unsupported operations
+        ValueError: If the CIGAR string is invalid or contains unsupported operations,
+            or with config.verify_overlap if the overlaps are not similar enough
     """
+    seq1, seq2 = str(seq1), str(seq2)
     operations = re.findall(r'(\d+)([MIDNSHP])', cigar)
     if len(operations) > 1:
         raise ValueError("Wrong CIGAR sequence.")
@@ -201,11 +354,8 @@ def cigar_judge_connect(seq1, seq2, cigar):
         if op == 'M':
             seq1_overlap = seq1[-count:]
             seq2_overlap = seq2[:count]
-            # if calculate_similarity(seq1_overlap, seq2_overlap) < config.similarity_score:
-            #     print(count,seq1_overlap, seq2_overlap)
-            #     print(seq1, seq2)
-            #     print(calculate_similarity(seq1_overlap, seq2_overlap))
-            #     raise ValueError("Error in cigar_judge_connect")
+            if config.verify_overlap and calculate_similarity(seq1_overlap, seq2_overlap, config.similarity_score) < config.similarity_score:
+                raise ValueError("Error in cigar_judge_connect")
             consensus = create_consensus_sequence(seq1_overlap, seq2_overlap)
             return consensus + seq2[count:]
 
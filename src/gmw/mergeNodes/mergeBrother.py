@@ -30,6 +30,7 @@ while preserving the biological information.
 import mergeNodes.basicFunction as bs
 import shared
 import config
+import monitor
 
 class BrotherMerger:
     """
@@ -53,49 +54,91 @@ class BrotherMerger:
         The method processes both outgoing and incoming edges, looking for potential
         brother nodes in both directions.
         """
-        nodes_to_remove = []
+        nodes_to_remove = set()
         for node in self.graph.nodes:
             out_node_edges = self._classify_edges(node)
             # Process outgoing edges from the current node
             if len(out_node_edges['plus_out']) + len(out_node_edges['minus_in']) > 1:
-                merge_edges = [*out_node_edges['plus_out'], *out_node_edges['minus_in']]
-                for i in range(len(merge_edges)):
-                    node_tuple1 = self._judge_node_property(node, merge_edges[i])
-                    if node_tuple1[0] in nodes_to_remove:
-                        continue 
-                    for j in range(i+1, len(merge_edges)):
-                        node_tuple2 = self._judge_node_property(node, merge_edges[j])
-                        if node_tuple2[0] in nodes_to_remove:
-                            continue 
-                        if node_tuple1[2] != node_tuple2[2]:
-                            raise ValueError("Nodes direction error!")
-                        is_brother = self._judge_brother(node_tuple1, node_tuple2)
-                        if is_brother:
-                            self._move_edges(node, node_tuple1, node_tuple2)
-                            self._merge_node_property(node_tuple1, node_tuple2)
-                            self._degenerated_neighbour(node_tuple1[0])
-                            nodes_to_remove.append(node_tuple2[0])
+                self._merge_brothers_of(node, [*out_node_edges['plus_out'], *out_node_edges['minus_in']], nodes_to_remove)
             # Process incoming edges to the current node
             if len(out_node_edges['plus_in']) + len(out_node_edges['minus_out']) > 1:
-                merge_edges = [*out_node_edges['plus_in'], *out_node_edges['minus_out']]
-                for i in range(len(merge_edges)):
-                    node_tuple1 = self._judge_node_property(node, merge_edges[i])
-                    if node_tuple1[0] in nodes_to_remove:
-                        continue 
-                    for j in range(i+1, len(merge_edges)):
-                        node_tuple2 = self._judge_node_property(node, merge_edges[j])
-                        if node_tuple2[0] in nodes_to_remove:
-                            continue 
-                        if node_tuple1[2] != node_tuple2[2]:
-                            raise ValueError("Nodes direction error!")
-                        is_brother = self._judge_brother(node_tuple1, node_tuple2)
-                        if is_brother:
-                            self._move_edges(node, node_tuple1, node_tuple2)
-                            self._merge_node_property(node_tuple1, node_tuple2)
-                            self._degenerated_neighbour(node_tuple1[0])
-                            nodes_to_remove.append(node_tuple2[0])
-        self.graph.remove_nodes_from(nodes_to_remove)                    
+                self._merge_brothers_of(node, [*out_node_edges['plus_in'], *out_node_edges['minus_out']], nodes_to_remove)
+        self.graph.remove_nodes_from(nodes_to_remove)
+        monitor.metrics.count("nodes_merged", len(nodes_to_remove), kind="brother")                    
                     
+    def _merge_brothers_of(self, node, merge_edges, nodes_to_remove):
+        """
+        Merge the brothers among the neighbours on one side of a node.
+        
+        Pairs are visited in edge order, but only candidate pairs from
+        _brother_candidates and pairs with a sequence changed by an earlier merge
+        are compared.
+        
+        Parameters:
+            node: The common neighbour node
+            merge_edges: Edges linking node to the neighbours on one of its sides
+            nodes_to_remove: Set of merged nodes, updated in place
+        """
+        node_tuples = [self._judge_node_property(node, edge) for edge in merge_edges]
+        candidates = self._brother_candidates(node_tuples)
+        changed = set()
+        for i, node_tuple1 in enumerate(node_tuples):
+            if node_tuple1[0] in nodes_to_remove:
+                continue 
+            for j in range(i+1, len(node_tuples)):
+                node_tuple2 = node_tuples[j]
+                if node_tuple2[0] in nodes_to_remove:
+                    continue 
+                if node_tuple1[2] != node_tuple2[2]:
+                    raise ValueError("Nodes direction error!")
+                if (i, j) not in candidates and node_tuple1[0] not in changed and node_tuple2[0] not in changed:
+                    continue
+                is_brother = self._judge_brother(node_tuple1, node_tuple2)
+                if is_brother:
+                    self._move_edges(node, node_tuple1, node_tuple2)
+                    self._merge_node_property(node_tuple1, node_tuple2)
+                    self._degenerated_neighbour(node_tuple1[0])
+                    nodes_to_remove.add(node_tuple2[0])
+                    # The consensus and the clipped neighbours invalidate their candidates
+                    changed.add(node_tuple1[0])
+                    changed.update(self.graph.predecessors(node_tuple1[0]))
+                    changed.update(self.graph.successors(node_tuple1[0]))
+
+    def _brother_candidates(self, node_tuples):
+        """
+        Find the neighbour pairs that may be brothers.
+        
+        Neighbours are bucketed by length, and buckets of more than two are
+        split further by bs.similar_candidates on their sequences, oriented as
+        _judge_brother compares them.
+        
+        Parameters:
+            node_tuples: Tuples (node_id, from_direction, to_direction) of the neighbours
+            
+        Returns:
+            set: (i, j) index pairs into node_tuples with i < j
+        """
+        lengths = {}
+        for index, node_tuple in enumerate(node_tuples):
+            lengths.setdefault(self.graph.nodes[node_tuple[0]]['length'], []).append(index)
+        candidates = set()
+        for length, indexes in lengths.items():
+            if len(indexes) < 3:
+                candidates.update((i, j) for n, i in enumerate(indexes) for j in indexes[n + 1:])
+                continue
+            seqs = []
+            for index in indexes:
+                node_id, from_direction, _ = node_tuples[index]
+                seq = self.graph.nodes[node_id]['seq']
+                try:
+                    seq = seq if from_direction == '+' else shared.reverse_complement(seq)
+                except ValueError:
+                    seq = None
+                seqs.append(seq if seq is not None and len(seq) == length else None)
+            for i, j in bs.similar_candidates(seqs, config.similarity_score):
+                candidates.add((indexes[i], indexes[j]))
+        return candidates
+
     def _judge_brother(self, node_tuple1, node_tuple2):
         """
         Determine if two nodes are brothers based on sequence similarity.
@@ -114,7 +157,7 @@ class BrotherMerger:
         node2 = self.graph.nodes[node_tuple2[0]]
         if node1['length'] == node2['length']:
             seq2 = node2['seq'] if node_tuple1[1]==node_tuple2[1] else shared.reverse_complement(node2['seq'])
-            similarity_score = bs.calculate_similarity(node1['seq'], seq2)
+            similarity_score = bs.calculate_similarity(node1['seq'], seq2, config.similarity_score)
             if similarity_score >= config.similarity_score:
                 return True
         return False
@@ -132,6 +175,8 @@ class BrotherMerger:
             node_tuple1: Tuple (node_id, from_direction, to_direction) for the node to keep
             node_tuple2: Tuple (node_id, from_direction, to_direction) for the node to merge
         """
+        # Moved edges can be twins of existing ones
+        self.graph.graph['links_canonical'] = False
         node_to_keep = node_tuple1[0]
         node_to_merge = node_tuple2[0]
         if node_tuple1[1] == node_tuple2[1]:
@@ -221,7 +266,7 @@ class BrotherMerger:
         # Create consensus sequence, adjusting for orientation if needed
         seq2 = node_to_merge['seq'] if node_tuple1[1]==node_tuple2[1] else shared.reverse_complement(node_to_merge['seq'])
         seq = bs.create_consensus_sequence(node_to_keep['seq'], seq2)
-        node_to_keep['seq'] = seq
+        node_to_keep['seq'] = shared.pack_sequence(seq)
 
     def _degenerated_neighbour(self, node):
         """
@@ -242,15 +287,15 @@ class BrotherMerger:
             seq_u = self.graph.nodes[u]['seq']
             seq_v = self.graph.nodes[v]['seq']
             if data['label'] == '-/-':
-                self.graph.nodes[u]['seq'] = bs.cigar_judge_connect(seq_v, seq_u, data['cigar'])
+                self.graph.nodes[u]['seq'] = shared.pack_sequence(bs.cigar_judge_connect(seq_v, seq_u, data['cigar']))
             elif data['label'] == '-/+':
-                self.graph.nodes[u]['seq'] = bs.cigar_judge_connect(shared.reverse_complement(seq_v), seq_u, data['cigar'])
+                self.graph.nodes[u]['seq'] = shared.pack_sequence(bs.cigar_judge_connect(shared.reverse_complement(seq_v), seq_u, data['cigar']))
             elif data['label'] == '+/-':
-                self.graph.nodes[u]['seq'] = shared.reverse_complement(
-                    bs.cigar_judge_connect(seq_v, shared.reverse_complement(seq_u), data['cigar']))
+                self.graph.nodes[u]['seq'] = shared.reverse_complement(shared.pack_sequence(
+                    bs.cigar_judge_connect(seq_v, shared.reverse_complement(seq_u), data['cigar'])))
             elif data['label'] == '+/+':
-                self.graph.nodes[u]['seq'] = shared.reverse_complement(
-                    bs.cigar_judge_connect(shared.reverse_complement(seq_v), shared.reverse_complement(seq_u), data['cigar']))
+                self.graph.nodes[u]['seq'] = shared.reverse_complement(shared.pack_sequence(
+                    bs.cigar_judge_connect(shared.reverse_complement(seq_v), shared.reverse_complement(seq_u), data['cigar'])))
         
         # Process outgoing edges (neighbors that this node connects to)
         for u, v, data in self.graph.out_edges(node, data=True):
@@ -260,15 +305,15 @@ class BrotherMerger:
             seq_u = self.graph.nodes[u]['seq']
             seq_v = self.graph.nodes[v]['seq']
             if data['label'] == '+/+':
-                self.graph.nodes[v]['seq'] = bs.cigar_judge_connect(seq_u, seq_v, data['cigar'])
+                self.graph.nodes[v]['seq'] = shared.pack_sequence(bs.cigar_judge_connect(seq_u, seq_v, data['cigar']))
             elif data['label'] == '-/+':
-                self.graph.nodes[v]['seq'] = bs.cigar_judge_connect(shared.reverse_complement(seq_u), seq_v, data['cigar'])
+                self.graph.nodes[v]['seq'] = shared.pack_sequence(bs.cigar_judge_connect(shared.reverse_complement(seq_u), seq_v, data['cigar']))
             elif data['label'] == '+/-':
-                self.graph.nodes[v]['seq'] = shared.reverse_complement(
-                    bs.cigar_judge_connect(seq_u, shared.reverse_complement(seq_v), data['cigar']))
+                self.graph.nodes[v]['seq'] = shared.reverse_complement(shared.pack_sequence(
+                    bs.cigar_judge_connect(seq_u, shared.reverse_complement(seq_v), data['cigar'])))
             elif data['label'] == '-/-':
-                self.graph.nodes[v]['seq'] = shared.reverse_complement(
-                    bs.cigar_judge_connect(shared.reverse_complement(seq_u), shared.reverse_complement(seq_v), data['cigar']))
+                self.graph.nodes[v]['seq'] = shared.reverse_complement(shared.pack_sequence(
+                    bs.cigar_judge_connect(shared.reverse_complement(seq_u), shared.reverse_complement(seq_v), data['cigar'])))
                     
     def _classify_edges(self, node):
         """
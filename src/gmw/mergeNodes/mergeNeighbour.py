@@ -27,7 +27,8 @@ simplifying the graph structure while preserving the biological information.
 """
 
 import mergeNodes.basicFunction as bs
-import shared
+import monitor
+from mergeNodes.sequenceExecutor import MergePlan
 
 class NeighbourMerger:
     """
@@ -37,8 +38,10 @@ class NeighbourMerger:
     in a genome assembly graph to simplify the graph structure while
     preserving the biological information.
     """
-    def __init__(self, graph):
+    def __init__(self, graph, threads=1):
         self.graph = graph
+        self.threads = threads
+        self._plan = None
 
     def merge_neibour(self):
         """
@@ -47,8 +50,11 @@ class NeighbourMerger:
         This method identifies and merges neighboring nodes that have simple
         connections (one outgoing edge from one node to another with one incoming edge).
         It removes redundant edges and updates the graph structure accordingly.
+        The merges are planned on the graph first, their sequences are built
+        afterwards, see MergePlan.
         """
         bs.remove_redundant_edges(self.graph)       
+        self._plan = MergePlan()
         nodes_to_remove = []
         for node in self.graph.nodes:
             while True:
@@ -70,7 +76,11 @@ class NeighbourMerger:
                         self._move_edges(out_node_edges['minus_out'][0])
                         continue
                 break
+        for node, seq in self._plan.build(self.threads).items():
+            self.graph.nodes[node]['seq'] = seq
+        self._plan = None
         self.graph.remove_nodes_from(nodes_to_remove)
+        monitor.metrics.count("nodes_merged", len(nodes_to_remove), kind="neighbour")
         
     def _merge_node_property(self, connect_edge):
         """
@@ -90,25 +100,15 @@ class NeighbourMerger:
         node_to_merge = self.graph.nodes[connect_edge[1]]
         label = connect_edge[3]['label']
         cigar = connect_edge[3]['cigar']
-        new_seq = ""
         
-        # Merge sequences based on orientation combinations
-        if label == '+/+':
-            keep_seq = node_to_keep['seq']
-            merge_seq = node_to_merge['seq']
-            new_seq = bs.cigar_merge(keep_seq, merge_seq, cigar)
-        elif label == '-/-':
-            keep_seq = node_to_keep['seq']
-            merge_seq = node_to_merge['seq']
-            new_seq = bs.cigar_merge(merge_seq, keep_seq, cigar)
-        elif label == '+/-':
-            keep_seq = node_to_keep['seq']
-            merge_seq = shared.reverse_complement(node_to_merge['seq'])
-            new_seq = bs.cigar_merge(keep_seq, merge_seq, cigar)
-        elif label == '-/+':
-            keep_seq = node_to_keep['seq']
-            merge_seq = shared.reverse_complement(node_to_merge['seq'])
-            new_seq = bs.cigar_merge(merge_seq, keep_seq, cigar)
+        # Record the sequence merge and compute the merged length without it
+        self._plan.add(self.graph, connect_edge[0], connect_edge[1], label, cigar)
+        if label in ('+/+', '+/-'):
+            new_length = bs.cigar_merge_length(node_to_keep['length'], node_to_merge['length'], cigar)
+        elif label in ('-/-', '-/+'):
+            new_length = bs.cigar_merge_length(node_to_merge['length'], node_to_keep['length'], cigar)
+        else:
+            new_length = 0
         
         # Combine depth (DP) as weighted average based on sequence lengths
         if 'DP' in node_to_keep and 'DP' in node_to_merge:
@@ -138,9 +138,8 @@ class NeighbourMerger:
             else:
                 node_to_keep['OR'] = '+' if node_to_merge['OR'] == '-' else '-'
                 
-        # Update length and sequence
-        node_to_keep['length'] = len(new_seq)
-        node_to_keep['seq'] = new_seq
+        # Update length, the sequence is built by the plan
+        node_to_keep['length'] = new_length
              
     def _move_edges(self, connect_edge):
         """
@@ -160,6 +159,8 @@ class NeighbourMerger:
         Raises:
             ValueError: If the edge has an invalid label format
         """
+        # Moved edges can be twins of existing ones
+        self.graph.graph['links_canonical'] = False
         node_to_keep = connect_edge[0]
         node_to_merge = connect_edge[1]
         label = connect_edge[3]['label']
@@ -0,0 +1,150 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Deferred sequence work of neighbour merging.
+NeighbourMerger plans its merges on the graph topology and records every merge
+in a MergePlan. The merged sequences are built afterwards, one group per
+surviving node, in a pool of forked worker processes when the groups hold
+enough bases. Workers read the plan copy-on-write from the parent process.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import shared
+import mergeNodes.basicFunction as bs
+
+# Plan read by forked workers
+_PLAN = None
+
+def merge_sequences(keep_seq, merge_seq, label, cigar):
+    """
+    Build the sequence of two merged neighbours.
+    
+    Parameters:
+        keep_seq: Sequence of the node kept
+        merge_seq: Sequence of the node merged into it
+        label (str): Label of the edge from the kept node to the merged one
+        cigar (str): CIGAR string of the edge
+        
+    Returns:
+        str: Merged sequence, empty for an unknown label
+    """
+    if label == '+/+':
+        return bs.cigar_merge(keep_seq, merge_seq, cigar)
+    elif label == '-/-':
+        return bs.cigar_merge(merge_seq, keep_seq, cigar)
+    elif label == '+/-':
+        return bs.cigar_merge(keep_seq, shared.reverse_complement(merge_seq), cigar)
+    elif label == '-/+':
+        return bs.cigar_merge(shared.reverse_complement(merge_seq), keep_seq, cigar)
+    return ""
+
+class MergePlan:
+    """
+    Merges planned on the graph whose sequences are not built yet.
+    
+    Merges are grouped by the node surviving them. A node merged after it
+    absorbed others brings its group along, so every group only depends on
+    the sequences it holds and groups can be built in any order.
+    """
+    def __init__(self):
+        # Sequence of every node before its first planned merge
+        self.seqs = {}
+        # Surviving node -> [(keep, merge, label, cigar), ...] in merge order
+        self.groups = {}
+
+    def add(self, graph, keep, merge, label, cigar):
+        """
+        Record the merge of node `merge` into node `keep`.
+        
+        Parameters:
+            graph: The graph holding both nodes
+            keep: The node kept
+            merge: The node merged into it
+            label (str): Label of the edge from keep to merge
+            cigar (str): CIGAR string of the edge
+        """
+        for node in (keep, merge):
+            if node not in self.seqs:
+                self.seqs[node] = graph.nodes[node]['seq']
+        ops = self.groups.setdefault(keep, [])
+        ops.extend(self.groups.pop(merge, ()))
+        ops.append((keep, merge, label, cigar))
+
+    def build_group(self, node):
+        """
+        Replay the merges of one group.
+        
+        Parameters:
+            node: The surviving node of the group
+            
+        Returns:
+            The merged sequence, stored as shared.pack_sequence does
+        """
+        built = {}
+        for keep, merge, label, cigar in self.groups[node]:
+            built[keep] = merge_sequences(built.get(keep, self.seqs[keep]), built.get(merge, self.seqs[merge]), label, cigar)
+        return shared.pack_sequence(built[node])
+
+    def build(self, threads=1):
+        """
+        Build the sequences of all groups.
+        
+        Groups are spread over `threads` forked workers if they hold at least
+        config.merge_pool_min_bases bases, otherwise they are built here.
+        
+        Parameters:
+            threads (int): Number of worker processes
+            
+        Returns:
+            dict: Surviving node -> merged sequence, in group order
+        """
+        nodes = list(self.groups)
+        sizes = {node: sum(len(self.seqs[merge]) for _, merge, _, _ in self.groups[node]) for node in nodes}
+        workers = min(threads or 1, len(nodes))
+        if (workers < 2 or sum(sizes.values()) < config.merge_pool_min_bases
+                or "fork" not in multiprocessing.get_all_start_methods()):
+            return {node: self.build_group(node) for node in nodes}
+        # Largest groups first, each to the least loaded worker
+        chunks = [[] for _ in range(workers)]
+        loads = [0] * workers
+        for node in sorted(nodes, key=lambda node: -sizes[node]):
+            worker = loads.index(min(loads))
+            chunks[worker].append(node)
+            loads[worker] += sizes[node]
+        global _PLAN
+        _PLAN = self
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+                built = {}
+                for result in executor.map(_build_groups, chunks):
+                    built.update(result)
+        finally:
+            _PLAN = None
+        return {node: built[node] for node in nodes}
+
+def _build_groups(nodes):
+    """Build some groups of the plan inherited from the parent process."""
+    return {node: _PLAN.build_group(node) for node in nodes}
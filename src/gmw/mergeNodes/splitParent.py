@@ -22,6 +22,7 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 import mergeNodes.basicFunction as bs
 import shared
 import config
+import monitor
 
 class ParentSpliter:
     """Split a parent (junction) node into two nodes based on topology and depth.
@@ -91,7 +92,8 @@ class ParentSpliter:
             
             self._move_edges(node, plus_tuple1, plus_tuple2, minus_tuple1, minus_tuple2)
             nodes_to_remove.append(node)
-        self.graph.remove_nodes_from(nodes_to_remove)                    
+        self.graph.remove_nodes_from(nodes_to_remove)
+        monitor.metrics.count("nodes_split", len(nodes_to_remove))                    
         # for u,v,data in self.graph.edges(data=True):
         #     print(u,v,data)
         # for node in self.graph.nodes:
@@ -219,6 +221,8 @@ class ParentSpliter:
         plus_tuple1, plus_tuple2, minus_tuple1, minus_tuple2 : tuple
             Neighbor tuples as returned by _judge_node_property.
         """
+        # Moved edges can be twins of existing ones
+        self.graph.graph['links_canonical'] = False
         plus_low_tuple = None
         plus_high_tuple = None
         minus_low_tuple = None
@@ -329,7 +333,7 @@ class ParentSpliter:
                 
         # Update sequence and length
         node_to_keep['length'] = len(new_seq)
-        node_to_keep['seq'] = new_seq
+        node_to_keep['seq'] = shared.pack_sequence(new_seq)
                             
     def _classify_edges(self, node):
         """Classify incident edges by orientation relative to given node.
@@ -393,7 +397,7 @@ class ParentSpliter:
         node2 = self.graph.nodes[node_tuple2[0]]
         if node1['length'] == node2['length']:
             seq2 = node2['seq'] if node_tuple1[1]==node_tuple2[1] else shared.reverse_complement(node2['seq'])
-            similarity_score = bs.calculate_similarity(node1['seq'], seq2)
+            similarity_score = bs.calculate_similarity(node1['seq'], seq2, config.split_similarity_score)
             if similarity_score >= config.split_similarity_score:
                 return True
         return False
@@ -0,0 +1,32 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Monitor Module - Run time measurement of the GMW workflow.
+This package records where a run spends its time. Code marks its steps with
+the `stage` context manager, which costs nothing unless a profiler is active.
+The `metrics` module exports counters of the run for fleet monitoring.
+"""
+
+from .profiler import Profiler, stage, bind, start, stop, active, checkpoint, register_source
+from .memory import MemoryTracker, graph_breakdown, traced_category
+from . import metrics
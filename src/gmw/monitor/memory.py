@@ -0,0 +1,224 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Memory accounting of the GMW workflow.
+The MemoryTracker traces Python allocations with tracemalloc and samples the
+resident set size (RSS) of the process in a background thread. It measures
+the peak and retained memory of profiler stages and estimates at checkpoints
+how much memory the graph structures, the parsed GFA file, the taxonomy and
+the tool results hold.
+"""
+
+import dis
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import config
+
+MB = 1024 * 1024
+
+# Source files, relative to src/gmw, whose live allocations are attributed to a category
+TRACED_CATEGORIES = {
+    "taxonomy": ("unfoldGraph/taxon.py",),
+}
+_SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# (file, first line, last line) of the functions tagged by traced_category
+_TRACED_FUNCTIONS = {}
+
+def traced_category(category):
+    """
+    Decorator attributing the live allocations made by the lines of a function to a category.
+    
+    Parameters
+    ----------
+    category : str
+        Category of the memory checkpoints, e.g. "tool_results"
+    """
+    def decorate(function):
+        code = function.__code__
+        lines = [line for _, line in dis.findlinestarts(code) if line is not None] or [code.co_firstlineno]
+        _TRACED_FUNCTIONS.setdefault(category, []).append((os.path.abspath(code.co_filename), min(lines), max(lines)))
+        return function
+    return decorate
+
+def _category_of(filename, lineno):
+    """Category of an allocation site, None if it belongs to no category."""
+    filename = os.path.abspath(filename)
+    for category, functions in _TRACED_FUNCTIONS.items():
+        for path, first, last in functions:
+            if filename == path and first <= lineno <= last:
+                return category
+    for category, files in TRACED_CATEGORIES.items():
+        if any(filename == os.path.join(_SOURCE_ROOT, file) for file in files):
+            return category
+    return None
+
+def current_rss():
+    """Return the resident set size of the process in bytes."""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Peak instead of current RSS where /proc is missing, in KB on Linux and bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+def _sizeof(obj, seen):
+    """Size of an object not counted before, containers are followed."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _sizeof(key, seen) + _sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for value in obj:
+            size += _sizeof(value, seen)
+    return size
+
+def graph_breakdown(graph, sources=None):
+    """
+    Estimate the memory held by the parts of a graph.
+    
+    Shared objects are counted once, in the first category holding them.
+    
+    Parameters
+    ----------
+    graph : networkx.MultiDiGraph
+        The assembly graph
+    sources : dict, optional
+        Other graphs still alive by name, e.g. the parsed GFA file
+    
+    Returns
+    -------
+    dict
+        Bytes per category
+    """
+    seen = set()
+    breakdown = {"sequences": 0, "node_attributes": 0, "edge_attributes": 0, "adjacency": 0}
+    for _, seq in graph.nodes(data='seq'):
+        if seq is not None:
+            breakdown["sequences"] += _sizeof(seq, seen)
+    for node, data in graph.nodes(data=True):
+        breakdown["node_attributes"] += _sizeof(node, seen) + _sizeof(data, seen)
+    for _, _, data in graph.edges(data=True):
+        breakdown["edge_attributes"] += _sizeof(data, seen)
+    for adjacency in (graph._node, graph._succ, graph._pred):
+        breakdown["adjacency"] += _sizeof(adjacency, seen)
+    for name, source in (sources or {}).items():
+        size = 0
+        for part in ("segments", "lines", "paths", "headers"):
+            size += _sizeof(getattr(source, part, None), seen)
+        breakdown[name + "_leftovers"] = size
+    return breakdown
+
+class MemoryTracker:
+    """
+    Allocation tracing and RSS sampling for the profiler.
+    
+    Parameters
+    ----------
+    interval : float
+        Seconds between two RSS samples
+    """
+    def __init__(self, interval=config.memory_sample_interval):
+        self.interval = interval
+        self.samples = []
+        self.checkpoints = []
+        self.sources = {}
+        self._stop = threading.Event()
+        self._peaks = threading.local()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(config.memory_trace_frames)
+        self._thread = threading.Thread(target=self._sample, name="gmw-rss", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.samples.append((time.perf_counter(), current_rss()))
+            self._stop.wait(self.interval)
+
+    def close(self):
+        """Stop sampling and tracing."""
+        self._stop.set()
+        self._thread.join()
+        tracemalloc.stop()
+
+    def enter(self):
+        """Start measuring a stage, return the state passed to `exit`."""
+        frames = getattr(self._peaks, "frames", None)
+        if frames is None:
+            frames = self._peaks.frames = []
+        current, peak = tracemalloc.get_traced_memory()
+        main = threading.current_thread() is threading.main_thread()
+        if main:
+            # tracemalloc has one peak, keep the enclosing stage's part before resetting it
+            if frames:
+                frames[-1] = max(frames[-1], peak)
+            tracemalloc.reset_peak()
+            frames.append(current)
+        return (main, current, len(self.samples), time.perf_counter())
+
+    def exit(self, state):
+        """Finish measuring a stage, return its memory fields in MB."""
+        main, start_current, start_sample, start = state
+        current, peak = tracemalloc.get_traced_memory()
+        fields = {"traced_peak_mb": None, "retained_mb": round((current - start_current) / MB, 3)}
+        if main:
+            peak = max(peak, self._peaks.frames.pop())
+            if self._peaks.frames:
+                self._peaks.frames[-1] = max(self._peaks.frames[-1], peak)
+            fields["traced_peak_mb"] = round(peak / MB, 3)
+        rss = [value for t, value in self.samples[start_sample:] if t >= start] + [current_rss()]
+        fields["rss_peak_mb"] = round(max(rss) / MB, 3)
+        return fields
+
+    def checkpoint(self, name, graph):
+        """Record the estimated memory breakdown of the run at a point in time."""
+        breakdown = graph_breakdown(graph, self.sources)
+        snapshot = tracemalloc.take_snapshot()
+        for category in [*TRACED_CATEGORIES, *_TRACED_FUNCTIONS]:
+            breakdown.setdefault(category, 0)
+        for stat in snapshot.statistics('lineno'):
+            frame = stat.traceback[0]
+            category = _category_of(frame.filename, frame.lineno)
+            if category is not None:
+                breakdown[category] += stat.size
+        traced = tracemalloc.get_traced_memory()[0]
+        breakdown["other_traced"] = max(0, traced - sum(breakdown.values()))
+        breakdown["traced_total"] = traced
+        breakdown["rss"] = current_rss()
+        self.checkpoints.append((name, breakdown))
+
+    def write(self, out_path, prefix):
+        """Write the checkpoint breakdowns to {prefix}_memory.tsv."""
+        with open(out_path + "/" + prefix + "_memory.tsv", 'w') as f:
+            f.write("checkpoint\tcategory\tmb\n")
+            for name, breakdown in self.checkpoints:
+                for category, size in breakdown.items():
+                    f.write(f"{name}\t{category}\t{size / MB:.3f}\n")
@@ -0,0 +1,245 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Machine-readable run metrics.
+A MetricsRecorder keeps counters, summaries and gauges of a run and exports
+them while the run goes on: every update is appended as one JSON object to
+{prefix}_metrics.jsonl, and the current values are rewritten atomically to
+{prefix}_metrics.prom in the Prometheus text format, at most once per
+config.metrics_flush_interval seconds and at the end of the run.
+"""
+
+import json
+import os
+import threading
+import time
+
+import config
+
+# Type and help text of the known metrics, names without the gmw_ prefix
+METRICS = {
+    "graph_nodes": ("gauge", "Nodes of the graph after the last stage."),
+    "graph_edges": ("gauge", "Edges of the graph after the last stage."),
+    "iteration": ("gauge", "Current unfold iteration."),
+    "edges_removed": ("counter", "Edges removed, by predicate."),
+    "nodes_removed": ("counter", "Nodes removed, by reason."),
+    "components_pruned": ("counter", "Weakly connected components removed as unknown."),
+    "nodes_merged": ("counter", "Nodes merged into another node, by kind."),
+    "nodes_split": ("counter", "Parent nodes split between their brothers."),
+    "stages_reused": ("counter", "Unfold stages skipped by loading their checkpoint."),
+    "tool_seconds": ("summary", "Wall time of external tool runs."),
+    "bytes_read": ("counter", "Bytes of input files read, by kind."),
+    "bytes_written": ("counter", "Bytes of output files written, by kind."),
+    "parse_segments_per_second": ("gauge", "Segments parsed per second."),
+    "run_segments_per_second": ("gauge", "Input segments per second of the whole run."),
+    "run_seconds": ("gauge", "Wall time of the run so far."),
+}
+
+# Active recorder, None disables all metrics
+_metrics = None
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+class MetricsRecorder:
+    """
+    Collector and exporter of run metrics.
+    
+    Parameters
+    ----------
+    out_path : str, optional
+        Output dir, None keeps the metrics in memory only
+    prefix : str
+        Prefix of the output files, also added as label to every metric
+    """
+    def __init__(self, out_path=None, prefix="gmw"):
+        self.prefix = prefix
+        self.prom_path = None if out_path is None else f"{out_path}/{prefix}_metrics.prom"
+        self.events = [] if out_path is None else None
+        self._stream = None if out_path is None else open(f"{out_path}/{prefix}_metrics.jsonl", 'w')
+        self.values = {}
+        self.origin = time.perf_counter()
+        self.iteration = 0
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+
+    def _emit(self, name, fields):
+        event = {"time": round(time.time(), 3), "elapsed": round(time.perf_counter() - self.origin, 6),
+                 "iteration": self.iteration, "event": name, **fields}
+        if self._stream is None:
+            self.events.append(event)
+        else:
+            self._stream.write(json.dumps(event) + "\n")
+            self._stream.flush()
+            if time.perf_counter() - self._flushed >= config.metrics_flush_interval:
+                self._write_prom()
+
+    def update(self, name, value, labels, kind, emit=True):
+        """
+        Change a metric and emit an event.
+        
+        Parameters
+        ----------
+        name : str
+            Metric name without the gmw_ prefix
+        value : float
+            Added to counters and summaries, set on gauges
+        labels : dict
+            Labels of the metric
+        kind : str
+            'counter', 'summary' or 'gauge'
+        emit : bool
+            Also append an event to the JSON lines stream
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if kind == "gauge":
+                self.values[key] = value
+            elif kind == "summary":
+                count, total = self.values.get(key, (0, 0))
+                self.values[key] = (count + 1, total + value)
+            else:
+                self.values[key] = self.values.get(key, 0) + value
+            if emit:
+                self._emit(name, {**labels, "value": value})
+
+    def event(self, name, **fields):
+        """Emit an event that changes no metric."""
+        with self._lock:
+            self._emit(name, fields)
+
+    def merge(self, values, events, **labels):
+        """Add the counters and summaries measured in another process, gauges are skipped."""
+        with self._lock:
+            for (name, key_labels), value in values.items():
+                kind = METRICS.get(name, ("counter",))[0]
+                if kind == "gauge":
+                    continue
+                key = (name, tuple(sorted({**dict(key_labels), **labels}.items())))
+                if kind == "summary":
+                    count, total = self.values.get(key, (0, 0))
+                    self.values[key] = (count + value[0], total + value[1])
+                else:
+                    self.values[key] = self.values.get(key, 0) + value
+            for event in events:
+                event = {**event, **labels}
+                if self._stream is None:
+                    self.events.append(event)
+                else:
+                    self._stream.write(json.dumps(event) + "\n")
+            if self._stream is not None:
+                self._stream.flush()
+
+    def prom_text(self):
+        """Return the metrics in the Prometheus text format."""
+        lines = []
+        base = (("prefix", self.prefix),)
+        names = sorted({name for name, _ in self.values}, key=lambda name: (name not in METRICS, name))
+        for name in names:
+            kind, text = METRICS.get(name, ("counter", name.replace("_", " ").capitalize() + "."))
+            metric = "gmw_" + name + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {metric} {text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (key_name, labels), value in sorted(self.values.items(), key=lambda item: (item[0][0], item[0][1])):
+                if key_name != name:
+                    continue
+                label_text = _label_text(base + labels)
+                if kind == "summary":
+                    lines.append(f"{metric}_count{label_text} {value[0]}")
+                    lines.append(f"{metric}_sum{label_text} {value[1]:.6f}")
+                else:
+                    lines.append(f"{metric}{label_text} {value:g}" if isinstance(value, float) else f"{metric}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _write_prom(self):
+        self._flushed = time.perf_counter()
+        if self.prom_path is None:
+            return
+        temp = self.prom_path + ".tmp"
+        with open(temp, 'w') as f:
+            f.write(self.prom_text())
+        os.replace(temp, self.prom_path)
+
+    def close(self):
+        """Write the final metrics and close the event stream."""
+        with self._lock:
+            self._write_prom()
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+                self.events = []
+
+def count(name, value=1, **labels):
+    """Add value to a counter."""
+    if _metrics is not None:
+        _metrics.update(name, value, labels, "counter")
+
+def observe(name, value, **labels):
+    """Add an observation, e.g. a duration, to a summary."""
+    if _metrics is not None:
+        _metrics.update(name, value, labels, "summary")
+
+def gauge(name, value, **labels):
+    """Set a gauge."""
+    if _metrics is not None:
+        _metrics.update(name, value, labels, "gauge")
+
+def event(name, **fields):
+    """Emit an event that changes no metric."""
+    if _metrics is not None:
+        _metrics.event(name, **fields)
+
+def graph_size(graph, stage):
+    """Set the graph size gauges and emit one event with the stage that produced the graph."""
+    if _metrics is not None:
+        nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+        _metrics.update("graph_nodes", nodes, {}, "gauge", emit=False)
+        _metrics.update("graph_edges", edges, {}, "gauge", emit=False)
+        _metrics.event("graph_size", stage=stage, nodes=nodes, edges=edges)
+
+def set_iteration(iteration):
+    """Set the unfold iteration recorded with every event."""
+    if _metrics is not None:
+        _metrics.iteration = iteration
+        gauge("iteration", iteration)
+
+def start(out_path=None, prefix="gmw"):
+    """Activate a new recorder and return it."""
+    global _metrics
+    _metrics = MetricsRecorder(out_path, prefix)
+    return _metrics
+
+def stop():
+    """Deactivate the recorder, write its final values and return it."""
+    global _metrics
+    metrics, _metrics = _metrics, None
+    if metrics is not None:
+        metrics.close()
+    return metrics
+
+def active():
+    """Return the active recorder or None."""
+    return _metrics
@@ -0,0 +1,270 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Per-stage profiling.
+A Profiler records the wall time, the CPU time of the running thread, the CPU
+time of finished child processes (external tools) and the graph size before
+and after every stage, and optionally its peak and retained memory. Stages nest per thread, work handed to other threads
+keeps the path of the stage that submitted it. The report is written as JSON
+and TSV, optionally with a cProfile dump of every top-level unfold stage.
+"""
+
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import re
+import resource
+import threading
+import time
+
+from monitor.memory import MemoryTracker
+
+logger = logging.getLogger("gmw")
+
+# Active profiler, None disables all measurements
+_profiler = None
+_local = threading.local()
+
+def _graph_size(graph):
+    if graph is None:
+        return None, None
+    return graph.number_of_nodes(), graph.number_of_edges()
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class Profiler:
+    """
+    Collector of stage records.
+    
+    Parameters
+    ----------
+    cprofile : bool
+        Dump a cProfile of every stage opened with cprofile=True
+    memory : bool
+        Measure the memory of every stage and record memory checkpoints
+    """
+    def __init__(self, cprofile=False, memory=False):
+        self.cprofile = cprofile
+        self.memory = MemoryTracker() if memory else None
+        self.records = []
+        self.dumps = {}
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._profiling = False
+
+    def close(self):
+        """Stop the memory tracker."""
+        if self.memory is not None:
+            self.memory.close()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def merge(self, records, name):
+        """Add records measured in another process as children of a stage of the current one."""
+        parent = _stack() + [name]
+        for record in records:
+            record = dict(record)
+            record["path"] = "/".join(parent + [record["path"]])
+            record["depth"] += len(parent)
+            self.add(record)
+
+    def summary(self):
+        """
+        Aggregate the records by stage path.
+        
+        Returns
+        -------
+        list
+            One dict per path in order of first appearance with the number of
+            calls, summed times and the summed graph size changes.
+        """
+        rows = {}
+        for record in self.records:
+            row = rows.get(record["path"])
+            if row is None:
+                row = rows[record["path"]] = {"path": record["path"], "depth": record["depth"], "calls": 0,
+                                              "wall_seconds": 0.0, "cpu_seconds": 0.0, "child_cpu_seconds": 0.0,
+                                              "nodes_delta": 0, "edges_delta": 0}
+            row["calls"] += 1
+            for key in ("wall_seconds", "cpu_seconds", "child_cpu_seconds"):
+                row[key] += record[key]
+            if "rss_peak_mb" in record:
+                row["retained_mb"] = row.get("retained_mb", 0.0) + record["retained_mb"]
+                for key in ("traced_peak_mb", "rss_peak_mb"):
+                    if record[key] is not None:
+                        row[key] = max(row.get(key) or 0.0, record[key])
+            if record["nodes_before"] is not None:
+                row["nodes_delta"] += record["nodes_after"] - record["nodes_before"]
+                row["edges_delta"] += record["edges_after"] - record["edges_before"]
+        return list(rows.values())
+
+    def write(self, out_path, prefix):
+        """
+        Write the profile report into the output dir.
+        
+        Parameters
+        ----------
+        out_path : str
+            Output dir
+        prefix : str
+            Prefix of the report files
+        """
+        summary = self.summary()
+        with open(out_path + "/" + prefix + "_profile.json", 'w') as f:
+            json.dump({"summary": summary, "records": self.records}, f, indent=1)
+        with open(out_path + "/" + prefix + "_profile.tsv", 'w') as f:
+            columns = ["path", "calls", "wall_seconds", "cpu_seconds", "child_cpu_seconds", "nodes_delta", "edges_delta"]
+            if self.memory is not None:
+                columns += ["traced_peak_mb", "retained_mb", "rss_peak_mb"]
+            f.write("\t".join(columns) + "\n")
+            for row in summary:
+                values = [row.get(c, "") for c in columns]
+                f.write("\t".join(f"{v:.3f}" if isinstance(v, float) else str(v) for v in values) + "\n")
+        if self.memory is not None:
+            self.memory.write(out_path, prefix)
+        if self.dumps:
+            dump_path = out_path + "/profile"
+            os.makedirs(dump_path, exist_ok=True)
+            for name, profile in self.dumps.items():
+                profile.dump_stats(dump_path + "/" + prefix + "_" + re.sub(r"[^\w.-]", "_", name) + ".prof")
+        for row in summary:
+            if row["depth"] == 0:
+                logger.info(f"Profile {row['path']}: {row['wall_seconds']:.2f} s wall, {row['cpu_seconds']:.2f} s cpu, "
+                            f"{row['child_cpu_seconds']:.2f} s tools.")
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+@contextlib.contextmanager
+def _measure(profiler, name, graph, cprofile):
+    stack = _stack()
+    path = "/".join(stack + [name])
+    nodes_before, edges_before = _graph_size(graph)
+    profile = None
+    if cprofile and profiler.cprofile and not profiler._profiling:
+        # cProfile cannot nest, only the outermost marked stage is dumped
+        profile = profiler.dumps.setdefault(path, cProfile.Profile())
+        profiler._profiling = True
+    stack.append(name)
+    memory = profiler.memory.enter() if profiler.memory is not None else None
+    start = time.perf_counter()
+    cpu = time.thread_time()
+    children = _children_cpu()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            profiler._profiling = False
+        wall = time.perf_counter() - start
+        cpu = time.thread_time() - cpu
+        children = _children_cpu() - children
+        if memory is not None:
+            memory = profiler.memory.exit(memory)
+        stack.pop()
+        nodes_after, edges_after = _graph_size(graph)
+        record = {"path": path, "depth": len(stack), "thread": threading.current_thread().name,
+                  "start": round(start - profiler.origin, 6), "wall_seconds": wall, "cpu_seconds": cpu,
+                  "child_cpu_seconds": children, "nodes_before": nodes_before, "nodes_after": nodes_after,
+                  "edges_before": edges_before, "edges_after": edges_after}
+        if memory is not None:
+            record.update(memory)
+        profiler.add(record)
+
+def stage(name, graph=None, cprofile=False):
+    """
+    Measure a step of the workflow.
+    
+    Parameters
+    ----------
+    name : str
+        Stage name, nested stages are reported as parent/child
+    graph : networkx.MultiDiGraph, optional
+        Graph whose node and edge counts are recorded before and after
+    cprofile : bool
+        Dump a cProfile of this stage when cProfile dumps are enabled
+    
+    Returns
+    -------
+    context manager
+    """
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _measure(_profiler, name, graph, cprofile)
+
+def bind(function, name):
+    """
+    Wrap a function run by another thread into a stage nested in the current one.
+    """
+    if _profiler is None:
+        return function
+    parent = list(_stack())
+    def run(*args, **kwargs):
+        stack = _stack()
+        saved = stack[:]
+        stack[:] = parent
+        try:
+            with stage(name):
+                return function(*args, **kwargs)
+        finally:
+            stack[:] = saved
+    return run
+
+def start(cprofile=False, memory=False):
+    """Activate a new profiler and return it."""
+    global _profiler
+    _profiler = Profiler(cprofile, memory)
+    _stack().clear()
+    return _profiler
+
+def stop():
+    """Deactivate the profiler and return it."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+def checkpoint(name, graph):
+    """Record the memory breakdown of the run if memory profiling is active."""
+    if _profiler is not None and _profiler.memory is not None:
+        _profiler.memory.checkpoint(name, graph)
+
+def register_source(name, source):
+    """Count a graph still alive besides the assembly graph in memory checkpoints."""
+    if _profiler is not None and _profiler.memory is not None:
+        _profiler.memory.sources[name] = source
+
+def active():
+    """Return the active profiler or None."""
+    return _profiler
@@ -0,0 +1,32 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Pipeline Module - Orchestration of the unfold workflow.
+This package runs the configured unfolders and mergers on an assembly graph,
+either serially on the whole graph or in parallel per weakly connected component.
+"""
+
+from .unfoldPipeline import UnfoldPipeline, UNFOLD_PARAMETERS
+from .componentExecutor import ComponentExecutor, source_subgraph
+from .stageScheduler import StageScheduler, load_pipeline
+from .stageCache import StageCache, file_digest
@@ -0,0 +1,315 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Component-parallel execution of the unfold pipeline.
+Edge removal, component pruning and node merging never cross weakly connected
+components. This module partitions the backbone graph into components, runs
+the unfold pipeline for balanced batches of components in worker processes and
+reassembles a result graph identical to a serial run (with the native BGLL
+engine).
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+import artifacts
+import gfaLib
+import monitor
+import shared
+from unfoldGraph import bgll
+from pipeline.stageScheduler import load_pipeline
+from pipeline.unfoldPipeline import UnfoldPipeline, UNFOLD_PARAMETERS
+
+# Parsed GFA graph inherited by forked workers, so segments are never pickled
+_SOURCE_GRAPH = None
+
+def _run_batch(batch_argv, nodes, fast, pipeline, source_graph=None, cache=None, max_iterations=None, deadline=None,
+               tool_cache=None, graph_m2=None):
+    """
+    Run the unfold pipeline on one batch of components in a worker process.
+
+    Parameters
+    ----------
+    batch_argv : list
+        Unfolder arguments without the leading graph.
+    nodes : list
+        Nodes of all components of the batch.
+    fast : bool
+        Run the unfolders only once.
+    pipeline : str
+        Pipeline file, None for the default pipeline.
+    source_graph : gfaLib.AbstractGraph, optional
+        Segments and lines of the batch when they are not shared through fork.
+    cache : StageCache, optional
+        Checkpoints of the batch stages.
+    max_iterations, deadline : optional
+        Iteration and time limits, see UnfoldPipeline.
+    tool_cache : str, optional
+        Path of the tool cache primed by the parent, for workers that are not forked.
+    graph_m2 : float, optional
+        BGLL modularity normaliser of the backbone, for workers that are not forked.
+
+    Returns
+    -------
+    tuple
+        (nodes with attributes, edges with keys and attributes, profile
+        records or None, metric values and events or None) of the result.
+    """
+    if source_graph is None:
+        source_graph = _SOURCE_GRAPH
+    if tool_cache is not None and shared.tool_cache is None:
+        shared.tool_cache = shared.ToolCache(tool_cache)
+    if graph_m2 is not None:
+        bgll.graph_m2 = graph_m2
+    profiler = monitor.active()
+    if profiler is not None:
+        # The forked copy holds the parent records, start empty
+        profiler = monitor.start(profiler.cprofile, profiler.memory is not None)
+    metrics = monitor.metrics.active()
+    if metrics is not None:
+        # Only the parent writes the metrics files
+        metrics = monitor.metrics.start(None, metrics.prefix)
+    with monitor.stage("backbone"):
+        graph = gfaLib.GFANetwork.compute_backbone(source_graph, nodes=set(nodes))
+    graph = UnfoldPipeline([graph, *batch_argv], fast, pipeline, cache, max_iterations, deadline).run()
+    records = profiler.records if profiler is not None else None
+    measured = (metrics.values, metrics.events) if metrics is not None else None
+    return list(graph.nodes(data=True)), list(graph.edges(keys=True, data=True)), records, measured
+
+
+def source_subgraph(gfa_graph, nodes):
+    """
+    Copy the segments and lines of a set of nodes of a parsed GFA file.
+    
+    Parameters
+    ----------
+    gfa_graph : gfaLib.AbstractGraph
+        Parsed GFA file
+    nodes : iterable
+        Segment names, the lines leaving them are kept
+        
+    Returns
+    -------
+    gfaLib.AbstractGraph
+        Graph of the nodes in the order of the file
+    """
+    nodes = set(nodes)
+    source_graph = gfaLib.AbstractGraph()
+    source_graph.segments = {name: datas for name, datas in gfa_graph.segments.items() if name in nodes}
+    source_graph.lines = {name: datas for name, datas in gfa_graph.lines.items() if name[0] in nodes}
+    # Twin links were merged while parsing the whole file
+    source_graph.metadata = {'links_canonical': gfa_graph.metadata.get('links_canonical', False), 'merged_links': 0}
+    return source_graph
+
+
+class ComponentExecutor:
+    """
+    Run the unfold pipeline per batch of weakly connected components.
+
+    Every batch graph is rebuilt from the parsed GFA in file order, so node,
+    successor and predecessor orders match the whole graph and each component
+    is processed exactly as in a serial run. Batches run until their own
+    fixpoint, which is equivalent to the global fixpoint because node and edge
+    counts never grow.
+
+    BGLL normalises the modularity of every batch by the edge weight of the
+    whole backbone, as a serial run does. The "community" engine of
+    `config.bgll_engine` normalises by the batch graph, its partitions can
+    differ from a serial run.
+
+    kraken2 and blastn run once on the whole backbone before the batches
+    start, and the batches read the results from the tool cache. Only the
+    sequences of nodes merged in later iterations are sent to the tools by
+    every batch.
+
+    Parameters
+    ----------
+    gfa_graph : gfaLib.GraphFromFile
+        Parsed GFA file the backbone was computed from.
+    unfold_argv : list
+        Positional arguments of the unfolders, the backbone graph first.
+    fast : bool
+        Run the unfolders only once.
+    threads : int
+        Number of worker processes.
+    pipeline : str, optional
+        Pipeline file defining the unfolder order.
+    cache : StageCache, optional
+        Checkpoints of the stages, each batch derives its keys from its nodes.
+    max_iterations, deadline : optional
+        Iteration and time limits of every batch, see UnfoldPipeline.
+    """
+    def __init__(self, gfa_graph, unfold_argv, fast, threads, pipeline=None, cache=None, max_iterations=None, deadline=None):
+        self.gfa_graph = gfa_graph
+        self.unfold_argv = unfold_argv
+        self.graph = unfold_argv[0]
+        self.out_path = unfold_argv[1]
+        self.prefix = unfold_argv[2]
+        self.fast = fast
+        self.threads = threads if threads else 1
+        self.pipeline = pipeline
+        self.cache = cache
+        self.max_iterations = max_iterations
+        self.deadline = deadline
+        self.logger = logging.getLogger("gmw")
+
+    def run(self):
+        """
+        Unfold and polish the backbone graph.
+
+        Returns
+        -------
+        networkx.MultiDiGraph
+            The processed graph, a new object unless only one batch is needed.
+        """
+        batches = self._balanced_batches()
+        if len(batches) < 2:
+            return UnfoldPipeline(self.unfold_argv, self.fast, self.pipeline, self.cache, self.max_iterations, self.deadline).run()
+        self.logger.info(f"Unfold {len(batches)} batches of components using {len(batches)} processes.")
+        
+        worker_threads = max(1, self.threads // len(batches))
+        created_cache = shared.tool_cache is None
+        options = dict(zip(UNFOLD_PARAMETERS, self.unfold_argv))
+        created_m2 = options['bgll'] and bgll.graph_m2 is None
+        if created_m2:
+            bgll.graph_m2 = bgll.backbone_m2(self.graph)
+        mp_context = None
+        if "fork" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("fork")
+        # Forked workers must not inherit half written files
+        artifacts.flush()
+        global _SOURCE_GRAPH
+        _SOURCE_GRAPH = self.gfa_graph
+        results = []
+        try:
+            self._prime_tool_cache()
+            with ProcessPoolExecutor(max_workers=len(batches), mp_context=mp_context) as executor:
+                futures = []
+                for i, nodes in enumerate(batches):
+                    batch_path = self.out_path + "/batches/batch_" + str(i + 1)
+                    os.makedirs(batch_path, exist_ok=True)
+                    batch_argv = [batch_path, self.prefix, worker_threads, *self.unfold_argv[4:]]
+                    source_graph = None if mp_context is not None else source_subgraph(self.gfa_graph, nodes)
+                    cache = None if self.cache is None else self.cache.derive("batch", sorted(nodes))
+                    tool_cache = shared.tool_cache.path if shared.tool_cache is not None else None
+                    futures.append(executor.submit(_run_batch, batch_argv, nodes, self.fast, self.pipeline, source_graph, cache,
+                                                   self.max_iterations, self.deadline, tool_cache, bgll.graph_m2))
+                for i, future in enumerate(futures):
+                    batch_nodes, batch_edges, records, measured = future.result()
+                    results.append((batch_nodes, batch_edges))
+                    if records is not None and monitor.active() is not None:
+                        monitor.active().merge(records, "batch_" + str(i + 1))
+                    if measured is not None and monitor.metrics.active() is not None:
+                        monitor.metrics.active().merge(*measured, batch="batch_" + str(i + 1))
+        finally:
+            _SOURCE_GRAPH = None
+            if created_cache:
+                shared.tool_cache = None
+            if created_m2:
+                bgll.graph_m2 = None
+        
+        graph = self._reassemble(results)
+        artifacts.save_gfa(graph, self.out_path + "/" + self.prefix + "_after_unfold.gfa", final=True)
+        return graph
+
+    def _prime_tool_cache(self):
+        """
+        Run kraken2 and blastn once on the backbone sequences.
+
+        The results fill the tool cache, a new one in outdir/batches unless
+        the caller set one, so the first iteration of every batch starts no
+        tool and loads no database.
+        """
+        options = dict(zip(UNFOLD_PARAMETERS, self.unfold_argv))
+        stages = {stage.__name__ for stage in load_pipeline(self.pipeline)[0]}
+        run_kraken = ("TaxonUnfolder" in stages and not options['disable_taxon_unfold'] and not options['use_gfa_taxon']
+                      and options['kraken_out'] is None)
+        run_blast = ("RefUnfolder" in stages and not options['disable_ref_unfold'] and not options['use_gfa_ref']
+                     and options['blast_out'] is None)
+        if not (run_kraken or run_blast):
+            return
+        tools_path = self.out_path + "/batches"
+        os.makedirs(tools_path, exist_ok=True)
+        if shared.tool_cache is None:
+            shared.tool_cache = shared.ToolCache(tools_path + "/gmw_tool_cache.sqlite")
+        fasta = tools_path + "/" + self.prefix + "_segments.fa"
+        with monitor.stage("prime_tools"):
+            shared.graph2fasta(self.graph, fasta)
+            if run_kraken:
+                self.logger.info("Run kraken2 on the backbone before the batches.")
+                shared.run_kraken(fasta, options['kraken_db'], tools_path + "/" + self.prefix + "_kraken_out.txt", threads=self.threads)
+            if run_blast:
+                self.logger.info("Run blastn on the backbone before the batches.")
+                shared.run_blast(fasta, options['blast_db'], tools_path + "/" + self.prefix + "_blast_out.txt", threads=self.threads)
+
+    def _balanced_batches(self):
+        """
+        Partition the components into at most `threads` batches of similar size.
+
+        Components are assigned largest first to the lightest batch, sizes are
+        measured in nodes plus edges.
+
+        Returns
+        -------
+        list
+            Node lists, one per non-empty batch.
+        """
+        components = list(nx.weakly_connected_components(self.graph))
+        batch_num = min(self.threads, len(components))
+        if batch_num < 2:
+            return [list(self.graph.nodes)] if components else []
+        sizes = [len(component) + sum(d for _, d in self.graph.out_degree(component)) for component in components]
+        batches = [[] for _ in range(batch_num)]
+        batch_sizes = [0] * batch_num
+        for i in sorted(range(len(components)), key=lambda i: sizes[i], reverse=True):
+            lightest = batch_sizes.index(min(batch_sizes))
+            batches[lightest].extend(components[i])
+            batch_sizes[lightest] += sizes[i]
+        return [batch for batch in batches if batch]
+
+    def _reassemble(self, results):
+        """
+        Merge the batch results into one graph in the order of a serial run.
+
+        Surviving nodes keep their position in the backbone and the successors
+        of every node keep the order of its batch graph.
+        """
+        position = {node: i for i, node in enumerate(self.graph.nodes)}
+        nodes = []
+        out_edges = {}
+        for batch_nodes, batch_edges in results:
+            nodes.extend(batch_nodes)
+            for u, v, key, data in batch_edges:
+                out_edges.setdefault(u, []).append((v, key, data))
+        nodes.sort(key=lambda item: position[item[0]])
+        
+        graph = self.graph.__class__()
+        graph.add_nodes_from(nodes)
+        for node, _ in nodes:
+            for v, key, data in out_edges.get(node, []):
+                graph.add_edge(node, v, key=key, **data)
+        return graph
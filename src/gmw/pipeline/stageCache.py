@@ -0,0 +1,190 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Content addressed checkpoints of the unfold pipeline.
+The graph is saved after every unfold stage under a key hashing the key of the
+stage input with the options and config settings the stage depends on. The
+first key hashes the input GFA file, so a rerun finds the checkpoint of every
+stage it would repeat and resumes after the last one, and runs sharing their
+upstream stages (e.g. a threshold sweep) share their checkpoints.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import config
+import gfaLib
+import monitor
+import shared
+from unfoldGraph.abstrctUnfold import AbstrctUnfolder
+
+# Bumped whenever the checkpoint content changes, it is part of every key
+FORMAT_VERSION = 1
+# Options every stage depends on through component removal and neighbour merging
+COMMON_PARAMETERS = ("disable_taxon_unfold", "disable_ref_unfold", "remove_unknown_nodes",
+                     "keep_unknown_components", "keep_short_isolated_nodes", "disable_merge_neighbor")
+# Options naming files or databases, keyed by the size and modification time of their files
+PATH_PARAMETERS = ("kraken_out", "names_dmp", "nodes_dmp", "kraken_db", "blast_out", "blast_db")
+# Config settings that never change the unfolded graph
+RUNTIME_SETTINGS = ("prefix", "output_path", "max_threads", "stage_workers", "stage_concurrency", "batch_jobs",
+                    "serve_host", "serve_port", "serve_poll_interval", "keep_artifacts",
+                    "memory_sample_interval", "memory_trace_frames", "metrics_flush_interval", "packed_sequences",
+                    "edge_color", "node_shape", "length_range_mix", "length_range_max", "width_range_mix",
+                    "width_range_max", "color_dict", "kraken_memory_mapping", "standin_kraken_latency",
+                    "standin_blast_latency", "merge_pool_min_bases")
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _hash(*values):
+    text = json.dumps(values, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def _stage_settings():
+    """Config settings claimed by a stage, they are only part of the keys of that stage."""
+    claimed = set()
+    classes = [AbstrctUnfolder]
+    while classes:
+        stage = classes.pop()
+        claimed.update(stage.settings)
+        classes.extend(stage.__subclasses__())
+    return claimed
+
+def _graph_state(graph):
+    """Plain data of a graph keeping the order of nodes, successors and predecessors."""
+    nodes = list(graph._node)
+    return (dict(graph.graph),
+            [(node, dict(attributes)) for node, attributes in graph._node.items()],
+            [[(other, {key: dict(data) for key, data in keydict.items()}) for other, keydict in graph._succ[node].items()]
+             for node in nodes],
+            [list(graph._pred[node]) for node in nodes])
+
+def _graph_from_state(state):
+    graph_attributes, nodes, successors, predecessors = state
+    graph = gfaLib.IndexedMultiDiGraph()
+    graph.graph.update(graph_attributes)
+    graph.add_nodes_from(nodes)
+    names = [node for node, _ in nodes]
+    succ, pred = graph._succ, graph._pred
+    # Edge key dicts are shared by both directions as in MultiDiGraph.add_edge
+    for node, edges in zip(names, successors):
+        for other, keydict in edges:
+            succ[node][other] = keydict
+    for node, others in zip(names, predecessors):
+        for other in others:
+            pred[node][other] = succ[other][node]
+    return graph
+
+class StageCache:
+    """
+    Directory of stage checkpoints.
+    
+    A checkpoint file holds a header with the stage name and the node and
+    edge counts, readable without loading the graph, followed by the graph
+    nodes, successors and predecessors in their original order. Files are
+    written under a temporary name and renamed, so an interrupted run never
+    leaves a partial checkpoint.
+    
+    Parameters
+    ----------
+    path : str
+        Cache dir, created if needed
+    input_key : str
+        Key of the input graph, e.g. from `file_digest` of the GFA file
+    """
+    def __init__(self, path, input_key):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.input_key = _hash(FORMAT_VERSION, config.VERSION, input_key)
+        claimed = _stage_settings()
+        self.settings = {name: value for name, value in vars(config).items()
+                         if not name.startswith("_") and name not in RUNTIME_SETTINGS and name not in claimed
+                         and isinstance(value, (bool, int, float, str, list, tuple, dict, type(None)))}
+
+    def derive(self, *values):
+        """Return a cache of the same dir for an input derived from this one, e.g. a batch of components."""
+        cache = StageCache.__new__(StageCache)
+        cache.path, cache.settings = self.path, self.settings
+        cache.input_key = _hash(self.input_key, *values)
+        return cache
+
+    def stage_key(self, key, stage, options):
+        """
+        Return the key of the graph after running a stage.
+        
+        Parameters
+        ----------
+        key : str
+            Key of the stage input graph
+        stage : type
+            AbstrctUnfolder subclass
+        options : dict
+            Unfolder arguments by name, see UNFOLD_PARAMETERS
+        """
+        parameters = {}
+        for name in COMMON_PARAMETERS + stage.parameters:
+            value = options[name]
+            parameters[name] = shared.path_fingerprint(value) if name in PATH_PARAMETERS else value
+        settings = {name: getattr(config, name) for name in stage.settings}
+        return _hash(key, stage.__name__, parameters, settings, self.settings)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".ckpt")
+
+    def header(self, key):
+        """Return the header of a checkpoint, None if it is missing or unreadable."""
+        try:
+            with open(self._file(key), 'rb') as f:
+                header = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return header if isinstance(header, dict) and header.get("format") == FORMAT_VERSION else None
+
+    def save(self, key, graph, stage):
+        """Write the checkpoint of a graph after a stage."""
+        header = {"format": FORMAT_VERSION, "stage": stage,
+                  "nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()}
+        fd, temp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(_graph_state(graph), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self._file(key))
+        except BaseException:
+            os.remove(temp)
+            raise
+        monitor.metrics.count("bytes_written", os.path.getsize(self._file(key)), kind="checkpoint")
+
+    def load(self, key):
+        """Return the graph of a checkpoint as a gfaLib.IndexedMultiDiGraph."""
+        with open(self._file(key), 'rb') as f:
+            pickle.load(f)
+            return _graph_from_state(pickle.load(f))
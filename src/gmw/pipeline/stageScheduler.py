@@ -0,0 +1,144 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Stage scheduling of the unfold pipeline.
+Unfolders declare the graph resources they read while preparing and write
+while applying. The scheduler starts the prepare work of a stage (external
+tools, feature computation) as soon as no earlier pending stage writes what it
+reads, runs it in a thread pool and applies the graph changes strictly in
+pipeline order.
+"""
+
+import inspect
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import config
+import monitor
+import shared
+import unfoldGraph
+from unfoldGraph.abstrctUnfold import AbstrctUnfolder
+
+# Unfold order used when no pipeline file is given
+DEFAULT_STAGES = ["TaxonUnfolder", "RefUnfolder", "DepthUnfolder", "GCUnfolder", "EmptyUnfolder"]
+
+def load_pipeline(path=None):
+    """
+    Read a pipeline definition file.
+
+    The file is a JSON object with the list of unfolder class names to run in
+    order, and optionally whether independent stages may run concurrently:
+    {"stages": ["TaxonUnfolder", "RefUnfolder"], "concurrent": true}
+
+    Parameters
+    ----------
+    path : str, optional
+        Path of the pipeline file, the default pipeline if None.
+
+    Returns
+    -------
+    tuple
+        (list of unfolder classes, concurrent flag)
+    """
+    if path is None:
+        definition = {"stages": DEFAULT_STAGES}
+    else:
+        try:
+            with open(path, 'r') as f:
+                definition = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Pipeline file \"{path}\" is not valid JSON: {e}")
+        if not isinstance(definition, dict) or not definition.get("stages"):
+            raise ValueError(f"Pipeline file \"{path}\" must define a non-empty \"stages\" list.")
+    stages = []
+    for name in definition["stages"]:
+        stage = getattr(unfoldGraph, str(name), None)
+        if not (inspect.isclass(stage) and issubclass(stage, AbstrctUnfolder)) or stage is unfoldGraph.Polisher:
+            raise ValueError(f"Unknown unfold stage \"{name}\" in pipeline file \"{path}\".")
+        stages.append(stage)
+    return stages, bool(definition.get("concurrent", config.stage_concurrency))
+
+class StageScheduler:
+    """
+    Run one pass of unfolders, overlapping their read-only work.
+
+    Stage j is prepared once every stage i < j that is not applied yet writes
+    none of the resources j reads, so its prepared result is the same as in a
+    serial run up to nodes removed meanwhile, which the stages ignore.
+
+    Parameters
+    ----------
+    workers : int
+        Number of threads for prepared work, the work runs in the main thread
+        right before `apply` when below 1.
+    """
+    def __init__(self, workers):
+        self.workers = workers
+        self.logger = logging.getLogger("gmw")
+
+    def run(self, unfolders, applied=None):
+        """
+        Prepare and apply the unfolders.
+
+        Parameters
+        ----------
+        unfolders : list
+            AbstrctUnfolder instances sharing the same graph, in pipeline order.
+        applied : callable, optional
+            Called with the index of every unfolder once it is applied.
+        """
+        if self.workers < 1:
+            for i, unfolder in enumerate(unfolders):
+                with monitor.stage(unfolder.__class__.__name__, unfolder.graph, cprofile=True):
+                    unfolder.unfold_graph()
+                shared.logging_graph_info(unfolder.graph, unfolder.__class__.__name__)
+                if applied is not None:
+                    applied(i)
+            return
+        
+        prepared = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for i, unfolder in enumerate(unfolders):
+                self._prepare_ready(unfolders, i, prepared, executor)
+                with monitor.stage(unfolder.__class__.__name__, unfolder.graph, cprofile=True):
+                    unfolder.apply(prepared.pop(i).result())
+                shared.logging_graph_info(unfolder.graph, unfolder.__class__.__name__)
+                if applied is not None:
+                    applied(i)
+
+    def _prepare_ready(self, unfolders, applied, prepared, executor):
+        """Submit the prepared work of every pending stage whose inputs are final."""
+        pending_writes = set()
+        for j in range(applied, len(unfolders)):
+            unfolder = unfolders[j]
+            if j not in prepared and not pending_writes.intersection(unfolder.reads):
+                work = unfolder.prepare()
+                if work is None:
+                    prepared[j] = Future()
+                    prepared[j].set_result(None)
+                else:
+                    if j > applied:
+                        self.logger.info(f"Prepare {unfolder.__class__.__name__} concurrently.")
+                    prepared[j] = executor.submit(monitor.bind(work, unfolder.__class__.__name__ + ".prepare"))
+            pending_writes.update(unfolder.stage_writes())
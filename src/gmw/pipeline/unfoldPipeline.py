@@ -0,0 +1,247 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Serial unfold pipeline.
+This module runs the unfolders in a loop until the graph stops changing and
+then polishes the result. It is used by the command line interface for whole
+graphs and by the component executor for batches of components.
+"""
+
+import inspect
+import logging
+import time
+
+import artifacts
+import config
+import monitor
+import shared
+import unfoldGraph
+from unfoldGraph import bgll
+from unfoldGraph.abstrctUnfold import AbstrctUnfolder
+from pipeline.stageScheduler import StageScheduler, load_pipeline
+
+# Names of the positional arguments shared by every unfolder, graph first
+UNFOLD_PARAMETERS = list(inspect.signature(AbstrctUnfolder.__init__).parameters)[1:]
+
+class UnfoldPipeline:
+    """
+    Iterative unfolding of one assembly graph.
+
+    The enabled unfolders run in the order Taxon, Ref, Depth, GC and Empty
+    (merge brother/split parent), or in the order of a pipeline file, until
+    the number of nodes and edges stops changing, or once in fast mode. The
+    Polisher runs last. Each pass is run by a StageScheduler.
+
+    With `max_iterations` or a `deadline` no iteration starts past the limit,
+    or when the last measured time of its stages plus the Polisher and the
+    outputs would not fit before the deadline. The Polisher runs component
+    removal once and neighbour merging at least twice, it is estimated from
+    the slowest of these steps among the stages of the last iteration.
+    The final GFA and FASTA files are estimated by the last GFA artifact
+    write, twice, and the HTML file by the last HTML write. Nothing is
+    reserved for outputs with `--keep_artifacts final`. The first iteration
+    always runs while time is left.
+
+    With a StageCache the graph is checkpointed after every stage. The leading
+    stages whose checkpoints exist are skipped and the graph is loaded from
+    the last of them, the Polisher always runs.
+
+    Parameters
+    ----------
+    unfold_argv : list
+        Positional arguments of the unfolders, see UNFOLD_PARAMETERS.
+    fast : bool
+        Run the unfolders only once.
+    pipeline : str, optional
+        Pipeline file defining the unfolder order, see load_pipeline.
+    cache : StageCache, optional
+        Checkpoints of the stages, keyed from the cache input key.
+    max_iterations : int, optional
+        Maximum number of iterations.
+    deadline : float, optional
+        time.monotonic() value the Polisher should finish before.
+    """
+    def __init__(self, unfold_argv, fast, pipeline=None, cache=None, max_iterations=None, deadline=None):
+        self.unfold_argv = unfold_argv
+        self.options = dict(zip(UNFOLD_PARAMETERS, unfold_argv))
+        self.graph = self.options['graph']
+        self.fast = fast
+        self.pipeline_stages, self.concurrent = load_pipeline(pipeline)
+        self.cache = cache
+        self.max_iterations = max_iterations
+        self.deadline = deadline
+        # Seconds of the last run of every stage, by class name
+        self.stage_seconds = {}
+        # Longest component removal and neighbour merging of a stage in the last iteration
+        self.step_seconds = {}
+        # Unfolders and checkpoint keys of the running stages, end time of the last applied one
+        self._running = None
+        self._applied_at = None
+        self.logger = logging.getLogger("gmw")
+
+    def stages(self):
+        """Return the enabled unfolder classes in execution order."""
+        enabled = {
+            unfoldGraph.TaxonUnfolder: not self.options['disable_taxon_unfold'],
+            unfoldGraph.RefUnfolder: not self.options['disable_ref_unfold'],
+            unfoldGraph.DepthUnfolder: not self.options['disable_depth_unfold'],
+            unfoldGraph.GCUnfolder: not self.options['disable_gc_unfold'],
+            unfoldGraph.EmptyUnfolder: self.options['merge_brother'] or self.options['split_parent'],
+        }
+        return [stage for stage in self.pipeline_stages if enabled.get(stage, True)]
+
+    def run(self):
+        """
+        Unfold and polish the graph in place.
+
+        BGLL normalises every detection of the run by the edge weight of the
+        input graph, unless the caller already set `bgll.graph_m2`.
+
+        Returns
+        -------
+        networkx.MultiDiGraph
+            The processed graph, a new object when it was loaded from a checkpoint.
+        """
+        created_m2 = self.options['bgll'] and bgll.graph_m2 is None
+        if created_m2:
+            bgll.graph_m2 = bgll.backbone_m2(self.graph)
+        try:
+            return self._unfold()
+        finally:
+            if created_m2:
+                bgll.graph_m2 = None
+
+    def _unfold(self):
+        graph = self.graph
+        nodes_num = 0
+        edges_num = 0
+        counts = (graph.number_of_nodes(), graph.number_of_edges())
+        fast_flag = True
+        run_times = 1
+        scheduler = StageScheduler(config.stage_workers if self.concurrent else 0)
+        key = self.cache.input_key if self.cache is not None else None
+        # Checkpoint of the last skipped stage, loaded before the next stage runs
+        resume_key = None
+        resuming = self.cache is not None
+        
+        while counts != (nodes_num, edges_num) and fast_flag:
+            if self.max_iterations is not None and run_times > self.max_iterations:
+                self.logger.info(f"Stop after {self.max_iterations} unfold iterations, the limit of --max_iterations.")
+                monitor.metrics.event("iterations_stopped", reason="max_iterations", iterations=run_times - 1)
+                break
+            nodes_num, edges_num = counts
+            stages = self.stages()
+            keys = []
+            if self.cache is not None:
+                for stage in stages:
+                    key = self.cache.stage_key(key, stage, self.options)
+                    keys.append(key)
+            skipped = 0
+            while resuming and skipped < len(keys):
+                header = self.cache.header(keys[skipped])
+                if header is None:
+                    break
+                counts = (header["nodes"], header["edges"])
+                resume_key = keys[skipped]
+                skipped += 1
+            if skipped:
+                self.logger.info(f"Reuse the checkpoints of {', '.join(stage.__name__ for stage in stages[:skipped])} in unfold {run_times} times.")
+                monitor.metrics.count("stages_reused", skipped)
+            if not skipped or skipped < len(stages):
+                if not self._iteration_fits(stages[skipped:], run_times):
+                    break
+                self.step_seconds = {}
+                resuming = False
+                if resume_key is not None:
+                    graph = self._resume(resume_key)
+                    resume_key = None
+                self.logger.info(f"Start unfold {run_times} times.")
+                artifacts.set_iteration(run_times)
+                monitor.metrics.set_iteration(run_times)
+                self._running = ([stage(*self.unfold_argv) for stage in stages[skipped:]], keys[skipped:])
+                self._applied_at = time.monotonic()
+                with monitor.stage(f"iteration_{run_times}", graph):
+                    scheduler.run(self._running[0], self._stage_applied)
+                monitor.checkpoint(f"iteration_{run_times}", graph)
+                counts = (graph.number_of_nodes(), graph.number_of_edges())
+            if self.fast:
+                fast_flag = False
+            run_times += 1
+        if resume_key is not None:
+            graph = self._resume(resume_key)
+        
+        with monitor.stage("Polisher", graph, cprofile=True):
+            polisher = unfoldGraph.Polisher(*self.unfold_argv)
+            polisher.polish()
+        shared.logging_graph_info(graph, "Polisher")
+        monitor.checkpoint("polish", graph)
+        artifacts.flush()
+        return graph
+
+    def _stage_applied(self, i):
+        """Checkpoint the graph after the i-th running stage and record its time."""
+        unfolders, keys = self._running
+        if self.cache is not None:
+            self._checkpoint(keys[i], unfolders[i])
+        # Stages are applied in order, the time since the previous one includes
+        # the part of its prepared work that did not overlap earlier stages
+        now = time.monotonic()
+        self.stage_seconds[unfolders[i].__class__.__name__] = now - self._applied_at
+        self._applied_at = now
+        for step, seconds in unfolders[i].step_seconds.items():
+            self.step_seconds[step] = max(self.step_seconds.get(step, 0.0), seconds)
+
+    def _finish_seconds(self):
+        """Estimate the seconds of the Polisher and of writing the final outputs."""
+        polish = self.step_seconds.get("remove_components", 0.0) + 2 * self.step_seconds.get("merge_nodes", 0.0)
+        written = artifacts.write_seconds()
+        # The final GFA and FASTA files hold the same sequences
+        return polish + 2 * written.get("gfa", 0.0) + written.get("html", 0.0)
+
+    def _iteration_fits(self, stages, run_times):
+        """Return whether an iteration of the stages, the Polisher and the outputs fit before the deadline."""
+        if self.deadline is None:
+            return True
+        remaining = self.deadline - time.monotonic()
+        needed = 0.0
+        if self.stage_seconds:
+            needed = sum(self.stage_seconds.get(stage.__name__, 0.0) for stage in stages) + self._finish_seconds()
+        if remaining > 0 and needed < remaining:
+            return True
+        self.logger.info(f"Stop before unfold {run_times} times, it needs about {needed:.1f} s and {max(remaining, 0):.1f} s are left of --max_runtime.")
+        monitor.metrics.event("iterations_stopped", reason="max_runtime", iterations=run_times - 1)
+        return False
+
+    def _checkpoint(self, key, unfolder):
+        with monitor.stage("checkpoint"):
+            self.cache.save(key, unfolder.graph, unfolder.__class__.__name__)
+
+    def _resume(self, key):
+        """Replace the graph by a checkpoint."""
+        self.logger.info(f"Resume from checkpoint \"{key}\".")
+        with monitor.stage("resume"):
+            graph = self.cache.load(key)
+        self.graph = graph
+        self.options['graph'] = graph
+        self.unfold_argv[0] = graph
+        return graph
@@ -0,0 +1,309 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Preview mode of GMW. Unfold a stratified sample of the weakly connected
+components of one GFA file with the configured pipeline and extrapolate the
+runtime and memory of every stage and the nodes and edges a full run removes.
+"""
+
+import click
+import logging
+import math
+import os
+import json
+import random
+import time
+import networkx as nx
+import config
+import gfaLib
+import monitor
+import pipeline
+import shared
+import standin
+import cli as gmw_cli
+logger = logging.getLogger("gmw")
+
+# Query of the calibration calls of the external tools
+CALIBRATION_SEQUENCE = "ACGTTGCATGCCAGTA" * 8
+
+def component_sizes(graph):
+    """
+    Return the weakly connected components of a graph and their sizes.
+    
+    The size of a component is its number of nodes and edges, as used to
+    balance the batches of `pipeline.ComponentExecutor`.
+    
+    Returns
+    -------
+    tuple
+        (list of node sets, list of sizes)
+    """
+    components = list(nx.weakly_connected_components(graph))
+    sizes = [len(component) + sum(d for _, d in graph.out_degree(component)) for component in components]
+    return components, sizes
+
+def sample_components(sizes, fraction, seed=config.preview_seed):
+    """
+    Draw a stratified sample of components.
+    
+    Components are grouped in strata of sizes within a factor of 2 and
+    ceil(fraction * count) components, at least one, are drawn from every
+    stratum, so the rare large components are always represented.
+    
+    Parameters
+    ----------
+    sizes : list
+        Size of every component
+    fraction : float
+        Share of the components drawn from every stratum
+    seed : int
+        Seed of the random generator, the same seed gives the same sample
+        
+    Returns
+    -------
+    dict
+        Stratum of every sampled component index
+    dict
+        Number of components of every stratum
+    """
+    strata = {}
+    for i, size in enumerate(sizes):
+        strata.setdefault(size.bit_length(), []).append(i)
+    rng = random.Random(seed)
+    sample = {}
+    for stratum in sorted(strata):
+        members = strata[stratum]
+        for i in rng.sample(members, min(len(members), math.ceil(fraction * len(members)))):
+            sample[i] = stratum
+    return sample, {stratum: len(members) for stratum, members in strata.items()}
+
+def predict_survivors(result, node_stratum, weights, default_weight):
+    """
+    Predict the nodes and edges left by a full run from the result of the sample.
+    
+    Every surviving node and its out edges count for the number of components
+    its sampled component stands for in its stratum. Nodes renamed by the
+    unfold stages count with `default_weight`.
+    
+    Returns
+    -------
+    tuple
+        (predicted nodes, predicted edges)
+    """
+    nodes = 0.0
+    edges = 0.0
+    for node in result.nodes:
+        weight = weights[node_stratum[node]] if node in node_stratum else default_weight
+        nodes += weight
+        edges += weight * result.out_degree(node)
+    return nodes, edges
+
+def measure_call_seconds(rows, options, outdir, prefix):
+    """
+    Measure the fixed cost of one call of every external tool run by the sample.
+    
+    Every tool stage of the profile is run once more on one short sequence,
+    which takes about as long as starting the tool and loading its database.
+    The seconds of `config.preview_call_seconds` are used instead of a
+    measurement.
+    
+    Parameters
+    ----------
+    rows : list
+        Profile rows of the sample
+    options : dict
+        Unfold options of the run
+    outdir : str
+        Dir of the calibration files
+    prefix : str
+        Prefix of the calibration files
+        
+    Returns
+    -------
+    dict
+        Fixed seconds of one call by tool stage name
+    """
+    stages = {row["path"].rsplit("/", 1)[-1] for row in rows}
+    if options["standin_tools"]:
+        standin.enable()
+    try:
+        tools = {"tool_" + os.path.basename(config.kraken_path):
+                     lambda fasta, out: shared.run_kraken(fasta, options["kraken_db"], out, threads=options["threads"]),
+                 "tool_" + os.path.basename(config.blast_path):
+                     lambda fasta, out: shared.run_blast(fasta, options["blast_db"], out, threads=options["threads"])}
+        call_seconds = {}
+        for name, tool in tools.items():
+            if name not in stages:
+                continue
+            if name in config.preview_call_seconds:
+                call_seconds[name] = config.preview_call_seconds[name]
+                continue
+            os.makedirs(outdir, exist_ok=True)
+            fasta = outdir + "/" + prefix + "_calibration.fa"
+            with open(fasta, 'w') as f:
+                f.write(">calibration\n" + CALIBRATION_SEQUENCE + "\n")
+            start = time.perf_counter()
+            tool(fasta, outdir + "/" + prefix + "_" + name + ".txt")
+            call_seconds[name] = time.perf_counter() - start
+            logger.info(f"Measured {call_seconds[name]:.2f} s for one call of {name}.")
+    finally:
+        if options["standin_tools"]:
+            standin.disable()
+    return call_seconds
+
+def fixed_seconds(rows, call_seconds):
+    """
+    Return the seconds of every stage spent in fixed per-call tool costs.
+    
+    A tool stage holds its calls times the fixed cost of one call, at most its
+    wall time, and every enclosing stage holds the sum of its tool stages.
+    
+    Returns
+    -------
+    dict
+        Fixed seconds by stage path
+    """
+    fixed = {}
+    for row in rows:
+        parts = row["path"].split("/")
+        seconds = call_seconds.get(parts[-1])
+        if seconds is None:
+            continue
+        seconds = min(row["wall_seconds"], seconds * row["calls"])
+        for i in range(1, len(parts) + 1):
+            path = "/".join(parts[:i])
+            fixed[path] = fixed.get(path, 0.0) + seconds
+    return fixed
+
+def _read_profile(outdir, prefix):
+    with open(outdir + "/" + prefix + "_profile.json", 'r') as f:
+        return json.load(f)["summary"]
+
+@click.command()
+@click.version_option(config.VERSION, "--version", "-v")
+@click.option("--gfa", "-g", required=True, type=click.Path(exists=True, dir_okay=False), help="Input gfa file.")
+@click.option("--outdir", "-o", default=config.output_path, help="Path of preview output files. The sample is unfolded in outdir/sample.")
+@click.option("--prefix", "-p", default=config.prefix, help="Prefix of output files.")
+@click.option("--sample_fraction", default=config.preview_fraction, type=click.FloatRange(0, 1, min_open=True),
+              help="Share of the components of every size stratum unfolded.")
+@click.option("--seed", default=config.preview_seed, type=int, help="Seed of the component sample.")
+@click.option("--skip_memory", is_flag=True, help="Do not unfold the sample a second time to measure the memory of every stage.")
+@gmw_cli.unfold_options
+def preview(gfa, outdir, prefix, sample_fraction, seed, skip_memory, **options):
+    """
+    GMW preview mode: estimate the runtime, memory and graph reduction of a run from a sample of its components.
+    """
+    outdir = os.path.normpath(outdir)
+    os.makedirs(outdir, exist_ok=True)
+    gmw_cli.setup_logging(outdir, prefix + "_preview")
+    
+    logger.info(f"Parse gfa file \"{gfa}\".")
+    rss_before = monitor.memory.current_rss()
+    start = time.perf_counter()
+    gfa_graph = gfaLib.GraphFromFile(gfa, packed_sequences=config.packed_sequences)
+    parse_seconds = time.perf_counter() - start
+    parse_mb = max(0, monitor.memory.current_rss() - rss_before) / monitor.memory.MB
+    graph = gfaLib.GFANetwork.compute_backbone(gfa_graph)
+    total_nodes = graph.number_of_nodes()
+    total_edges = graph.number_of_edges()
+    
+    components, sizes = component_sizes(graph)
+    sample, strata = sample_components(sizes, sample_fraction, seed)
+    sampled = {}
+    node_stratum = {}
+    for i, stratum in sample.items():
+        sampled[stratum] = sampled.get(stratum, 0) + 1
+        for node in components[i]:
+            node_stratum[node] = stratum
+    weights = {stratum: strata[stratum] / sampled[stratum] for stratum in strata}
+    sample_edges = sum(d for _, d in graph.out_degree(node_stratum))
+    sample_size = sum(sizes[i] for i in sample)
+    scale = sum(sizes) / sample_size if sample_size else 0.0
+    sample_graph = pipeline.source_subgraph(gfa_graph, node_stratum)
+    del graph
+    logger.info(f"Sampled {len(sample)} of {len(components)} components in {len(strata)} size strata, "
+                f"{len(node_stratum)} of {total_nodes} nodes, size scale {scale:.2f}.")
+    
+    # The sample is preview scratch output, the time limit and the checkpoints belong to the full run
+    max_runtime = options["max_runtime"]
+    options.update(force=True, profile=True, profile_memory=False, max_runtime=None, cache_dir=None)
+    sample_outdir = outdir + "/sample"
+    result = gmw_cli.run_gmw(gfa=gfa, outdir=sample_outdir, prefix=prefix, gfa_graph=sample_graph, **options)
+    rows = _read_profile(sample_outdir, prefix)
+    if not skip_memory:
+        # Traced allocations slow the stages down, so memory is measured in a run of its own
+        options["profile_memory"] = True
+        memory_outdir = outdir + "/sample_memory"
+        gmw_cli.run_gmw(gfa=gfa, outdir=memory_outdir, prefix=prefix, gfa_graph=sample_graph, **options)
+        memory_rows = {row["path"]: row for row in _read_profile(memory_outdir, prefix)}
+        for row in rows:
+            row["traced_peak_mb"] = memory_rows.get(row["path"], {}).get("traced_peak_mb")
+    gmw_cli.setup_logging(outdir, prefix + "_preview")
+    
+    node_scale = total_nodes / len(node_stratum) if node_stratum else 0.0
+    nodes_left, edges_left = predict_survivors(result, node_stratum, weights, node_scale)
+    # Stage deltas follow the stratum weights of the survivors, small and large components shrink differently
+    nodes_removed = len(node_stratum) - result.number_of_nodes()
+    node_scale = (total_nodes - nodes_left) / nodes_removed if nodes_removed else node_scale
+    edges_removed = sample_edges - result.number_of_edges()
+    edge_scale = total_edges / sample_edges if sample_edges else 0.0
+    edge_scale = (total_edges - edges_left) / edges_removed if edges_removed else edge_scale
+    # Starting a tool and loading its database does not grow with the graph, only the rest of a stage is scaled
+    fixed = fixed_seconds(rows, measure_call_seconds(rows, options, outdir + "/calibration", prefix))
+    
+    columns = ["stage", "calls", "sample_seconds", "predicted_seconds", "sample_nodes_delta", "predicted_nodes_delta",
+               "sample_edges_delta", "predicted_edges_delta"]
+    if not skip_memory:
+        columns += ["sample_traced_peak_mb", "predicted_traced_peak_mb"]
+    report = [["parse", 1, "", round(parse_seconds, 3), "", "", "", ""] + (["", ""] if not skip_memory else [])]
+    predicted_seconds = parse_seconds
+    predicted_peak = 0.0
+    for row in rows:
+        seconds = fixed.get(row["path"], 0.0)
+        seconds += (row["wall_seconds"] - seconds) * scale
+        line = [row["path"], row["calls"], round(row["wall_seconds"], 3), round(seconds, 3),
+                row["nodes_delta"], round(row["nodes_delta"] * node_scale), row["edges_delta"], round(row["edges_delta"] * edge_scale)]
+        if not skip_memory:
+            peak = row.get("traced_peak_mb")
+            line += [peak if peak is not None else "", round(peak * scale, 3) if peak is not None else ""]
+            if peak is not None and row["depth"] == 0:
+                predicted_peak = max(predicted_peak, peak * scale)
+        if row["depth"] == 0:
+            predicted_seconds += seconds
+        report.append(line)
+    report_path = outdir + "/" + prefix + "_preview.tsv"
+    with open(report_path, 'w') as f:
+        f.write("\t".join(columns) + "\n")
+        for line in report:
+            f.write("\t".join(str(value) for value in line) + "\n")
+    
+    logger.info(f"Predicted runtime: {predicted_seconds:.1f} s, parsing measured {parse_seconds:.1f} s.")
+    if max_runtime is not None and predicted_seconds > max_runtime:
+        logger.warning(f"The predicted runtime exceeds --max_runtime {max_runtime} s, the run will stop after fewer iterations.")
+    if not skip_memory:
+        logger.info(f"Predicted memory: {parse_mb:.1f} MB RSS of the parsed file (measured) and a traced peak of {predicted_peak:.1f} MB.")
+    logger.info(f"Predicted to remove {total_nodes - round(nodes_left)} of {total_nodes} nodes and "
+                f"{total_edges - round(edges_left)} of {total_edges} edges. Report: {report_path}")
+
+if __name__ == "__main__":
+    preview(prog_name="python src/gmw/preview.py -g input.gfa --sample_fraction 0.05")
@@ -0,0 +1,439 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Resident GMW server. The server keeps the taxonomy, the tool result cache and
+a pool of worker processes alive and runs unfold jobs submitted over localhost
+HTTP or a Unix domain socket. The submit command is a thin client taking the
+same options as cli.py.
+
+The HTTP server binds loopback addresses only and every request must carry the
+token the server writes into a file readable by its owner, the Unix domain
+socket is only accessible to its owner.
+
+API (JSON):
+- POST /jobs        submit a job {"gfa", "outdir", "prefix", "options"}
+- GET  /jobs        list all jobs
+- GET  /jobs/<id>   status of one job
+"""
+
+import click
+import hmac
+import http.client
+import http.server
+import ipaddress
+import json
+import logging
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+import config
+import shared
+import batch
+import cli as gmw_cli
+from unfoldGraph import taxon
+logger = logging.getLogger("gmw")
+
+@gmw_cli.unfold_options
+def _unfold_defaults(**options):
+    pass
+
+# Click option of every unfold option, used to check the type of submitted values
+UNFOLD_PARAMS = {param.name: param for param in _unfold_defaults.__click_params__}
+# Default value of every unfold option as parsed from an empty command line, used to complete submitted options
+UNFOLD_DEFAULTS = click.Command("defaults", params=list(UNFOLD_PARAMS.values())).make_context("defaults", []).params
+# Unfold options holding a file or dir
+PATH_OPTIONS = ("kraken_out", "taxon_db", "kraken_db", "blast_out", "blast_db", "pipeline_file", "cache_dir")
+
+def convert_option(name, value):
+    """
+    Convert a submitted option value with the type of its command line option.
+    
+    Raises
+    ------
+    ValueError
+        If the value does not fit the option
+    """
+    param = UNFOLD_PARAMS[name]
+    if value is None and UNFOLD_DEFAULTS[name] is None:
+        return None
+    if value is None or isinstance(value, (list, dict)):
+        raise ValueError(f"Invalid value {json.dumps(value)} of option {name}.")
+    try:
+        return param.type.convert(value, param, None)
+    except click.BadParameter as e:
+        raise ValueError(e.format_message())
+
+class JobManager:
+    """
+    Queue of unfold jobs running on a pool of forked worker processes.
+    
+    Parameters
+    ----------
+    workers : int
+        Number of jobs running at the same time
+    """
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = self._start_pool()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+    def _start_pool(self):
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def submit(self, request):
+        """
+        Validate a job request and queue it.
+        
+        A pool broken by a dead worker is replaced once, its queued jobs fail.
+        
+        Returns
+        -------
+        dict
+            Status of the new job
+        
+        Raises
+        ------
+        ValueError
+            If the request is invalid
+        BrokenExecutor, RuntimeError
+            If no worker pool takes the job
+        """
+        gfa = request.get("gfa")
+        outdir = request.get("outdir")
+        if not gfa or not os.path.isfile(gfa):
+            raise ValueError(f"Gfa file \"{gfa}\" not exist.")
+        if not outdir:
+            raise ValueError("Job needs an output dir.")
+        prefix = request.get("prefix") or config.prefix
+        submitted = request.get("options", {})
+        if not isinstance(submitted, dict):
+            raise ValueError("Job options must be a JSON object.")
+        options = dict(UNFOLD_DEFAULTS)
+        unknown = set(submitted) - set(options)
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        for name, value in submitted.items():
+            options[name] = convert_option(name, value)
+        # Absolute paths keep the cache key of the preloaded taxonomy and do not depend on the server's working dir
+        for key in PATH_OPTIONS:
+            if options[key] is not None:
+                options[key] = os.path.abspath(options[key])
+        gfa = os.path.abspath(gfa)
+        outdir = os.path.abspath(outdir)
+        
+        with self.lock:
+            job_id = str(self.next_id)
+            job = {"id": job_id, "gfa": gfa, "outdir": outdir, "prefix": prefix, "status": "queued",
+                   "submitted": time.time(), "nodes": None, "edges": None, "seconds": None, "error": None}
+            try:
+                job["future"] = self.executor.submit(batch._run_sample, gfa, prefix, outdir, options)
+            except BrokenExecutor:
+                logger.warning("A worker process died, start a new worker pool.")
+                self.executor.shutdown(wait=False)
+                self.executor = self._start_pool()
+                job["future"] = self.executor.submit(batch._run_sample, gfa, prefix, outdir, options)
+            self.next_id += 1
+            self.jobs[job_id] = job
+        job["future"].add_done_callback(lambda future: self._finish(job, future))
+        logger.info(f"Job {job_id} queued: \"{gfa}\" -> \"{outdir}\".")
+        return self.status(job_id)
+
+    def _finish(self, job, future):
+        if future.exception() is not None:
+            job.update(status="failed", error=str(future.exception()))
+        else:
+            _, _, status, nodes, edges, seconds, error = future.result()
+            job.update(status=status, nodes=nodes or None, edges=edges or None, seconds=float(seconds), error=error or None)
+        logger.info(f"Job {job['id']} {job['status']}.")
+
+    def status(self, job_id):
+        """Return the status of a job as a JSON serializable dict, None if the job does not exist."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        status = {key: value for key, value in job.items() if key != "future"}
+        if status["status"] == "queued" and job["future"].running():
+            status["status"] = "running"
+        return status
+
+    def list(self):
+        return [self.status(job_id) for job_id in list(self.jobs)]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class JobRequestHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP handler of the job API, the JobManager is set on the server."""
+
+    def address_string(self):
+        # Unix socket clients have no address tuple
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "local"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _reply(self, code, data):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        """Check the token of the request, requests over the Unix socket need none."""
+        token = getattr(self.server, "token", None)
+        if token is None:
+            return True
+        if hmac.compare_digest(self.headers.get("Authorization", ""), "Bearer " + token):
+            return True
+        self._reply(401, {"error": "missing or invalid token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        manager = self.server.manager
+        if self.path.rstrip("/") == "/jobs":
+            self._reply(200, manager.list())
+        elif self.path.startswith("/jobs/"):
+            status = manager.status(self.path[len("/jobs/"):])
+            if status is None:
+                self._reply(404, {"error": "job not found"})
+            else:
+                self._reply(200, status)
+        else:
+            self._reply(404, {"error": "unknown path"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            self._reply(404, {"error": "unknown path"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            self._reply(201, self.server.manager.submit(request))
+        except (ValueError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+        except (BrokenExecutor, RuntimeError) as e:
+            # A pool that can not be restarted or a server shutting down
+            logger.error(f"Job not queued: {type(e).__name__}: {e}")
+            self._reply(503, {"error": f"worker pool unavailable: {e}"})
+        except Exception as e:
+            logger.exception("Job submission failed.")
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+    def __init__(self, path, timeout=60):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def _is_loopback(host):
+    """Return True if the host resolves to a loopback address."""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+def _write_token(token_file):
+    """Write a new access token into a file readable by its owner only and return it."""
+    token = secrets.token_hex(32)
+    if os.path.exists(token_file):
+        os.remove(token_file)
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token + "\n")
+    return token
+
+def _read_token(token_file):
+    try:
+        with open(token_file, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        raise click.ClickException(f"Can not read the server token file \"{token_file}\", is the server started?")
+
+def _request(socket_path, host, port, token_file, method, path, data=None):
+    """Send one request to the server and return (status code, decoded JSON)."""
+    headers = {"Content-Type": "application/json"}
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        headers["Authorization"] = "Bearer " + _read_token(token_file)
+    try:
+        body = json.dumps(data) if data is not None else None
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+def server_options(func):
+    """Decorate a click command with the options locating the server."""
+    func = click.option("--port", default=config.serve_port, type=int, help="Localhost port of the server.")(func)
+    func = click.option("--host", default=config.serve_host, help="Host of the server.")(func)
+    func = click.option("--socket", "socket_path", help="Unix domain socket of the server, used instead of host and port.")(func)
+    func = click.option("--token_file", default=config.serve_token_file, help="File of the access token of the HTTP server.")(func)
+    return func
+
+@click.group()
+@click.version_option(config.VERSION, "--version", "-v")
+def serve():
+    """
+    GMW server mode: keep databases and workers warm and run submitted jobs.
+    """
+    pass
+
+def _stop_server(signum, frame):
+    raise KeyboardInterrupt
+
+@serve.command()
+@server_options
+@click.option("--workdir", "-w", default="./gmw_serve", help="Dir of the server log and tool cache.")
+@click.option("--jobs", "-j", default=config.batch_jobs, type=int, help="Number of jobs running at the same time.")
+@click.option("--taxon_db", multiple=True, help="Taxonomy database dir loaded at startup, can be given several times.")
+@click.option("--disable_tool_cache", is_flag=True, help="Do not share kraken2 and blastn results between jobs.")
+def start(socket_path, token_file, host, port, workdir, jobs, taxon_db, disable_tool_cache):
+    """
+    Start the server and run jobs until interrupted.
+    """
+    if not socket_path and not _is_loopback(host):
+        raise click.BadParameter(f"\"{host}\" is not a loopback address, the server only accepts local clients.", param_hint="--host")
+    workdir = os.path.normpath(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    gmw_cli.setup_logging(workdir, "gmw_serve")
+    
+    # Loaded before the workers are forked so every job finds them in memory
+    for db in taxon_db:
+        db = os.path.abspath(db)
+        logger.info(f"Load taxonomy database \"{db}\".")
+        taxon.load_taxon_parser(db + "/names.dmp", db + "/nodes.dmp")
+    if not disable_tool_cache:
+        shared.tool_cache = shared.ToolCache(workdir + "/gmw_tool_cache.sqlite")
+        logger.info(f"Share tool results through \"{shared.tool_cache.path}\".")
+    config.kraken_memory_mapping = True
+    
+    manager = JobManager(max(1, jobs))
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        # Created accessible to its owner only
+        umask = os.umask(0o177)
+        try:
+            server = UnixHTTPServer(socket_path, JobRequestHandler)
+        finally:
+            os.umask(umask)
+        server.token = None
+        logger.info(f"Listening on unix socket \"{socket_path}\".")
+    else:
+        server = http.server.ThreadingHTTPServer((host, port), JobRequestHandler)
+        server.token = _write_token(token_file)
+        logger.info(f"Listening on http://{host}:{port}, access token in \"{token_file}\".")
+    server.manager = manager
+    signal.signal(signal.SIGTERM, _stop_server)
+    signal.signal(signal.SIGINT, _stop_server)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Server interrupted, waiting for running jobs.")
+    finally:
+        server.server_close()
+        manager.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        if not socket_path and os.path.exists(token_file):
+            os.remove(token_file)
+
+@serve.command()
+@server_options
+@click.option("--gfa", "-g", required=True, type=click.Path(exists=True, dir_okay=False), help="Input gfa file.")
+@click.option("--outdir", "-o", default=config.output_path, help="Path of output files.")
+@click.option("--prefix", "-p", default=config.prefix, help="Prefix of output dir and files.")
+@click.option("--no_wait", is_flag=True, help="Return after the job is queued.")
+@gmw_cli.unfold_options
+def submit(socket_path, token_file, host, port, gfa, outdir, prefix, no_wait, **options):
+    """
+    Submit one unfold job, options are the same as cli.py.
+    """
+    # The server may run in another working dir
+    for key in PATH_OPTIONS:
+        if options[key] is not None:
+            options[key] = os.path.abspath(options[key])
+    request = {"gfa": os.path.abspath(gfa), "outdir": os.path.abspath(outdir), "prefix": prefix, "options": options}
+    code, job = _request(socket_path, host, port, token_file, "POST", "/jobs", request)
+    if code != 201:
+        print(f"  Error! {job['error']}")
+        sys.exit(1)
+    print(f"Job {job['id']} {job['status']}.")
+    if no_wait:
+        return
+    
+    status = job["status"]
+    while job["status"] in ("queued", "running"):
+        time.sleep(config.serve_poll_interval)
+        _, job = _request(socket_path, host, port, token_file, "GET", "/jobs/" + job["id"])
+        if job["status"] != status:
+            status = job["status"]
+            print(f"Job {job['id']} {status}.")
+    if job["status"] != "done":
+        print(f"  Error! {job['error']}, see {job['outdir']}/{job['prefix']}.log")
+        sys.exit(1)
+    print(f"The graph have {job['nodes']} nodes and {job['edges']} edges. Output dir: {job['outdir']}")
+
+@serve.command()
+@server_options
+@click.argument("job_id", required=False)
+def status(socket_path, token_file, host, port, job_id):
+    """
+    Show the status of one job or of all jobs.
+    """
+    code, data = _request(socket_path, host, port, token_file, "GET", "/jobs/" + job_id if job_id else "/jobs")
+    if code != 200:
+        print(f"  Error! {data['error']}")
+        sys.exit(1)
+    for job in data if isinstance(data, list) else [data]:
+        print("\t".join(str(job[key]) for key in ("id", "status", "prefix", "gfa", "outdir", "seconds", "error")))
+
+if __name__ == "__main__":
+    serve(prog_name="python src/gmw/serve.py")
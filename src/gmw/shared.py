@@ -30,14 +30,23 @@ external tool execution, and graph filtering operations.
 The utilities support common operations like:
 - DNA sequence reverse complement calculation
 - Graph to FASTA conversion
-- External tool execution (BLAST, Kraken)
+- External tool execution (BLAST, Kraken) with an optional result cache
 - Graph component filtering and cleanup
+- Graph size logging
 """
 
+import glob
+import json
 import os
 import subprocess
+import hashlib
+import sqlite3
+import threading
+import time
 import networkx as nx
 import logging
+import monitor
+import gfaLib
 
 import config
 
@@ -61,14 +70,16 @@ def reverse_complement(seq):
     degenerate nucleotide codes (IUPAC ambiguity codes). It reverses the
     sequence and replaces each base with its complement.
     
+    A PackedSequence gives back its reverse complement view without copying.
+    
     Parameters
     ----------
-    seq : str
+    seq : str or gfaLib.PackedSequence
         Input DNA sequence string containing valid nucleotide characters
         
     Returns
     -------
-    str
+    str or gfaLib.PackedSequence
         Reverse complement of the input sequence
         
     Raises
@@ -85,6 +96,8 @@ def reverse_complement(seq):
     >>> reverse_complement("ATCGN")
     'NCGAT'
     """
+    if isinstance(seq, gfaLib.PackedSequence):
+        return seq.reverse_complement()
     # Mapping of nucleotides to their complements (supports IUPAC codes)
     complement_dict = {
         'A': 'T', 'T': 'A', 'C': 'G', 'G': 'C',
@@ -105,6 +118,24 @@ def reverse_complement(seq):
     # Generate reverse complement
     return ''.join([complement_dict[base] for base in reversed(seq)])
 
+def pack_sequence(seq):
+    """
+    Store a sequence the way config.packed_sequences asks for.
+    
+    Parameters
+    ----------
+    seq : str or gfaLib.PackedSequence
+        Sequence to store on a node
+        
+    Returns
+    -------
+    str or gfaLib.PackedSequence
+        PackedSequence when config.packed_sequences is set, str otherwise
+    """
+    if config.packed_sequences:
+        return gfaLib.PackedSequence(seq)
+    return str(seq)
+
 def graph2fasta(graph, file_path, orientation=False):
     """
     Convert a NetworkX graph to FASTA format file.
@@ -133,21 +164,240 @@ def graph2fasta(graph, file_path, orientation=False):
         for node in graph.nodes:
             f.write(">" + str(node) + "\n")
             if orientation and graph.nodes[node]['OR'] == '-':
-                f.write(reverse_complement(graph.nodes[node]['seq']) + "\n")
+                f.write(str(reverse_complement(graph.nodes[node]['seq'])) + "\n")
             else:
-                f.write(graph.nodes[node]['seq'] + "\n")
+                f.write(str(graph.nodes[node]['seq']) + "\n")
+        monitor.metrics.count("bytes_written", f.tell(), kind="fasta")
+
+def logging_graph_info(graph, stage=None):
+    """
+    Log the number of nodes and edges of the graph.
+    
+    Parameters
+    ----------
+    graph : networkx.Graph
+        Graph to report
+    stage : str, optional
+        Step that produced the graph, recorded in the run metrics
+    """
+    nodes_num = graph.number_of_nodes()
+    edges_num = graph.number_of_edges()
+    logger.info(f"The graph have {nodes_num} nodes and {edges_num} edges.")
+    monitor.metrics.graph_size(graph, stage)
 
 def run_blast(fasta, db, out, threads=config.max_threads):
-    commands = [config.blast_path, '-query', fasta, '-db', db, '-num_threads', str(threads), '-outfmt', '6 qaccver saccver pident length mismatch gapopen qstart qend sstart send evalue bitscore qcovs', '-out',
-            out, '-max_target_seqs', '5']
-    logger.info(' '.join(commands))
-    result = subprocess.check_call(commands)
+    def command(query, result):
+        return [config.blast_path, '-query', query, '-db', db, '-num_threads', str(threads), '-outfmt', '6 qaccver saccver pident length mismatch gapopen qstart qend sstart send evalue bitscore qcovs', '-out',
+                result, '-max_target_seqs', '5']
+    _run_tool(os.path.basename(config.blast_path), db, fasta, out, 0, command)
     
 def run_kraken(fasta, db, output, threads=config.max_threads):
-    commands = [config.kraken_path, "--db", db, "--output", output, "--threads", str(threads), "--confidence", str(config.confidence), fasta]
+    def command(query, result):
+        commands = [config.kraken_path, "--db", db, "--output", result, "--threads", str(threads), "--confidence", str(config.confidence)]
+        if config.kraken_memory_mapping:
+            commands.append("--memory-mapping")
+        commands.append(query)
+        return commands
+    _run_tool(f"{os.path.basename(config.kraken_path)} confidence {config.confidence}", db, fasta, output, 1, command)
+
+def _run_tool(tool, db, fasta, out, id_column, command):
+    """
+    Run an external tool on a FASTA file, through the tool cache if one is set.
+    
+    Parameters
+    ----------
+    tool : str
+        Tool name and result-changing settings, part of the cache key
+    db : str
+        Database path, part of the cache key
+    fasta : str
+        Query FASTA file
+    out : str
+        Tool output file
+    id_column : int
+        Column of the query id in the tab separated tool output
+    command : callable
+        Build the command line from a query file and an output file
+    """
+    if tool_cache is None:
+        _execute(command(fasta, out))
+    else:
+        tool_cache.run(tool, db, fasta, out, id_column, command)
+
+def _execute(commands):
     logger.info(' '.join(commands))
-    result = subprocess.check_call(commands)
+    tool = os.path.basename(commands[0])
+    start = time.perf_counter()
+    with monitor.stage("tool_" + tool):
+        subprocess.check_call(commands)
+    monitor.metrics.observe("tool_seconds", time.perf_counter() - start, tool=tool)
+
+def read_fasta(file_path):
+    """
+    Read a FASTA file into a list of (name, sequence) tuples.
+    """
+    records = []
+    name = None
+    seq = []
+    with open(file_path, 'r') as f:
+        for line in f:
+            line = line.rstrip()
+            if line.startswith('>'):
+                if name is not None:
+                    records.append((name, ''.join(seq)))
+                name = line[1:].split()[0]
+                seq = []
+            else:
+                seq.append(line)
+    if name is not None:
+        records.append((name, ''.join(seq)))
+    return records
+
+def path_fingerprint(path):
+    """Files of a path (a file, a dir or a blast database prefix) with their size and mtime."""
+    if path is None:
+        return None
+    path = os.path.realpath(path)
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path))
+    elif os.path.exists(path):
+        files = [path]
+    else:
+        files = sorted(glob.glob(glob.escape(path) + ".*"))
+    fingerprint = [path]
+    for file in files:
+        if os.path.isfile(file):
+            stat = os.stat(file)
+            fingerprint.append([os.path.basename(file), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+class ToolCache:
+    """
+    Persistent cache of kraken2 and blastn results keyed by sequence content.
+    
+    The result lines of every query sequence are stored in a SQLite database
+    under (tool, database, SHA-1 of the sequence). The database is identified
+    by its path and the size and mtime of its files, so the results of a
+    rebuilt database are not reused. Only sequences missing from the cache are
+    sent to the tool, so samples and iterations sharing contigs reuse earlier
+    results. The database can be shared by several processes.
+    
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._connections = {}
+
+    def _connect(self):
+        # SQLite connections must not cross a fork or a thread
+        key = (os.getpid(), threading.get_ident())
+        if key not in self._connections:
+            connection = sqlite3.connect(self.path, timeout=600)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results "
+                               "(tool TEXT, db TEXT, digest TEXT, lines TEXT, PRIMARY KEY (tool, db, digest))")
+            self._connections[key] = connection
+        return self._connections[key]
+
+    @monitor.traced_category("tool_results")
+    def get(self, tool, db, digests):
+        """Return the cached result lines of the given sequence digests."""
+        connection = self._connect()
+        cached = {}
+        digests = list(digests)
+        for i in range(0, len(digests), 500):
+            chunk = digests[i:i + 500]
+            query = "SELECT digest, lines FROM results WHERE tool = ? AND db = ? AND digest IN (" + ",".join("?" * len(chunk)) + ")"
+            for digest, lines in connection.execute(query, [tool, db, *chunk]):
+                cached[digest] = lines.split('\n') if lines else []
+        return cached
+
+    def put(self, tool, db, results):
+        """Store result lines per sequence digest."""
+        connection = self._connect()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                   [(tool, db, digest, '\n'.join(lines)) for digest, lines in results.items()])
+
+    @monitor.traced_category("tool_results")
+    def run(self, tool, db, fasta, out, id_column, command):
+        """
+        Write the tool output for fasta into out, running the tool only on uncached sequences.
+        
+        See _run_tool for the parameters.
+        """
+        fingerprint = path_fingerprint(db)
+        db_key = fingerprint[0] + "@" + hashlib.sha1(json.dumps(fingerprint[1:]).encode()).hexdigest()
+        records = read_fasta(fasta)
+        digests = {name: hashlib.sha1(seq.encode()).hexdigest() for name, seq in records}
+        cached = self.get(tool, db_key, set(digests.values()))
+        missing = {}
+        for name, seq in records:
+            if digests[name] not in cached and digests[name] not in missing:
+                missing[digests[name]] = (name, seq)
+        logger.info(f"{tool}: {len(records) - len(missing)} of {len(records)} sequences found in tool cache.")
+        
+        if missing:
+            query = out + ".uncached.fa"
+            result = out + ".uncached"
+            with open(query, 'w') as f:
+                for name, seq in missing.values():
+                    f.write(">" + name + "\n" + seq + "\n")
+            _execute(command(query, result))
+            name_digest = {name: digest for digest, (name, _) in missing.items()}
+            results = {digest: [] for digest in missing}
+            with open(result, 'r') as f:
+                for line in f:
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) <= id_column or fields[id_column] not in name_digest:
+                        continue
+                    digest = name_digest[fields[id_column]]
+                    fields[id_column] = ''
+                    results[digest].append('\t'.join(fields))
+            self.put(tool, db_key, results)
+            cached.update(results)
+            os.remove(query)
+            os.remove(result)
+        
+        with open(out, 'w') as f:
+            for name, _ in records:
+                for line in cached[digests[name]]:
+                    fields = line.split('\t')
+                    fields[id_column] = name
+                    f.write('\t'.join(fields) + '\n')
+
+# Tool result cache used by run_blast and run_kraken, None disables caching
+tool_cache = None
     
+def nodes_with_attribute(graph, key, value):
+    """
+    List the nodes whose attribute equals a value.
+    
+    The attribute index of a gfaLib.IndexedMultiDiGraph answers for TP and AC,
+    other graphs and attributes are scanned.
+    
+    Parameters
+    ----------
+    graph : networkx.MultiDiGraph
+        Input graph
+    key : str
+        Node attribute, e.g. 'TP'
+    value : object
+        Attribute value to look for
+        
+    Returns
+    -------
+    list
+        Matching nodes, safe to use while removing them
+    """
+    index = gfaLib.attribute_index(graph)
+    if index is not None and key in gfaLib.indexedGraph.INDEXED_ATTRIBUTES:
+        return index.nodes(key, value)
+    return [node for node in graph.nodes() if graph.nodes[node][key] == value]
+
 def remove_unknown_components(graph):
     """
     Remove weakly connected components that contain no target or annotated nodes.
@@ -166,17 +416,30 @@ def remove_unknown_components(graph):
     A component is considered "unknown" if none of its nodes have:
     - TP (Type) attribute set to "target"
     - AC (Annotation) attribute different from '-'
+    The component tracker of a gfaLib.IndexedMultiDiGraph keeps the components
+    and their annotation counts between calls, other graphs are scanned.
     """
     nodes_for_unknown_components = set()
-    for component in nx.weakly_connected_components(graph):
-        target_component = False
-        for node in component:
-            if graph.nodes[node]['TP'] == "target" or graph.nodes[node]['AC'] != '-':
-                target_component = True
-                break
-        if not target_component:
+    pruned = 0
+    tracker = gfaLib.component_tracker(graph)
+    if tracker is not None:
+        for component in tracker.unknown_components():
             nodes_for_unknown_components.update(component)
+            pruned += 1
+    else:
+        for component in nx.weakly_connected_components(graph):
+            target_component = False
+            for node in component:
+                if graph.nodes[node]['TP'] == "target" or graph.nodes[node]['AC'] != '-':
+                    target_component = True
+                    break
+            if not target_component:
+                nodes_for_unknown_components.update(component)
+                pruned += 1
     graph.remove_nodes_from(nodes_for_unknown_components)
+    if pruned:
+        monitor.metrics.count("components_pruned", pruned)
+        monitor.metrics.count("nodes_removed", len(nodes_for_unknown_components), reason="unknown_component")
 
 def remove_short_isolated_nodes(graph, length):
     """
@@ -200,6 +463,8 @@ def remove_short_isolated_nodes(graph, length):
     # Identify short isolated nodes
     isolated_nodes = [node for node in graph.nodes() if (graph.degree(node) == 0 and graph.nodes[node]['length'] < length)]    
     graph.remove_nodes_from(isolated_nodes)
+    if isolated_nodes:
+        monitor.metrics.count("nodes_removed", len(isolated_nodes), reason="short_isolated")
     
 def remove_unknown_nodes(graph):
     """
@@ -220,9 +485,16 @@ def remove_unknown_nodes(graph):
     - TP (Type) attribute is '-'
     - AC (Annotation) attribute is '-'
     """
-    # Identify nodes without type or annotation
-    unknown_nodes = [node for node in graph.nodes() if (graph.nodes[node]['TP'] == '-' and graph.nodes[node]['AC'] == '-')]    
+    # Identify nodes without type or annotation, from the smaller of both classes
+    untyped = nodes_with_attribute(graph, 'TP', '-')
+    unannotated = nodes_with_attribute(graph, 'AC', '-')
+    if len(untyped) <= len(unannotated):
+        unknown_nodes = [node for node in untyped if graph.nodes[node]['AC'] == '-']
+    else:
+        unknown_nodes = [node for node in unannotated if graph.nodes[node]['TP'] == '-']
     graph.remove_nodes_from(unknown_nodes)
+    if unknown_nodes:
+        monitor.metrics.count("nodes_removed", len(unknown_nodes), reason="unknown_node")
 
 def remove_contaminated_nodes(graph):
     """
@@ -244,7 +516,11 @@ def remove_contaminated_nodes(graph):
     - 'contaminate_infer': inferred contamination
     """
     # Remove directly classified contaminated nodes
-    contaminate_nodes = [node for node in graph.nodes() if (graph.nodes[node]['TP'] == 'contaminate')]
-    graph.remove_nodes_from(contaminate_nodes)    
-    contaminate_nodes = [node for node in graph.nodes() if (graph.nodes[node]['TP'] == 'contaminate_infer')]
+    contaminate_nodes = nodes_with_attribute(graph, 'TP', 'contaminate')
     graph.remove_nodes_from(contaminate_nodes)    
+    inferred_nodes = nodes_with_attribute(graph, 'TP', 'contaminate_infer')
+    graph.remove_nodes_from(inferred_nodes)    
+    if contaminate_nodes:
+        monitor.metrics.count("nodes_removed", len(contaminate_nodes), reason="contaminated")
+    if inferred_nodes:
+        monitor.metrics.count("nodes_removed", len(inferred_nodes), reason="contaminated_inferred")
@@ -0,0 +1,401 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Synthetic metagenome assembly graphs for scale testing.
+The AssemblySimulator draws target and contaminant genomes, cuts them into
+overlapping unitigs like a de Bruijn graph assembler, adds SNP bubbles,
+shared repeats, tips and chimeric links, and writes a SPAdes-style GFA 1.2
+file together with matching kraken2 and BLAST outfmt6 results, a taxonomy
+and the true origin of every segment. The same parameters and seed always
+give the same files.
+"""
+
+import click
+import math
+import os
+import random
+import shutil
+
+from standin.makeDb import build_kraken_db, build_blast_db
+
+ROOT_TAXID = "1"
+# Species of the target genomes, pass it to --taxon_id
+TARGET_TAXID = "2"
+CONTAMINANT_TAXID = "3"
+
+_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+def _reverse_complement(seq):
+    return seq.translate(_COMPLEMENT)[::-1]
+
+class AssemblySimulator:
+    """
+    Generator of a synthetic assembly graph and its tool results.
+    
+    Parameters
+    ----------
+    genomes : int
+        Number of genomes, ignored when segments is given
+    segments : int, optional
+        Stop once this many segments are written, drawing genomes as needed
+    contamination : float
+        Fraction of contaminant genomes
+    genome_length : int
+        Mean genome length in bp
+    unitig_length : int
+        Mean number of new bases of a unique unitig
+    k : int
+        Overlap of linked segments
+    coverage_mean, coverage_sigma : float
+        Median and log-scale spread of the genome abundances (lognormal)
+    depth_noise : float
+        Relative spread of segment depths around the genome abundance
+    snp_rate : float
+        Probability of a SNP bubble at a unitig
+    repeats : int
+        Number of distinct repeats shared between genomes
+    repeat_length : int
+        Length of the repeats in bp
+    repeat_rate : float
+        Probability of a repeat copy between two unique unitigs
+    tip_rate : float
+        Probability of a low coverage dead-end tip at a unitig
+    chimera_rate : float
+        Probability of a wrong link from a contaminant unitig to a target unitig
+    kraken_accuracy : float
+        Fraction of segments kraken classifies correctly, the others are
+        unclassified or assigned to the other group
+    blast_false_hits : float
+        Fraction of contaminant segments with a partial BLAST hit
+    paths : bool
+        Write one SPAdes-style P line per genome
+    seed : int
+        Random seed
+    """
+    def __init__(self, genomes=20, segments=None, contamination=0.2, genome_length=20000, unitig_length=300,
+                 k=77, coverage_mean=15.0, coverage_sigma=0.8, depth_noise=0.15, snp_rate=0.05,
+                 repeats=5, repeat_length=500, repeat_rate=0.02, tip_rate=0.03, chimera_rate=0.01,
+                 kraken_accuracy=0.9, blast_false_hits=0.05, paths=True, seed=0):
+        if repeat_length <= k:
+            raise ValueError("Repeats must be longer than the overlap k.")
+        self.genomes = genomes
+        self.segments = segments
+        self.contamination = contamination
+        self.genome_length = genome_length
+        self.unitig_length = max(unitig_length, k + 20)
+        self.k = k
+        self.coverage_mean = coverage_mean
+        self.coverage_sigma = coverage_sigma
+        self.depth_noise = depth_noise
+        self.snp_rate = snp_rate
+        self.repeats = repeats
+        self.repeat_length = repeat_length
+        self.repeat_rate = repeat_rate
+        self.tip_rate = tip_rate
+        self.chimera_rate = chimera_rate
+        self.kraken_accuracy = kraken_accuracy
+        self.blast_false_hits = blast_false_hits
+        self.paths = paths
+        self.rng = random.Random(seed)
+
+    def _seq(self, length, gc):
+        return "".join(self.rng.choices("ACGT", [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2], k=length))
+
+    def _depth(self, abundance):
+        return max(0.5, abundance * self.rng.gauss(1, self.depth_noise))
+
+    def _budget(self):
+        return self.segments is None or self.written < self.segments
+
+    def _segment(self, seq, depth, kind, genome, taxid, target, start, end, flipped):
+        """Write a segment, stored reverse complemented when flipped, and return its name."""
+        name = str(self.next_id)
+        self.next_id += 1
+        self.written += 1
+        stored = _reverse_complement(seq) if flipped else seq
+        self.gfa.write(f"S\t{name}\t{stored}\tDP:f:{depth:.4f}\tKC:i:{round(depth * (len(seq) - self.k + 1))}\n")
+        self.truth.write(f"{name}\t{kind}\t{genome}\t{taxid}\t{int(target)}\t{start}\t{end}\t{'-' if flipped else '+'}\n")
+        return name
+
+    def _link(self, u, u_or, v, v_or):
+        self.links.write(f"L\t{u}\t{u_or}\t{v}\t{v_or}\t{self.k}M\n")
+
+    def _kraken(self, name, taxid, length):
+        rng = self.rng
+        if taxid is None or rng.random() > self.kraken_accuracy:
+            if taxid is None or rng.random() < 0.5:
+                self.kraken.write(f"U\t{name}\t0\t{length}\t0:{length - 34}\n")
+                return
+            target = taxid == TARGET_TAXID or self.taxon_parent.get(taxid) == TARGET_TAXID
+            taxid = CONTAMINANT_TAXID if target else TARGET_TAXID
+        self.kraken.write(f"C\t{name}\t{taxid}\t{length}\t{taxid}:{length - 34}\n")
+
+    def _blast(self, name, accession, start, end, flipped, length, identity=100.0, cover=100):
+        if flipped:
+            start, end = end, start
+        mismatch = round(length * (100 - identity) / 100)
+        self.blast.write(f"{name}\t{accession}\t{identity:.3f}\t{length}\t{mismatch}\t0\t1\t{length}\t{start}\t{end}"
+                         f"\t1e-50\t{length * 2}\t{cover}\n")
+
+    def _genome_pieces(self, gc):
+        """Return the genome sequence and its pieces (repeat id or None, start, new bases)."""
+        rng = self.rng
+        sequence = []
+        pieces = []
+        length = 0
+        previous_repeat = None
+        while length < self.genome_length or previous_repeat is not None:
+            if self.repeats and previous_repeat is None and pieces and rng.random() < self.repeat_rate:
+                repeat_id = rng.randrange(self.repeats)
+                orientation = rng.choice("+-")
+                repeat = self.repeat_seqs[repeat_id] if orientation == "+" else _reverse_complement(self.repeat_seqs[repeat_id])
+                # The last k bases of a repeat are the first k bases of the next unitig
+                new = repeat[:-self.k]
+                pieces.append((repeat_id, orientation, length, len(new)))
+                previous_repeat = repeat
+            else:
+                new_length = rng.randint(self.unitig_length // 2, self.unitig_length * 3 // 2)
+                new = self._seq(max(new_length, self.k + 20), gc)
+                if previous_repeat is not None:
+                    new = previous_repeat[-self.k:] + new[self.k:]
+                pieces.append((None, "+", length, len(new)))
+                previous_repeat = None
+            sequence.append(new)
+            length += len(new)
+        sequence.append(self._seq(self.k, gc))
+        return "".join(sequence), pieces
+
+    def _genome(self, index):
+        rng = self.rng
+        contaminant = math.floor((index + 1) * self.contamination) > math.floor(index * self.contamination)
+        taxid = str(10000 + index)
+        self.taxon_parent[taxid] = CONTAMINANT_TAXID if contaminant else TARGET_TAXID
+        self.taxon_names[taxid] = f"{'contaminant' if contaminant else 'target'}_genome_{index}"
+        accession = f"GENOME_{index}"
+        gc = rng.uniform(0.3, 0.65) if contaminant else rng.uniform(0.37, 0.43)
+        abundance = rng.lognormvariate(math.log(self.coverage_mean), self.coverage_sigma)
+        sequence, pieces = self._genome_pieces(gc)
+        if self.library is not None:
+            record = f">{accession}|kraken:taxid|{taxid}\n{sequence}\n"
+            self.library.write(record)
+            if not contaminant:
+                self.references.write(record)
+        
+        chain = []
+        previous = None
+        variant = None
+        for repeat_id, orientation, start, new_length in pieces:
+            next_variant = None
+            if repeat_id is not None:
+                if repeat_id not in self.repeat_nodes:
+                    if not self._budget():
+                        break
+                    self.repeat_nodes[repeat_id] = {"name": None, "depth": 0.0, "occurrences": []}
+                node = self.repeat_nodes[repeat_id]
+                node["depth"] += self._depth(abundance)
+                node["occurrences"].append((taxid, accession, start + 1, start + new_length + self.k, orientation == "-", not contaminant))
+                if node["name"] is None:
+                    node["name"] = str(self.next_id)
+                    self.next_id += 1
+                    self.written += 1
+                current = (node["name"], orientation)
+            else:
+                if not self._budget():
+                    break
+                seq = sequence[start:start + new_length + self.k]
+                flipped = rng.random() < 0.5
+                depth = self._depth(abundance)
+                snp = previous is not None and rng.random() < self.snp_rate and self.written + 1 < (self.segments or math.inf)
+                if snp:
+                    variant_fraction = rng.uniform(0.1, 0.5)
+                    depth *= 1 - variant_fraction
+                name = self._segment(seq, depth, "unique", accession, taxid, not contaminant, start + 1, start + len(seq), flipped)
+                current = (name, "-" if flipped else "+")
+                self._kraken(name, taxid, len(seq))
+                if not contaminant:
+                    self._blast(name, accession, start + 1, start + len(seq), flipped, len(seq))
+                elif rng.random() < self.blast_false_hits:
+                    self._blast(name, "GENOME_0", 1, len(seq) // 3, flipped, len(seq) // 3, 85.0, 33)
+                if snp:
+                    # A SNP outside the overlaps gives a bubble between the same neighbours
+                    pos = rng.randrange(self.k, len(seq) - self.k)
+                    variant_seq = seq[:pos] + rng.choice([b for b in "ACGT" if b != seq[pos]]) + seq[pos + 1:]
+                    variant_name = self._segment(variant_seq, depth * variant_fraction / (1 - variant_fraction), "snp", accession,
+                                                 taxid, not contaminant, start + 1, start + len(seq), False)
+                    self._kraken(variant_name, taxid, len(seq))
+                    if not contaminant:
+                        self._blast(variant_name, accession, start + 1, start + len(seq), False, len(seq), 100 - 100 / len(seq))
+                    self._link(previous[0], previous[1], variant_name, "+")
+                    next_variant = (variant_name, "+")
+                if self._budget() and rng.random() < self.tip_rate:
+                    tip = seq[-self.k:] + self._seq(rng.randint(10, self.k), gc)
+                    tip_name = self._segment(tip, rng.uniform(1, 3), "tip", accession, taxid, not contaminant,
+                                             start + len(seq) - self.k + 1, start + len(seq), False)
+                    self._kraken(tip_name, None, len(tip))
+                    self._link(current[0], current[1], tip_name, "+")
+                if contaminant and self.target_unitigs and rng.random() < self.chimera_rate:
+                    other = rng.choice(self.target_unitigs)
+                    self._link(current[0], current[1], other[0], other[1])
+                if not contaminant and len(self.target_unitigs) < 10000:
+                    self.target_unitigs.append(current)
+            if previous is not None:
+                self._link(previous[0], previous[1], current[0], current[1])
+            if variant is not None:
+                self._link(variant[0], variant[1], current[0], current[1])
+            variant = next_variant
+            previous = current
+            chain.append(current)
+        if self.paths and len(chain) > 1:
+            self.path_lines.write(f"P\tNODE_{index + 1}_length_{len(sequence)}_cov_{abundance:.6f}\t"
+                                  + ",".join(name + orientation for name, orientation in chain) + "\t*\n")
+
+    def _write_repeats(self):
+        """Write the repeat segments with the summed depth of all their copies."""
+        for repeat_id, node in self.repeat_nodes.items():
+            seq = self.repeat_seqs[repeat_id]
+            name = node["name"]
+            self.gfa.write(f"S\t{name}\t{seq}\tDP:f:{node['depth']:.4f}\tKC:i:{round(node['depth'] * (len(seq) - self.k + 1))}\n")
+            taxids = {occurrence[0] for occurrence in node["occurrences"]}
+            targets = {occurrence[5] for occurrence in node["occurrences"]}
+            if len(taxids) == 1:
+                taxid = taxids.pop()
+            else:
+                taxid = TARGET_TAXID if targets == {True} else CONTAMINANT_TAXID if targets == {False} else ROOT_TAXID
+            self._kraken(name, taxid, len(seq))
+            for _, accession, start, end, flipped, target in node["occurrences"]:
+                self.truth.write(f"{name}\trepeat\t{accession}\t{taxid}\t{int(target)}\t{start}\t{end}\t{'-' if flipped else '+'}\n")
+                if target:
+                    self._blast(name, accession, start, end, flipped, len(seq))
+
+    def write(self, out_path, prefix="sim", references=False):
+        """
+        Write the simulated files.
+        
+        Parameters
+        ----------
+        out_path : str
+            Output dir, created if missing
+        prefix : str
+            Prefix of the output files
+        references : bool
+            Also write the genomes, all of them as kraken2 library and the
+            target ones as BLAST references
+        
+        Returns
+        -------
+        dict
+            Paths of the gfa, kraken, blast and truth files, of the taxonomy dir
+            and of the library and references FASTA files
+        """
+        os.makedirs(out_path + "/taxonomy", exist_ok=True)
+        files = {"gfa": f"{out_path}/{prefix}.gfa", "kraken": f"{out_path}/{prefix}_kraken.txt",
+                 "blast": f"{out_path}/{prefix}_blast.txt", "truth": f"{out_path}/{prefix}_truth.tsv",
+                 "taxonomy": f"{out_path}/taxonomy"}
+        self.library = self.references = None
+        if references:
+            files["library"] = f"{out_path}/{prefix}_library.fasta"
+            files["references"] = f"{out_path}/{prefix}_references.fasta"
+            self.library = open(files["library"], 'w')
+            self.references = open(files["references"], 'w')
+        self.next_id = 1
+        self.written = 0
+        self.taxon_parent = {}
+        self.taxon_names = {}
+        self.repeat_nodes = {}
+        self.target_unitigs = []
+        self.repeat_seqs = [self._seq(self.repeat_length, 0.45) for _ in range(self.repeats)]
+        
+        links_path = files["gfa"] + ".links"
+        paths_path = files["gfa"] + ".paths"
+        with open(files["gfa"], 'w') as self.gfa, open(links_path, 'w') as self.links, \
+             open(paths_path, 'w') as self.path_lines, open(files["kraken"], 'w') as self.kraken, \
+             open(files["blast"], 'w') as self.blast, open(files["truth"], 'w') as self.truth:
+            self.gfa.write("H\tVN:Z:1.2\tsp:Z:gmw-simulate\n")
+            self.truth.write("segment\tkind\tgenome\ttaxid\ttarget\tstart\tend\torientation\n")
+            index = 0
+            while (self.segments is None and index < self.genomes) or (self.segments is not None and self._budget()):
+                self._genome(index)
+                index += 1
+            self._write_repeats()
+        if references:
+            self.library.close()
+            self.references.close()
+        # SPAdes writes all segments first, then links and paths
+        with open(files["gfa"], 'a') as gfa:
+            for path in (links_path, paths_path):
+                with open(path, 'r') as f:
+                    shutil.copyfileobj(f, gfa)
+                os.remove(path)
+        
+        with open(files["taxonomy"] + "/names.dmp", 'w') as names, open(files["taxonomy"] + "/nodes.dmp", 'w') as nodes:
+            taxa = [(ROOT_TAXID, ROOT_TAXID, "root"), (TARGET_TAXID, ROOT_TAXID, "target"),
+                    (CONTAMINANT_TAXID, ROOT_TAXID, "contaminant")]
+            taxa += [(taxid, self.taxon_parent[taxid], self.taxon_names[taxid]) for taxid in self.taxon_parent]
+            for taxid, parent, name in taxa:
+                names.write(f"{taxid}\t|\t{name}\t|\t\t|\tscientific name\t|\n")
+                nodes.write(f"{taxid}\t|\t{parent}\t|\tno rank\t|\n")
+        self.genome_count = index
+        return files
+
+@click.command()
+@click.option("--outdir", "-o", required=True, help="Output dir.")
+@click.option("--prefix", "-p", default="sim", help="Prefix of output files.")
+@click.option("--genomes", default=20, type=int, help="Number of genomes, ignored with --segments.")
+@click.option("--segments", type=int, help="Number of segments to write, genomes are drawn until it is reached.")
+@click.option("--contamination", default=0.2, type=float, help="Fraction of contaminant genomes.")
+@click.option("--genome_length", default=20000, type=int, help="Mean genome length.")
+@click.option("--unitig_length", default=300, type=int, help="Mean number of new bases of a unique unitig.")
+@click.option("--k", "k", default=77, type=int, help="Overlap of linked segments.")
+@click.option("--coverage_mean", default=15.0, type=float, help="Median genome coverage.")
+@click.option("--coverage_sigma", default=0.8, type=float, help="Log-scale spread of genome coverages.")
+@click.option("--depth_noise", default=0.15, type=float, help="Relative spread of segment depths.")
+@click.option("--snp_rate", default=0.05, type=float, help="Probability of a SNP bubble at a unitig.")
+@click.option("--repeats", default=5, type=int, help="Number of distinct repeats shared between genomes.")
+@click.option("--repeat_length", default=500, type=int, help="Repeat length.")
+@click.option("--repeat_rate", default=0.02, type=float, help="Probability of a repeat copy between two unitigs.")
+@click.option("--tip_rate", default=0.03, type=float, help="Probability of a dead-end tip at a unitig.")
+@click.option("--chimera_rate", default=0.01, type=float, help="Probability of a wrong link from a contaminant to a target unitig.")
+@click.option("--kraken_accuracy", default=0.9, type=float, help="Fraction of segments kraken classifies correctly.")
+@click.option("--blast_false_hits", default=0.05, type=float, help="Fraction of contaminant segments with a partial BLAST hit.")
+@click.option("--no_paths", is_flag=True, help="Do not write P lines.")
+@click.option("--seed", default=0, type=int, help="Random seed.")
+@click.option("--standin_db", is_flag=True, help="Also write the genomes and build kraken2/blastn databases of the stand-in tools from them.")
+def simulate(outdir, prefix, no_paths, standin_db, **parameters):
+    """
+    Simulate a metagenome assembly graph with matching kraken2 and BLAST results.
+    """
+    simulator = AssemblySimulator(paths=not no_paths, **parameters)
+    files = simulator.write(outdir, prefix, references=standin_db)
+    print(f"Wrote {simulator.written} segments of {simulator.genome_count} genomes to {files['gfa']}.")
+    print(f"Run: python src/gmw/cli.py -g {files['gfa']} --taxon_db {files['taxonomy']} --taxon_id {TARGET_TAXID} "
+          f"--kraken_out {files['kraken']} --blast_out {files['blast']}")
+    if standin_db:
+        kraken_db = f"{outdir}/standin_kraken_db"
+        blast_db = f"{outdir}/standin_blast_db/{prefix}_references"
+        build_kraken_db([files["library"]], files["taxonomy"], kraken_db)
+        build_blast_db([files["references"]], blast_db)
+        print(f"Run with the stand-in tools: python src/gmw/cli.py -g {files['gfa']} --taxon_db {files['taxonomy']} "
+              f"--taxon_id {TARGET_TAXID} --kraken_db {kraken_db} --blast_db {blast_db} --standin_tools")
+
+if __name__ == "__main__":
+    simulate(prog_name="python src/gmw/simulate.py")
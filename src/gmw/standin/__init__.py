@@ -0,0 +1,62 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Stand-in Module - Offline replacements of kraken2 and blastn.
+The stand-ins are executable scripts with the command line and output format
+of the real tools. They answer by exact k-mer matching against small
+databases built with `makeDb.py`, and wait a configurable start up time to
+mimic database loading, so the FASTA -> tool -> parse path of the workflow
+can be run and profiled without the real tools and databases.
+"""
+
+import os
+import config
+
+STANDIN_DIR = os.path.dirname(os.path.abspath(__file__))
+KRAKEN_PATH = os.path.join(STANDIN_DIR, "kraken2.py")
+BLAST_PATH = os.path.join(STANDIN_DIR, "blastn.py")
+# Tool paths before enable
+_tool_paths = None
+
+def kraken_index(db):
+    """Return the index file of a stand-in kraken2 database dir."""
+    return os.path.join(db, "standin.k2d")
+
+def blast_index(db):
+    """Return the index file of a stand-in blastn database, named like a real one."""
+    return db + ".nto"
+
+def enable():
+    """Run the stand-ins instead of the kraken2 and blastn of config."""
+    global _tool_paths
+    if _tool_paths is None:
+        _tool_paths = (config.kraken_path, config.blast_path)
+    config.kraken_path = KRAKEN_PATH
+    config.blast_path = BLAST_PATH
+
+def disable():
+    """Restore the tool paths replaced by enable."""
+    global _tool_paths
+    if _tool_paths is not None:
+        config.kraken_path, config.blast_path = _tool_paths
+        _tool_paths = None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Stand-in of blastn.
+Aligns every sequence of a FASTA file against a database built with
+`makeDb.py blast` and writes tabular output (-outfmt 6). Seeds are exact
+word matches voted per diagonal, each diagonal is extended without gaps and
+trimmed to its best scoring segment (match 1, mismatch -2 as megablast).
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import shared
+from standin import blast_index
+from standin.kmerIndex import KmerIndex
+
+DEFAULT_COLUMNS = ["qaccver", "saccver", "pident", "length", "mismatch", "gapopen",
+                   "qstart", "qend", "sstart", "send", "evalue", "bitscore"]
+COLUMNS = DEFAULT_COLUMNS + ["qseqid", "sseqid", "qcovs"]
+# Diagonals with fewer seeds are not extended
+MIN_SEEDS = 2
+# Karlin-Altschul parameters of megablast scoring
+LAMBDA = 1.28
+K = 0.46
+
+def best_segment(query, subject, start, end, diagonal):
+    """Return the start, end and mismatches of the best scoring ungapped segment of query[start:end]."""
+    best = (0, start, start, 0)
+    score = 0
+    seg_start = start
+    mismatches = 0
+    for i in range(start, end):
+        if query[i] == subject[i + diagonal]:
+            score += 1
+        else:
+            score -= 2
+            mismatches += 1
+        if score <= 0:
+            score = 0
+            seg_start = i + 1
+            mismatches = 0
+        elif score > best[0]:
+            best = (score, seg_start, i + 1, mismatches)
+    return best[1], best[2], best[3]
+
+def search(seq, index, db_length, max_targets):
+    """Return the best hit on every subject, as dicts of the output columns."""
+    length = len(seq)
+    seq = seq.upper()
+    names = index.meta["names"]
+    subjects = index.meta["seqs"]
+    hits = {}
+    for strand, query in (("+", seq), ("-", shared.reverse_complement(seq))):
+        votes = {}
+        for i, kmer in index.kmers_of(query):
+            for subject, pos in index.kmers.get(kmer, ()):
+                key = (subject, pos - i)
+                votes[key] = votes.get(key, 0) + 1
+        for (subject, diagonal), seeds in votes.items():
+            if seeds < MIN_SEEDS:
+                continue
+            start, end, mismatches = best_segment(query, subjects[subject], max(0, -diagonal),
+                                                  min(length, len(subjects[subject]) - diagonal), diagonal)
+            aligned = end - start
+            if aligned < index.k:
+                continue
+            score = aligned - 3 * mismatches
+            bitscore = (LAMBDA * score - math.log(K)) / math.log(2)
+            if subject in hits and hits[subject]["bitscore"] >= bitscore:
+                continue
+            if strand == "+":
+                qstart, qend, sstart, send = start + 1, end, start + diagonal + 1, end + diagonal
+            else:
+                qstart, qend, sstart, send = length - end + 1, length - start, end + diagonal, start + diagonal + 1
+            hits[subject] = {"saccver": names[subject], "sseqid": names[subject], "pident": f"{100 * (aligned - mismatches) / aligned:.3f}",
+                             "length": aligned, "mismatch": mismatches, "gapopen": 0, "qstart": qstart, "qend": qend,
+                             "sstart": sstart, "send": send, "evalue": f"{db_length * length * 2 ** -bitscore:.2e}",
+                             "bitscore": bitscore, "qcovs": round(100 * aligned / length)}
+    return sorted(hits.values(), key=lambda hit: -hit["bitscore"])[:max_targets]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="blastn", description="Stand-in of blastn for offline runs.")
+    parser.add_argument("-query", required=True)
+    parser.add_argument("-db", required=True)
+    parser.add_argument("-out", default="-")
+    parser.add_argument("-outfmt", default="6")
+    parser.add_argument("-num_threads", type=int, default=1)
+    parser.add_argument("-max_target_seqs", type=int, default=500)
+    args, _ = parser.parse_known_args(argv)
+    
+    fields = args.outfmt.split()
+    if fields[0] != "6":
+        sys.stderr.write("The stand-in blastn only writes -outfmt 6.\n")
+        return 1
+    columns = fields[1:] or DEFAULT_COLUMNS
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        sys.stderr.write(f"The stand-in blastn does not support the columns {' '.join(unknown)}.\n")
+        return 1
+    
+    started = time.perf_counter()
+    if not os.path.exists(blast_index(args.db)):
+        sys.stderr.write(f"BLAST Database error: No stand-in database \"{blast_index(args.db)}\", build it with standin/makeDb.py.\n")
+        return 2
+    index = KmerIndex.load(blast_index(args.db))
+    time.sleep(max(0.0, config.standin_blast_latency - (time.perf_counter() - started)))
+    db_length = sum(len(seq) for seq in index.meta["seqs"])
+    
+    out = sys.stdout if args.out == "-" else open(args.out, 'w')
+    try:
+        for name, seq in shared.read_fasta(args.query):
+            for hit in search(seq, index, db_length, args.max_target_seqs):
+                hit.update(qaccver=name, qseqid=name, bitscore=f"{hit['bitscore']:.1f}")
+                out.write("\t".join(str(hit[column]) for column in columns) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
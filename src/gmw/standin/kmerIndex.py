@@ -0,0 +1,76 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+K-mer index of reference sequences, the database of the stand-in tools.
+"""
+
+import pickle
+import shared
+
+class KmerIndex:
+    """
+    Map of the k-mers of reference sequences to values.
+    
+    Parameters
+    ----------
+    k : int
+        K-mer length
+    canonical : bool
+        Use the smaller of a k-mer and its reverse complement as key
+    meta : dict, optional
+        Extra data stored with the index
+    """
+    def __init__(self, k, canonical=True, meta=None):
+        self.k = k
+        self.canonical = canonical
+        self.meta = meta if meta is not None else {}
+        self.kmers = {}
+
+    def kmers_of(self, seq):
+        """Yield the start and key of every k-mer of seq without ambiguous bases."""
+        k = self.k
+        seq = seq.upper()
+        length = len(seq)
+        reverse = shared.reverse_complement(seq) if self.canonical else None
+        for i in range(length - k + 1):
+            kmer = seq[i:i + k]
+            if 'N' in kmer:
+                continue
+            if self.canonical:
+                other = reverse[length - i - k:length - i]
+                if other < kmer:
+                    kmer = other
+            yield i, kmer
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump({"k": self.k, "canonical": self.canonical, "meta": self.meta, "kmers": self.kmers}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        index = cls(data["k"], data["canonical"], data["meta"])
+        index.kmers = data["kmers"]
+        return index
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Stand-in of kraken2.
+Classifies every sequence of a FASTA file against a database built with
+`makeDb.py kraken` and writes the kraken2 standard output format. As in
+kraken2, the taxon with the most k-mer hits on its path to the root is
+chosen and moved up the tree until its clade holds the confidence fraction
+of all k-mers.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import shared
+from standin import kraken_index
+from standin.kmerIndex import KmerIndex
+from standin.makeDb import lineage
+
+def classify(seq, index, confidence, lineages):
+    """
+    Classify one sequence.
+    
+    Returns
+    -------
+    tuple
+        Taxon id, "0" when unclassified, and the run length encoded k-mer hits
+    """
+    counts = {}
+    runs = []
+    total = 0
+    for _, kmer in index.kmers_of(seq):
+        taxid = index.kmers.get(kmer, "0")
+        total += 1
+        if taxid != "0":
+            counts[taxid] = counts.get(taxid, 0) + 1
+        if runs and runs[-1][0] == taxid:
+            runs[-1][1] += 1
+        else:
+            runs.append([taxid, 1])
+    hits = " ".join(f"{taxid}:{n}" for taxid, n in runs) if runs else "0:0"
+    if not counts:
+        return "0", hits
+    
+    parents = index.meta["parents"]
+    for taxid in counts:
+        if taxid not in lineages:
+            lineages[taxid] = lineage(taxid, parents)
+    best = max(sorted(counts), key=lambda t: sum(counts.get(a, 0) for a in lineages[t]))
+    for taxid in lineages[best]:
+        clade = sum(n for t, n in counts.items() if taxid in lineages[t])
+        if clade >= confidence * total:
+            return taxid, hits
+    return "0", hits
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kraken2", description="Stand-in of kraken2 for offline runs.")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--output", default="-")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--confidence", type=float, default=0.0)
+    parser.add_argument("--memory-mapping", action="store_true")
+    parser.add_argument("query")
+    args, _ = parser.parse_known_args(argv)
+    
+    started = time.perf_counter()
+    sys.stderr.write("Loading database information...")
+    if not os.path.exists(kraken_index(args.db)):
+        sys.stderr.write(f"\nStand-in database \"{kraken_index(args.db)}\" not found, build it with standin/makeDb.py.\n")
+        return 1
+    index = KmerIndex.load(kraken_index(args.db))
+    latency = config.standin_kraken_latency / (10 if args.memory_mapping else 1)
+    time.sleep(max(0.0, latency - (time.perf_counter() - started)))
+    sys.stderr.write(" done.\n")
+    
+    classified = 0
+    records = shared.read_fasta(args.query)
+    lineages = {}
+    out = sys.stdout if args.output == "-" else open(args.output, 'w')
+    try:
+        for name, seq in records:
+            taxid, hits = classify(seq, index, args.confidence, lineages)
+            classified += taxid != "0"
+            out.write(f"{'U' if taxid == '0' else 'C'}\t{name}\t{taxid}\t{len(seq)}\t{hits}\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    total = max(len(records), 1)
+    sys.stderr.write(f"{len(records)} sequences processed in {time.perf_counter() - started:.3f}s.\n"
+                     f"  {classified} sequences classified ({classified / total * 100:.2f}%)\n"
+                     f"  {len(records) - classified} sequences unclassified ({(len(records) - classified) / total * 100:.2f}%)\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Build the databases of the stand-in tools.
+The kraken2 database is a dir with the canonical k-mers of a library of
+reference sequences and the taxonomy tree, k-mers found in several taxa map
+to their lowest common ancestor. As for kraken2-build, library sequence ids
+carry their taxon as "name|kraken:taxid|N". The blastn database maps the
+k-mers of the reference sequences to their positions, it is written to
+{db}.nto so the database checks of the workflow accept it.
+"""
+
+import click
+import os
+import re
+import sys
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import shared
+from standin import kraken_index, blast_index
+from standin.kmerIndex import KmerIndex
+
+_TAXID_TAG = re.compile(r"\|kraken:taxid\|(\w+)")
+
+def read_parents(nodes_dmp):
+    """Return the parent of every taxon in a nodes.dmp file."""
+    parents = {}
+    with open(nodes_dmp, 'r') as f:
+        for line in f:
+            fields = line.split("\t|\t")
+            parents[fields[0].strip()] = fields[1].strip()
+    return parents
+
+def lineage(taxid, parents):
+    """Return the taxa from taxid up to the root."""
+    path = [taxid]
+    while taxid in parents and parents[taxid] != taxid:
+        taxid = parents[taxid]
+        path.append(taxid)
+    return path
+
+def lowest_common_ancestor(a, b, parents):
+    ancestors = set(lineage(a, parents))
+    for taxid in lineage(b, parents):
+        if taxid in ancestors:
+            return taxid
+    return "1"
+
+def build_kraken_db(fastas, taxonomy_dir, db, k=config.standin_kraken_k):
+    """
+    Build a stand-in kraken2 database.
+    
+    Parameters
+    ----------
+    fastas : list
+        Library FASTA files, sequence ids tagged with "|kraken:taxid|N"
+    taxonomy_dir : str
+        Dir with the nodes.dmp file of the taxonomy
+    db : str
+        Database dir, created if missing
+    k : int
+        K-mer length
+    """
+    os.makedirs(db, exist_ok=True)
+    parents = read_parents(os.path.join(taxonomy_dir, "nodes.dmp"))
+    index = KmerIndex(k, canonical=True, meta={"parents": parents})
+    kmers = index.kmers
+    for fasta in fastas:
+        for name, seq in shared.read_fasta(fasta):
+            match = _TAXID_TAG.search(name)
+            if match is None:
+                raise ValueError(f"Sequence \"{name}\" of \"{fasta}\" has no \"|kraken:taxid|\" tag.")
+            taxid = match.group(1)
+            for _, kmer in index.kmers_of(seq):
+                other = kmers.get(kmer)
+                if other is None:
+                    kmers[kmer] = taxid
+                elif other != taxid:
+                    kmers[kmer] = lowest_common_ancestor(other, taxid, parents)
+    index.save(kraken_index(db))
+    return index
+
+def build_blast_db(fastas, db, word=config.standin_blast_word):
+    """
+    Build a stand-in blastn database.
+    
+    Parameters
+    ----------
+    fastas : list
+        Reference FASTA files, "|kraken:taxid|N" tags are removed from the ids
+    db : str
+        Database path prefix, the index is written to {db}.nto
+    word : int
+        Word size of the seeds
+    """
+    if os.path.dirname(db):
+        os.makedirs(os.path.dirname(db), exist_ok=True)
+    names = []
+    seqs = []
+    index = KmerIndex(word, canonical=False, meta={"names": names, "seqs": seqs})
+    kmers = index.kmers
+    for fasta in fastas:
+        for name, seq in shared.read_fasta(fasta):
+            subject = len(names)
+            names.append(_TAXID_TAG.sub("", name))
+            seqs.append(seq.upper())
+            for pos, kmer in index.kmers_of(seq):
+                kmers.setdefault(kmer, []).append((subject, pos))
+    index.save(blast_index(db))
+    return index
+
+@click.group()
+def makedb():
+    """
+    Build databases of the stand-in kraken2 and blastn.
+    """
+
+@makedb.command("kraken")
+@click.option("--library", "-l", "fastas", required=True, multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help="Library FASTA file, ids tagged with '|kraken:taxid|N'. Can be repeated.")
+@click.option("--taxonomy", required=True, type=click.Path(exists=True, file_okay=False), help="Dir with nodes.dmp.")
+@click.option("--db", required=True, help="Database dir.")
+@click.option("-k", "k", default=config.standin_kraken_k, type=int, help="K-mer length.")
+def kraken(fastas, taxonomy, db, k):
+    """Build a stand-in kraken2 database dir."""
+    index = build_kraken_db(fastas, taxonomy, db, k)
+    print(f"Indexed {len(index.kmers)} k-mers into {kraken_index(db)}.")
+
+@makedb.command("blast")
+@click.option("--fasta", "-i", "fastas", required=True, multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help="Reference FASTA file. Can be repeated.")
+@click.option("--db", required=True, help="Database path prefix.")
+@click.option("--word", default=config.standin_blast_word, type=int, help="Word size.")
+def blast(fastas, db, word):
+    """Build a stand-in blastn database."""
+    index = build_blast_db(fastas, db, word)
+    print(f"Indexed {len(index.meta['names'])} sequences into {blast_index(db)}.")
+
+if __name__ == "__main__":
+    makedb(prog_name="python src/gmw/standin/makeDb.py")
@@ -0,0 +1,265 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Parameter sweep mode of GMW. Unfold one GFA file with every combination of a
+grid of thresholds. The file is parsed once, kraken2 and blastn run once on
+its segments before the combinations are unfolded in forked workers sharing
+the parsed graph, and their results are summarised in one table.
+"""
+
+import click
+import itertools
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+import gfaLib
+import shared
+import standin
+import cli as gmw_cli
+from unfoldGraph import taxon
+logger = logging.getLogger("gmw")
+
+# Swept parameters and their types, the first three are unfold options, the others config settings
+SWEEP_PARAMETERS = {
+    "depth_discrepancy": int,
+    "gc_discrepancy": float,
+    "position_distance": int,
+    "resolution": float,
+    "partition_offset": float,
+}
+CONFIG_PARAMETERS = ("resolution", "partition_offset")
+
+# Parsed GFA graph inherited by forked workers
+_GFA_GRAPH = None
+
+def parse_grid(grids):
+    """
+    Parse the values of the swept parameters.
+    
+    Parameters
+    ----------
+    grids : list
+        Strings NAME=V1,V2,... with NAME in SWEEP_PARAMETERS
+        
+    Returns
+    -------
+    list
+        List of (name, values) tuples in the given order
+    """
+    parsed = []
+    names = set()
+    for grid in grids:
+        name, _, values = grid.partition("=")
+        name = name.strip()
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(f"Unknown sweep parameter \"{name}\", choose from {', '.join(SWEEP_PARAMETERS)}.")
+        if name in names:
+            raise ValueError(f"Sweep parameter \"{name}\" is given twice.")
+        try:
+            values = [SWEEP_PARAMETERS[name](value) for value in values.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"Values of sweep parameter \"{name}\" must be {SWEEP_PARAMETERS[name].__name__} numbers, got \"{grid}\".")
+        if not values:
+            raise ValueError(f"Sweep parameter \"{name}\" has no value.")
+        names.add(name)
+        parsed.append((name, values))
+    return parsed
+
+def n50(lengths):
+    """Return the N50 of sequence lengths, 0 for no sequence."""
+    half = sum(lengths) / 2
+    covered = 0
+    for length in sorted(lengths, reverse=True):
+        covered += length
+        if covered >= half:
+            return length
+    return 0
+
+def graph_summary(graph):
+    """
+    Return the size of an unfolded graph.
+    
+    Returns
+    -------
+    tuple
+        (nodes, edges, N50 of the node sequences, fraction of the bases in
+        nodes of TP 'target', fraction of the bases in nodes of TP
+        'target_infer' inferred by BGLL)
+    """
+    lengths = []
+    target = 0
+    inferred = 0
+    for _, data in graph.nodes(data=True):
+        length = len(data['seq'])
+        lengths.append(length)
+        if data.get('TP') == "target":
+            target += length
+        elif data.get('TP') == "target_infer":
+            inferred += length
+    total = sum(lengths)
+    if not total:
+        return graph.number_of_nodes(), graph.number_of_edges(), 0, 0.0, 0.0
+    return graph.number_of_nodes(), graph.number_of_edges(), n50(lengths), target / total, inferred / total
+
+def _run_tools(gfa_graph, outdir, prefix, options):
+    """
+    Run kraken2 and blastn once on the segments of the input graph.
+    
+    The results fill the tool cache, so the first unfold iteration of every
+    combination sends no sequence to the tools.
+    """
+    graph = gfaLib.GFANetwork.compute_backbone(gfa_graph)
+    tools_dir = outdir + "/tools"
+    os.makedirs(tools_dir, exist_ok=True)
+    threads = options["threads"] or config.max_threads
+    run_kraken = (not options["disable_taxon_unfold"] and not options["use_gfa_taxon"]
+                  and options["kraken_out"] is None and options["kraken_db"] is not None)
+    run_blast = (not options["disable_ref_unfold"] and not options["use_gfa_ref"]
+                 and options["blast_out"] is None and options["blast_db"] is not None)
+    if not (run_kraken or run_blast):
+        return
+    fasta = tools_dir + "/" + prefix + "_segments.fa"
+    shared.graph2fasta(graph, fasta)
+    if run_kraken:
+        logger.info("Run kraken2 on the input segments.")
+        shared.run_kraken(fasta, options["kraken_db"], tools_dir + "/" + prefix + "_kraken_out.txt", threads=threads)
+    if run_blast:
+        logger.info("Run blastn on the input segments.")
+        shared.run_blast(fasta, options["blast_db"], tools_dir + "/" + prefix + "_blast_out.txt", threads=threads)
+
+def _run_combination(number, values, gfa, outdir, prefix, options):
+    """Unfold one parameter combination in a worker process and return its summary row."""
+    start = time.time()
+    options = dict(options)
+    settings = {name: getattr(config, name) for name in CONFIG_PARAMETERS}
+    for name, value in values:
+        if name in CONFIG_PARAMETERS:
+            setattr(config, name, value)
+        else:
+            options[name] = value
+    try:
+        graph = gmw_cli.run_gmw(gfa=gfa, outdir=outdir, prefix=prefix, gfa_graph=_GFA_GRAPH, **options)
+        nodes, edges, graph_n50, target_fraction, inferred_fraction = graph_summary(graph)
+        return [number, "done", nodes, edges, graph_n50, round(target_fraction, 4), round(inferred_fraction, 4),
+                f"{time.time() - start:.1f}", outdir, ""]
+    except BaseException as e:
+        # run_gmw exits on invalid parameters, report it as a failed combination
+        logger.error(traceback.format_exc())
+        error = f"exit code {e.code}" if isinstance(e, SystemExit) else f"{type(e).__name__}: {e}"
+        return [number, "failed", "", "", "", "", "", f"{time.time() - start:.1f}", outdir, error]
+    finally:
+        # Pool workers run several combinations
+        for name, value in settings.items():
+            setattr(config, name, value)
+
+@click.command()
+@click.version_option(config.VERSION, "--version", "-v")
+@click.option("--gfa", "-g", required=True, type=click.Path(exists=True, dir_okay=False), help="Input gfa file.")
+@click.option("--outdir", "-o", default=config.output_path, help="Path of sweep output files. Combination n is written to outdir/sweep_n.")
+@click.option("--prefix", "-p", default=config.prefix, help="Prefix of output files.")
+@click.option("--grid", "grids", multiple=True, required=True,
+              help=f"Values of one swept parameter as NAME=V1,V2,... with NAME one of {', '.join(SWEEP_PARAMETERS)}. Repeat it to sweep the grid of several parameters.")
+@click.option("--jobs", "-j", default=config.batch_jobs, type=int, help="Number of combinations unfolded at the same time.")
+@gmw_cli.unfold_options
+def sweep(gfa, outdir, prefix, grids, jobs, **options):
+    """
+    GMW sweep mode: unfold one GFA file with every combination of a threshold grid.
+    """
+    try:
+        grid = parse_grid(grids)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--grid")
+    names = [name for name, _ in grid]
+    combinations = list(itertools.product(*(values for _, values in grid)))
+    outdir = os.path.normpath(outdir)
+    os.makedirs(outdir, exist_ok=True)
+    gmw_cli.setup_logging(outdir, prefix + "_sweep")
+    logger.info(f"Sweep {len(combinations)} combinations of {', '.join(names)}.")
+    
+    jobs = max(1, min(jobs, len(combinations)))
+    options["threads"] = max(1, (options["threads"] or config.max_threads) // jobs)
+    
+    global _GFA_GRAPH
+    logger.info(f"Parse gfa file \"{gfa}\".")
+    _GFA_GRAPH = gfaLib.GraphFromFile(gfa, packed_sequences=config.packed_sequences)
+    # Loaded before forking so all workers share the parsed taxonomy
+    if options["taxon_db"] is not None and not options["disable_taxon_unfold"] and not options["use_gfa_taxon"]:
+        taxon_db = os.path.normpath(options["taxon_db"])
+        logger.info(f"Load taxonomy database \"{taxon_db}\".")
+        taxon.load_taxon_parser(taxon_db + "/names.dmp", taxon_db + "/nodes.dmp")
+    shared.tool_cache = shared.ToolCache(outdir + "/gmw_tool_cache.sqlite")
+    config.kraken_memory_mapping = True
+    if options["standin_tools"]:
+        standin.enable()
+    try:
+        _run_tools(_GFA_GRAPH, outdir, prefix, options)
+    finally:
+        if options["standin_tools"]:
+            standin.disable()
+
+    results = []
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+            futures = {}
+            for number, combination in enumerate(combinations, 1):
+                values = list(zip(names, combination))
+                combination_outdir = outdir + "/sweep_" + str(number)
+                futures[executor.submit(_run_combination, number, values, gfa, combination_outdir, prefix, options)] = combination
+            for future in as_completed(futures):
+                row = future.result()
+                logger.info(f"Combination {row[0]} ({_describe(names, futures[future])}) {row[1]} in {row[7]} s.")
+                results.append((futures[future], row))
+    finally:
+        _GFA_GRAPH = None
+    
+    results.sort(key=lambda result: result[1][0])
+    summary_path = outdir + "/" + prefix + "_sweep_summary.tsv"
+    with open(summary_path, 'w') as f:
+        f.write("\t".join(names) + "\tcombination\tstatus\tnodes\tedges\tn50\ttarget_fraction\ttarget_infer_fraction\tseconds\toutdir\terror\n")
+        for combination, row in results:
+            f.write("\t".join(str(column) for column in [*combination, *row]) + "\n")
+    
+    done = [result for result in results if result[1][1] == "done"]
+    if done:
+        # Highest fraction of known and BGLL inferred target bases first, then the most contiguous
+        combination, row = max(done, key=lambda result: (result[1][5] + result[1][6], result[1][4]))
+        for suffix in ("_after_unfold.fasta", "_after_unfold.gfa"):
+            shutil.copyfile(row[8] + "/" + prefix + suffix, outdir + "/" + prefix + "_best" + suffix)
+        logger.info(f"Best combination {row[0]} ({_describe(names, combination)}) copied to {outdir}/{prefix}_best_after_unfold.fasta/gfa.")
+    failed = len(results) - len(done)
+    logger.info(f"Sweep finished, {len(done)} combinations done, {failed} failed. Summary: {summary_path}")
+    if failed:
+        sys.exit(1)
+
+def _describe(names, combination):
+    return ", ".join(f"{name}={value}" for name, value in zip(names, combination))
+
+if __name__ == "__main__":
+    sweep(prog_name="python src/gmw/sweep.py -g input.gfa --grid depth_discrepancy=10,20")
@@ -21,12 +21,18 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 
 import os
 import logging
+import time
 
-import visualize
+import artifacts
+import monitor
 import shared
 import config
-import gfaLib
 from mergeNodes.mergeNeighbour import NeighbourMerger
+
+# Graph data a stage can read or write: node sequences, depth, type,
+# reference position (AC/OR/ST/EN) and the edges (including removed nodes)
+GRAPH_RESOURCES = ("seq", "DP", "TP", "AC", "edges")
+
 class AbstrctUnfolder:
     """Coordinator for unfolding/cleaning operations on the assembly graph.
 
@@ -74,7 +80,23 @@ class AbstrctUnfolder:
         Whether to produce graph visualizations.
     contig_shape : str
         Shape used by the visualization module for rendering contigs.
+
+    Notes
+    -----
+    A stage runs in two steps. `prepare` is called in the main thread, takes
+    what it needs from the graph and returns a callable doing the read-only
+    work (external tools, feature computation) or None. `apply` receives the
+    result of that callable and changes the graph. `reads` lists the
+    resources used by `prepare`, `writes` the resources changed by `apply`
+    besides component removal and neighbour merging, see GRAPH_RESOURCES.
+    `parameters` lists the arguments and `settings` the config values the
+    stage result depends on besides those of every stage, they key the stage
+    checkpoints, see pipeline.StageCache.
     """
+    reads = ()
+    writes = ()
+    parameters = ()
+    settings = ()
 
     def __init__(self, graph, out_path, prefix, threads, force,
                  disable_taxon_unfold, disable_ref_unfold, disable_depth_unfold, disable_gc_unfold,
@@ -118,11 +140,47 @@ class AbstrctUnfolder:
         self.visual = visual
         self.contig_shape = contig_shape
         
-        self.neighbour_merger = NeighbourMerger(self.graph)
+        self.neighbour_merger = NeighbourMerger(self.graph, self.threads)
+        # Seconds of component removal and neighbour merging, the steps the Polisher repeats
+        self.step_seconds = {}
         self._create_unfold_dir()
         self.logger = logging.getLogger("gmw")
         self.logger.info(f"Start unfold using {self.__class__.__name__}")
 
+    def stage_writes(self):
+        """Return the resources changed by `apply`.
+
+        Component removal deletes nodes and edges, neighbour merging can
+        change every resource of the merged nodes.
+        """
+        writes = set(self.writes) | {"edges"}
+        if not self.disable_merge_neighbor:
+            writes.update(GRAPH_RESOURCES)
+        return writes
+
+    def prepare(self):
+        """Start the read-only work of the stage.
+
+        Returns
+        -------
+        callable or None
+            Work run before `apply`, possibly in another thread. It must not
+            touch the graph.
+        """
+        return None
+
+    def apply(self, prepared):
+        """Change the graph using the result of the prepared work."""
+        raise NotImplementedError
+
+    def unfold_graph(self):
+        """Prepare and apply the stage in the calling thread."""
+        work = self.prepare()
+        if work is not None:
+            with monitor.stage("prepare"):
+                work = work()
+        self.apply(work)
+
     def _visual_graph(self, file):
         """Render the current graph to an image file if visualization is enabled.
 
@@ -133,7 +191,8 @@ class AbstrctUnfolder:
         """
         if self.visual:
             # Delegate to visualization backend with configured contig shape
-            visualize.print_graph(self.graph, file, self.contig_shape)
+            with monitor.stage("output_html"):
+                artifacts.save_html(self.graph, file, self.contig_shape)
     
     def _remove_components(self):
         """Remove contaminated and optionally unknown/short components from graph.
@@ -144,17 +203,20 @@ class AbstrctUnfolder:
         3) Optionally remove individual unknown nodes.
         4) Optionally drop short isolated nodes using config.short_offset as cutoff.
         """
-        # Remove definitely contaminated nodes first
-        shared.remove_contaminated_nodes(self.graph)
-
-        # Then handle unknown components/nodes as requested by user settings
-        if not self.keep_unknown_components:
-            shared.remove_unknown_components(self.graph)
-        if self.remove_unknown_nodes:
-            shared.remove_unknown_nodes(self.graph)
-        if not self.keep_short_isolated_nodes:
-            # Prune short isolated nodes using global cutoff
-            shared.remove_short_isolated_nodes(self.graph, config.short_offset)
+        start = time.monotonic()
+        with monitor.stage("remove_components", self.graph):
+            # Remove definitely contaminated nodes first
+            shared.remove_contaminated_nodes(self.graph)
+
+            # Then handle unknown components/nodes as requested by user settings
+            if not self.keep_unknown_components:
+                shared.remove_unknown_components(self.graph)
+            if self.remove_unknown_nodes:
+                shared.remove_unknown_nodes(self.graph)
+            if not self.keep_short_isolated_nodes:
+                # Prune short isolated nodes using global cutoff
+                shared.remove_short_isolated_nodes(self.graph, config.short_offset)
+        self._add_step_seconds("remove_components", start)
             
     def _merge_nodes(self):
         """Run neighbor merging stage unless explicitly disabled.
@@ -163,7 +225,13 @@ class AbstrctUnfolder:
         nodes according to local rules implemented in NeighbourMerger.
         """
         if not self.disable_merge_neighbor:
-            self.neighbour_merger.merge_neibour()
+            start = time.monotonic()
+            with monitor.stage("merge_nodes", self.graph):
+                self.neighbour_merger.merge_neibour()
+            self._add_step_seconds("merge_nodes", start)
+
+    def _add_step_seconds(self, step, start):
+        self.step_seconds[step] = self.step_seconds.get(step, 0.0) + time.monotonic() - start
             
     def _output_gfa(self, gfa_name):
         """Write the current graph into a GFA file.
@@ -173,7 +241,8 @@ class AbstrctUnfolder:
         gfa_name : str
             Output GFA file path.
         """
-        gfaLib.GraphFromNetwork(self.graph).save_graph(gfa_name)
+        with monitor.stage("output_gfa"):
+            artifacts.save_gfa(self.graph, gfa_name)
 
     def _create_unfold_dir(self):
         if not os.path.exists(self.out_path):
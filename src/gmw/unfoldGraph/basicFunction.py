@@ -20,7 +20,9 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
 import config
+import monitor
 
+@monitor.traced_category("tool_results")
 def graph_add_accession(graph, file_path):
     node_dict = {}
 
@@ -73,6 +75,7 @@ def graph_add_accession(graph, file_path):
             elif match_same_orient:
                 graph.nodes[key]["OR"] = value[0][1]
 
+@monitor.traced_category("tool_results")
 def graph_add_type(graph, file_path, taxid, taxon_parser):
     with open(file_path, 'r') as f:
         for line in f:
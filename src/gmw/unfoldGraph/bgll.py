@@ -19,10 +19,46 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 
-import community
+from concurrent.futures import ProcessPoolExecutor
+
 import networkx as nx
 
 import config
+import unfoldGraph.louvain as louvain
+
+# Twice the edge weight of the backbone, the modularity normaliser of every
+# detection of a run. Set by the pipeline, None uses the clustered graph.
+graph_m2 = None
+
+def backbone_m2(graph):
+    """Return twice the total edge weight of a graph, as counted by the native engine."""
+    return 2 * louvain.CSRGraph.from_graph(graph).total_weight()
+
+def _detect_chunk(components, resolution, seed, leiden, m2):
+    """
+    Run community detection on a chunk of components in a worker process.
+
+    Parameters
+    ----------
+    components : list
+        CSRGraph objects, one per weakly connected component.
+    m2 : float
+        Twice the total edge weight of the whole graph, the modularity of
+        every component is normalised by it as in a run on the whole graph.
+
+    Returns
+    -------
+    list
+        One list of communities (lists of node ids) per component.
+    """
+    results = []
+    for csr in components:
+        membership = louvain.louvain_communities(csr, resolution, seed, leiden, m2)
+        communities = {}
+        for node, community_id in zip(csr.nodes, membership):
+            communities.setdefault(community_id, []).append(node)
+        results.append(list(communities.values()))
+    return results
 
 class BGLLCluster:
     """
@@ -32,14 +68,26 @@ class BGLLCluster:
     specifically designed to identify and classify taxonomic partitions. It uses community structure
     to infer taxonomic labels for unknown nodes based on their neighbors in detected communities.
     
+    Communities never span weakly connected components, so the native engine
+    runs every component on its own and spreads them over a process pool. The
+    modularity of every component is normalised by `graph_m2`, the edge weight
+    of the backbone the run started from, or else by the edge weight of the
+    whole clustered graph. A component is then partitioned the same way in
+    every iteration and in every batch of `pipeline.ComponentExecutor`,
+    whatever happens to the other components. The "community" engine always
+    uses the clustered graph.
+    
     Attributes
     ----------
     graph : networkx.Graph
         The input graph to perform community detection on
+    threads : int
+        Number of worker processes used for community detection
     """
     
-    def __init__(self, graph):
+    def __init__(self, graph, threads=1):
         self.graph = graph
+        self.threads = threads if threads else 1
         
     def _obtain_community(self, partition):
         community_nodes = {}
@@ -104,10 +152,90 @@ class BGLLCluster:
         return True
                     
     def louvain_algorithm(self):
-        partition = community.best_partition(self.graph.to_undirected(),resolution=config.resolution)
-        community_nodes = self._obtain_community(partition)
-        #print(len(community_nodes))
-        for _, nodes in community_nodes.items():
-            self._change_partition_taxon(nodes)
+        if config.bgll_engine == "community":
+            import community
+            partition = community.best_partition(self.graph.to_undirected(), resolution=config.resolution,
+                                                 random_state=config.bgll_seed)
+            community_nodes = self._obtain_community(partition)
+            for _, nodes in community_nodes.items():
+                self._change_partition_taxon(nodes)
+            return
+        
+        for communities in self.communities():
+            for nodes in communities:
+                self._change_partition_taxon(nodes)
+
+    def communities(self):
+        """
+        Detect the communities of the components whose nodes can change with the native engine.
+
+        Returns
+        -------
+        list
+            One list of communities (lists of nodes) per component.
+        """
+        csr = louvain.CSRGraph.from_graph(self.graph)
+        # Members in index order keep the neighbour order, and so the tie breaking, of the whole graph
+        components = [csr.subgraph(sorted(members)) for members in csr.components() if self._need_detection(csr, members)]
+        return self._detect_communities(components, graph_m2 if graph_m2 is not None else 2 * csr.total_weight())
+
+    def _need_detection(self, csr, members):
+        """
+        Check whether community detection can change any node of a component.
+
+        Components without unknown nodes, or without any target/contaminate
+        node to infer from, are left as they are.
+        """
+        if len(members) < 2:
+            return False
+        unknown = False
+        known = False
+        for i in members:
+            node_type = self.graph.nodes[csr.nodes[i]]['TP']
+            if node_type == '-':
+                unknown = True
+            elif node_type == 'target' or node_type == 'contaminate':
+                known = True
+            if unknown and known:
+                return True
+        return False
+
+    def _detect_communities(self, components, m2):
+        """
+        Run community detection for every component, in parallel if possible.
 
+        Components are distributed largest first over several chunks per
+        worker so that one huge component does not serialise the pool.
+
+        Parameters
+        ----------
+        components : list
+            CSRGraph objects, one per weakly connected component.
+        m2 : float
+            Twice the total edge weight of the whole graph.
+
+        Returns
+        -------
+        list
+            Communities of every component, in the order of components.
+        """
+        arguments = (config.resolution, config.bgll_seed, config.leiden_refinement, m2)
+        if self.threads < 2 or len(components) < 2:
+            return _detect_chunk(components, *arguments)
+        
+        chunk_num = min(len(components), self.threads * 4)
+        chunks = [[] for _ in range(chunk_num)]
+        chunk_sizes = [0] * chunk_num
+        order = sorted(range(len(components)), key=lambda i: len(components[i].indices) + len(components[i]), reverse=True)
+        for i in order:
+            lightest = chunk_sizes.index(min(chunk_sizes))
+            chunks[lightest].append(i)
+            chunk_sizes[lightest] += len(components[i].indices) + len(components[i])
         
+        results = [None] * len(components)
+        with ProcessPoolExecutor(max_workers=self.threads) as executor:
+            futures = [executor.submit(_detect_chunk, [components[i] for i in chunk], *arguments) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                for i, communities in zip(chunk, future.result()):
+                    results[i] = communities
+        return results
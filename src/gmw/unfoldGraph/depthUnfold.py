@@ -27,6 +27,7 @@ This module provides functionality to unfold genome assembly graphs based on
 sequencing depth discrepancies between connected nodes.
 """
 
+import monitor
 from unfoldGraph.abstrctUnfold import AbstrctUnfolder
 
 class DepthUnfolder(AbstrctUnfolder):
@@ -43,19 +44,25 @@ class DepthUnfolder(AbstrctUnfolder):
     #     self.dir_path = "/home/cwb/chen/20241006HIV_test/FLU_1/filter_assembly/mmm"
     #     self.force = True
                 
-    def unfold_graph(self):
+    reads = ("DP", "edges")
+    writes = ("edges",)
+    parameters = ("depth_discrepancy",)
+                
+    def apply(self, prepared):
         visual_in = self.out_path + "/" + self.prefix + "_depth_input.html"
         visual_out = self.out_path + "/" + self.prefix + "_depth_output.html"
         gfa_out = self.out_path + "/" + self.prefix + "_depth_output.gfa"
         self._visual_graph(visual_in)        
         
-        edges_remove = []
-        for node1, node2, key in self.graph.edges(keys=True):
-            depth1 = self.graph.nodes[node1]['DP']
-            depth2 = self.graph.nodes[node2]['DP']
-            if depth1/depth2 > self.depth_discrepancy or depth2/depth1 > self.depth_discrepancy:
-                edges_remove.append((node1, node2, key))
-        self.graph.remove_edges_from(edges_remove)
+        with monitor.stage("edge_sweep", self.graph):
+            edges_remove = []
+            for node1, node2, key in self.graph.edges(keys=True):
+                depth1 = self.graph.nodes[node1]['DP']
+                depth2 = self.graph.nodes[node2]['DP']
+                if depth1/depth2 > self.depth_discrepancy or depth2/depth1 > self.depth_discrepancy:
+                    edges_remove.append((node1, node2, key))
+            self.graph.remove_edges_from(edges_remove)
+            monitor.metrics.count("edges_removed", len(edges_remove), predicate="depth_ratio")
 
         if self.disable_ref_unfold and self.disable_taxon_unfold:
             self.keep_unknown_components = True
@@ -30,7 +30,11 @@ from unfoldGraph.abstrctUnfold import AbstrctUnfolder
 from mergeNodes.mergeBrother import BrotherMerger
 from mergeNodes.splitParent import ParentSpliter
 class EmptyUnfolder(AbstrctUnfolder):
-    def unfold_graph(self):
+    reads = ("seq", "DP", "edges")
+    writes = ("seq", "DP", "TP", "AC", "edges")
+    parameters = ("merge_brother", "split_parent")
+    
+    def apply(self, prepared):
         if self.merge_brother:
             merger = BrotherMerger(self.graph)
             merger.merge_brother()
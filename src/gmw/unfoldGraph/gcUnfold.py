@@ -27,25 +27,38 @@ GC content discrepancies between connected nodes, which often indicates
 different genomic origins.
 """
 
+import monitor
+import gfaLib
 from unfoldGraph.abstrctUnfold import AbstrctUnfolder
 class GCUnfolder(AbstrctUnfolder):
     # def __init__(self, graph, gc_discrepancy=0.1):
     #     self.graph = graph
     #     self.gc_discrepancy = gc_discrepancy
                 
-    def unfold_graph(self):
+    reads = ("seq",)
+    writes = ("edges",)
+    parameters = ("gc_discrepancy",)
+    
+    def prepare(self):
+        # Only connected nodes are compared
+        sequences = {node: seq for node, seq in self.graph.nodes(data='seq') if self.graph.degree(node)}
+        return lambda: {node: self.gc_content(seq) for node, seq in sequences.items()}
+                
+    def apply(self, prepared):
         visual_in = self.out_path + "/" + self.prefix + "_gc_input.html"
         visual_out = self.out_path + "/" + self.prefix + "_gc_output.html"
         gfa_out = self.out_path + "/" + self.prefix + "_gc_output.gfa"
         self._visual_graph(visual_in) 
                 
-        edges_remove = []
-        for node1, node2, key in self.graph.edges(keys=True):
-            gc1 = self.gc_content(self.graph.nodes[node1]['seq'])
-            gc2 = self.gc_content(self.graph.nodes[node2]['seq'])
-            if gc1 - gc2 > self.gc_discrepancy or gc2 - gc1 > self.gc_discrepancy:
-                edges_remove.append((node1, node2, key))
-        self.graph.remove_edges_from(edges_remove)
+        with monitor.stage("edge_sweep", self.graph):
+            edges_remove = []
+            for node1, node2, key in self.graph.edges(keys=True):
+                gc1 = prepared[node1]
+                gc2 = prepared[node2]
+                if gc1 - gc2 > self.gc_discrepancy or gc2 - gc1 > self.gc_discrepancy:
+                    edges_remove.append((node1, node2, key))
+            self.graph.remove_edges_from(edges_remove)
+            monitor.metrics.count("edges_removed", len(edges_remove), predicate="gc_discrepancy")
         if self.disable_ref_unfold and self.disable_taxon_unfold:
             self.keep_unknown_components = True
             self.remove_unknown_nodes = False
@@ -55,6 +68,8 @@ class GCUnfolder(AbstrctUnfolder):
         self._visual_graph(visual_out)
         
     def gc_content(self, seq):
+        if isinstance(seq, gfaLib.PackedSequence):
+            return seq.gc_count() / len(seq)
         seq = seq.upper()
         gc_count = seq.count('G') + seq.count('C')
         total_count = len(seq)
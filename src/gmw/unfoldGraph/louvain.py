@@ -0,0 +1,410 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Array based community detection for BGLL clustering.
+This module builds an undirected CSR adjacency directly from the edge list of
+the assembly graph and runs the Louvain method on it, with an optional Leiden
+refinement step. Node attribute dicts are never copied, which keeps memory and
+runtime low on million-node graphs.
+"""
+
+import zlib
+from array import array
+
+
+class CSRGraph:
+    """
+    Undirected weighted graph in compressed sparse row form.
+
+    Attributes
+    ----------
+    nodes : list
+        Original node ids, the position in the list is the CSR index.
+    indptr : array
+        Row pointers, neighbours of node i are indices[indptr[i]:indptr[i+1]].
+    indices : array
+        Column indices of the neighbours (self loops excluded).
+    weights : array
+        Edge weights aligned with indices.
+    self_loops : array
+        Self loop weight of every node.
+    """
+
+    def __init__(self, nodes, indptr, indices, weights, self_loops):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.self_loops = self_loops
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def degrees(self):
+        """Weighted degree of every node, self loops counted twice."""
+        indptr = self.indptr
+        weights = self.weights
+        return [sum(weights[indptr[i]:indptr[i + 1]]) + 2 * self.self_loops[i] for i in range(len(self))]
+
+    def total_weight(self):
+        """Total edge weight, every undirected edge counted once."""
+        return sum(self.weights) / 2 + sum(self.self_loops)
+
+    def components(self):
+        """
+        Connected components of the graph.
+
+        Returns
+        -------
+        list
+            One list of CSR indices per component, ordered by their smallest index.
+        """
+        indptr, indices = self.indptr, self.indices
+        seen = bytearray(len(self))
+        components = []
+        for start in range(len(self)):
+            if seen[start]:
+                continue
+            seen[start] = 1
+            component = [start]
+            for i in component:
+                for p in range(indptr[i], indptr[i + 1]):
+                    j = indices[p]
+                    if not seen[j]:
+                        seen[j] = 1
+                        component.append(j)
+            components.append(component)
+        return components
+
+    def subgraph(self, members):
+        """
+        Induced subgraph on a list of CSR indices.
+
+        The nodes of the subgraph are the original node ids of members, in the
+        given order.
+        """
+        local = {i: k for k, i in enumerate(members)}
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        pairs = {}
+        for i in members:
+            k = local[i]
+            if self.self_loops[i]:
+                pairs[(k, k)] = self.self_loops[i]
+            for p in range(indptr[i], indptr[i + 1]):
+                l = local.get(indices[p])
+                if l is not None and k < l:
+                    pairs[(k, l)] = weights[p]
+        return CSRGraph.from_pairs([self.nodes[i] for i in members], pairs)
+
+    @classmethod
+    def from_pairs(cls, nodes, pairs):
+        """
+        Build the CSR adjacency from undirected node index pairs.
+
+        Parameters
+        ----------
+        nodes : list
+            Original node ids.
+        pairs : dict
+            Mapping (i, j) with i <= j to the edge weight.
+        """
+        n = len(nodes)
+        counts = [0] * (n + 1)
+        self_loops = array('d', [0.0]) * n
+        for (i, j), weight in pairs.items():
+            if i == j:
+                self_loops[i] += weight
+            else:
+                counts[i + 1] += 1
+                counts[j + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        indptr = array('q', counts)
+        indices = array('q', [0]) * counts[n]
+        weights = array('d', [0.0]) * counts[n]
+        fill = counts[:n]
+        for (i, j), weight in sorted(pairs.items()):
+            if i == j:
+                continue
+            indices[fill[i]] = j
+            weights[fill[i]] = weight
+            fill[i] += 1
+            indices[fill[j]] = i
+            weights[fill[j]] = weight
+            fill[j] += 1
+        return cls(nodes, indptr, indices, weights, self_loops)
+
+    @classmethod
+    def from_graph(cls, graph, nodes=None):
+        """
+        Build the CSR adjacency from the edge list of a networkx graph.
+
+        Edge direction is ignored and parallel edges (including the twin
+        links of a de Bruijn graph) are collapsed into one edge of weight 1.
+
+        Parameters
+        ----------
+        graph : networkx.MultiDiGraph
+            Assembly graph.
+        nodes : iterable, optional
+            Restrict the adjacency to these nodes (default: all nodes).
+        """
+        nodes = list(graph.nodes) if nodes is None else list(nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        pairs = {}
+        for node in nodes:
+            i = index[node]
+            for neighbour in graph.successors(node):
+                j = index.get(neighbour)
+                if j is None:
+                    continue
+                pairs[(i, j) if i <= j else (j, i)] = 1.0
+        return cls.from_pairs(nodes, pairs)
+
+
+def _visit_keys(nodes, seed):
+    """
+    Random visiting key of every node.
+
+    Keys are derived from the node ids, so a connected component is visited
+    in the same order on its own as inside the whole graph.
+    """
+    return [zlib.crc32(f"{seed}\t{node}".encode()) for node in nodes]
+
+
+def _visit_order(keys):
+    """Node indices sorted by key, ties in index order."""
+    return sorted(range(len(keys)), key=lambda i: (keys[i], i))
+
+
+def _move_nodes(csr, degrees, community, tot, resolution, m2, order):
+    """
+    Louvain local moving phase.
+
+    Every node is moved to the neighbouring community with the largest
+    modularity gain until no move improves the partition.
+
+    Returns
+    -------
+    bool
+        True if at least one node changed community.
+    """
+    indptr, indices, weights = csr.indptr, csr.indices, csr.weights
+    improved = False
+    moved = True
+    while moved:
+        moved = False
+        for i in order:
+            current = community[i]
+            k_i = degrees[i]
+            links = {}
+            for p in range(indptr[i], indptr[i + 1]):
+                c = community[indices[p]]
+                links[c] = links.get(c, 0.0) + weights[p]
+            tot[current] -= k_i
+            best = current
+            best_gain = links.get(current, 0.0) - resolution * tot[current] * k_i / m2
+            for c, weight in links.items():
+                gain = weight - resolution * tot[c] * k_i / m2
+                if gain > best_gain + 1e-12:
+                    best = c
+                    best_gain = gain
+            tot[best] += k_i
+            if best != current:
+                community[i] = best
+                moved = True
+                improved = True
+    return improved
+
+
+def _refine_partition(csr, degrees, community, resolution, m2, order):
+    """
+    Leiden refinement phase.
+
+    Inside every community found by the moving phase, nodes start as
+    singletons and are greedily merged with refined sub-communities of the same
+    community. Only nodes that are still singletons may move, so every refined
+    sub-community is connected.
+
+    Returns
+    -------
+    list
+        Refined community of every node.
+    """
+    indptr, indices, weights = csr.indptr, csr.indices, csr.weights
+    n = len(csr)
+    refined = list(range(n))
+    tot = list(degrees)
+    singleton = [True] * n
+    for i in order:
+        if not singleton[i]:
+            continue
+        k_i = degrees[i]
+        links = {}
+        for p in range(indptr[i], indptr[i + 1]):
+            j = indices[p]
+            if community[j] == community[i]:
+                r = refined[j]
+                links[r] = links.get(r, 0.0) + weights[p]
+        best = i
+        best_gain = 0.0
+        for r, weight in links.items():
+            if r == i:
+                continue
+            gain = weight - resolution * tot[r] * k_i / m2
+            if gain > best_gain + 1e-12:
+                best = r
+                best_gain = gain
+        if best != i:
+            tot[i] -= k_i
+            tot[best] += k_i
+            refined[i] = best
+            singleton[i] = False
+            singleton[best] = False
+    return refined
+
+
+def _aggregate(csr, partition):
+    """
+    Collapse every community of partition into one node.
+
+    Returns
+    -------
+    tuple
+        (aggregated CSRGraph, list mapping old node to new node)
+    """
+    labels = {}
+    mapping = [labels.setdefault(c, len(labels)) for c in partition]
+    pairs = {}
+    indptr, indices, weights = csr.indptr, csr.indices, csr.weights
+    for i in range(len(csr)):
+        ci = mapping[i]
+        if csr.self_loops[i]:
+            pairs[(ci, ci)] = pairs.get((ci, ci), 0.0) + csr.self_loops[i]
+        for p in range(indptr[i], indptr[i + 1]):
+            j = indices[p]
+            if j < i:
+                continue
+            cj = mapping[j]
+            key = (ci, cj) if ci <= cj else (cj, ci)
+            pairs[key] = pairs.get(key, 0.0) + weights[p]
+    return CSRGraph.from_pairs(list(range(len(labels))), pairs), mapping
+
+
+def louvain_communities(csr, resolution=1.0, seed=0, leiden=False, m2=None):
+    """
+    Detect communities with the Louvain method on a CSR graph.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        Undirected input graph.
+    resolution : float
+        Resolution parameter, larger values give smaller communities.
+    seed : int
+        Seed of the node visiting order, the result is deterministic for a seed.
+    leiden : bool
+        Refine every level with the Leiden refinement step.
+    m2 : float, optional
+        Twice the total edge weight normalising the modularity (default: the
+        one of csr). Pass the one of the whole graph when csr is one of its
+        connected components, so the resolution keeps its meaning.
+
+    Returns
+    -------
+    list
+        Community id of every CSR node, numbered by first occurrence.
+    """
+    n = len(csr)
+    if m2 is None:
+        m2 = 2 * csr.total_weight()
+    if n == 0:
+        return []
+    if m2 == 0:
+        return list(range(n))
+    keys = _visit_keys(csr.nodes, seed)
+    membership = list(range(n))
+    level = csr
+    degrees = level.degrees()
+    community = list(range(n))
+    while True:
+        tot = [0.0] * len(level)
+        for i, c in enumerate(community):
+            tot[c] += degrees[i]
+        order = _visit_order(keys)
+        improved = _move_nodes(level, degrees, community, tot, resolution, m2, order)
+        refined = _refine_partition(level, degrees, community, resolution, m2, order) if leiden else community
+        if not improved and len(set(refined)) == len(level):
+            break
+        aggregated, mapping = _aggregate(level, refined)
+        if len(aggregated) == len(level):
+            break
+        membership = [mapping[m] for m in membership]
+        # An aggregated node is visited with the key of its first member
+        next_keys = [None] * len(aggregated)
+        for i, m in enumerate(mapping):
+            if next_keys[m] is None:
+                next_keys[m] = keys[i]
+        keys = next_keys
+        if leiden:
+            next_community = [0] * len(aggregated)
+            for i, c in enumerate(community):
+                next_community[mapping[i]] = c
+            labels = {}
+            community = [labels.setdefault(c, len(labels)) for c in next_community]
+        else:
+            community = list(range(len(aggregated)))
+        degrees = aggregated.degrees()
+        level = aggregated
+    labels = {}
+    return [labels.setdefault(community[m], len(labels)) for m in membership]
+
+
+def best_partition(graph, resolution=1.0, seed=0, leiden=False, nodes=None):
+    """
+    Compute the partition of graph nodes with the highest modularity.
+
+    This is a drop-in replacement of community.best_partition working on a
+    CSR adjacency instead of an undirected copy of the graph.
+
+    Parameters
+    ----------
+    graph : networkx.MultiDiGraph
+        Assembly graph.
+    resolution : float
+        Resolution parameter of the modularity.
+    seed : int
+        Seed of the node visiting order.
+    leiden : bool
+        Apply the Leiden refinement step.
+    nodes : iterable, optional
+        Restrict the detection to these nodes (default: all nodes).
+
+    Returns
+    -------
+    dict
+        Mapping node -> community id.
+    """
+    csr = CSRGraph.from_graph(graph, nodes)
+    communities = louvain_communities(csr, resolution, seed, leiden)
+    return dict(zip(csr.nodes, communities))
@@ -19,6 +19,9 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+import artifacts
+import monitor
+import shared
 from unfoldGraph.abstrctUnfold import AbstrctUnfolder
 
 class Polisher(AbstrctUnfolder):
@@ -34,11 +37,9 @@ class Polisher(AbstrctUnfolder):
     
     def polish(self):
         if not self.disable_ref_unfold:
-            rmove_list = []
-            for node in self.graph.nodes():
-                if self.graph.nodes[node]['AC'] == '-':
-                    rmove_list.append(node)
+            rmove_list = shared.nodes_with_attribute(self.graph, 'AC', '-')
             self.graph.remove_nodes_from(rmove_list)
+            monitor.metrics.count("nodes_removed", len(rmove_list), reason="no_accession")
         
         # Remove unknown components if both reference and taxon unfolding are enabled
         if not (self.disable_ref_unfold or self.disable_taxon_unfold):
@@ -51,4 +52,4 @@ class Polisher(AbstrctUnfolder):
             self._merge_nodes()
 
         gfa_out = self.out_path + "/../" +  self.prefix + "_after_unfold.gfa"
-        self._output_gfa(gfa_out)
\ No newline at end of file
+        artifacts.save_gfa(self.graph, gfa_out, final=True)
\ No newline at end of file
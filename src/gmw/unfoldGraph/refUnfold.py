@@ -28,8 +28,10 @@ reference genome alignments, identifying and resolving inconsistencies between
 the assembly and known reference sequences.
 """
 
+import os
 import unfoldGraph.basicFunction as bs
 import shared
+import monitor
 from unfoldGraph.abstrctUnfold import AbstrctUnfolder
 
 class RefUnfolder(AbstrctUnfolder):
@@ -42,8 +44,20 @@ class RefUnfolder(AbstrctUnfolder):
     #     self.blast_name = self.dir_path + "/merge_neibour.blast"
     #     self.blast_db = "/home/cwb/chen/database/refseq/ref_viruses_rep_genomes"
         
-    def unfold_graph(self):
+    reads = ("seq",)
+    writes = ("AC",)
+    parameters = ("use_gfa_ref", "blast_out", "blast_db", "position_distance")
+    settings = ("query_cover_offset", "match_length", "identity_discrepency")
+    
+    def prepare(self):
+        if self.use_gfa_ref or self.blast_out is not None:
+            return None
         fasta_name = self.out_path + "/" + self.prefix + "_seq_for_blast.fa"
+        self.blast_out = self.out_path + "/" + self.prefix + "_blast_out.txt"
+        shared.graph2fasta(self.graph, fasta_name)
+        return lambda: self._run_blast(fasta_name)
+        
+    def apply(self, prepared):
         visual_in = self.out_path + "/" + self.prefix + "_ref_input.html"
         visual_typing = self.out_path + "/" + self.prefix + "_ref_typing.html"
         visual_out = self.out_path + "/" + self.prefix + "_ref_output.html"
@@ -53,14 +67,13 @@ class RefUnfolder(AbstrctUnfolder):
         
         if not self.use_gfa_ref:
             self._clear_graph_accession()
-            if self.blast_out is None:
-                self.blast_out = self.out_path + "/" + self.prefix + "_blast_out.txt"
-                self._run_blast(fasta_name)
-                
-            bs.graph_add_accession(self.graph, self.blast_out)
+            with monitor.stage("add_accession"):
+                bs.graph_add_accession(self.graph, self.blast_out)
+            monitor.metrics.count("bytes_read", os.path.getsize(self.blast_out), kind="blast_out")
             self._visual_graph(visual_typing)
             
-        self._remove_wrong_connction()
+        with monitor.stage("edge_sweep", self.graph):
+            self._remove_wrong_connction()
         self._remove_components()
         self._merge_nodes()
         self._output_gfa(gfa_out)
@@ -69,22 +82,27 @@ class RefUnfolder(AbstrctUnfolder):
         
     def _remove_wrong_connction(self):
         edges_remove = list(self.graph.edges(keys=True))
+        removed = {"accession": 0, "orientation": 0, "position": 0}
         for node1, node2, key in edges_remove:
             edge = self.graph[node1][node2][key]
             if not self._accession_judge(self.graph.nodes[node1]['AC'], self.graph.nodes[node2]['AC']):
                 self.graph.remove_edge(node1, node2, key)
+                removed["accession"] += 1
                 continue
             if not self._orientaion_judge(self.graph.nodes[node1]['OR'], self.graph.nodes[node2]['OR'], edge['label']):
                 self.graph.remove_edge(node1, node2, key)
+                removed["orientation"] += 1
                 continue
             if not self._position_judge(self.graph.nodes[node1]['ST'], self.graph.nodes[node1]['EN'],
                                         self.graph.nodes[node2]['ST'], self.graph.nodes[node2]['EN']):
                 self.graph.remove_edge(node1, node2, key)
+                removed["position"] += 1
+        for predicate, count in removed.items():
+            monitor.metrics.count("edges_removed", count, predicate=predicate)
 
         
             
     def _run_blast(self, fasta_name):
-        shared.graph2fasta(self.graph, fasta_name)
         shared.run_blast(fasta_name, self.blast_db, self.blast_out)
 
             
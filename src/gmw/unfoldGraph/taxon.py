@@ -26,6 +26,8 @@ This module provides functionality for parsing and navigating taxonomic informat
 from NCBI taxonomy database files, supporting taxonomic-based graph unfolding.
 """
 
+from functools import lru_cache
+
 class TaxonParser:
     def __init__(self, name_path, node_path):
         self.name_dict = {}
@@ -59,4 +61,14 @@ class TaxonParser:
         lower_name = name.lower()
         if lower_name in self.name_dict:
             return self.name_dict[lower_name]
-        raise ValueError(f"There is no scientific name \"{name}\"! Please correct the name or use tax_id instead.")
\ No newline at end of file
+        raise ValueError(f"There is no scientific name \"{name}\"! Please correct the name or use tax_id instead.")
+
+@lru_cache(maxsize=None)
+def load_taxon_parser(name_path, node_path):
+    """
+    Load the taxonomy dump files once per process.
+
+    Repeated calls with the same files, across iterations or samples, return
+    the same TaxonParser object.
+    """
+    return TaxonParser(name_path, node_path)
@@ -19,10 +19,12 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+import os
 import unfoldGraph.basicFunction as bs
 from unfoldGraph.abstrctUnfold import AbstrctUnfolder
 from unfoldGraph.bgll import BGLLCluster
 import shared
+import monitor
 import unfoldGraph.taxon as taxon
 
 class TaxonUnfolder(AbstrctUnfolder):
@@ -36,38 +38,45 @@ class TaxonUnfolder(AbstrctUnfolder):
         # self.taxon_parse = taxon.TaxonParser("/home/cwb/chen/database/taxon/names.dmp", "/home/cwb/chen/database/taxon/nodes.dmp")
         # self.target_taxon = "11308"
         
-    def unfold_graph(self):
+    reads = ("seq",)
+    writes = ("TP",)
+    parameters = ("use_gfa_taxon", "kraken_out", "names_dmp", "nodes_dmp", "taxon_id", "taxon_name", "kraken_db", "bgll")
+    settings = ("confidence", "resolution", "partition_offset", "bgll_engine", "bgll_seed", "leiden_refinement")
+    
+    def prepare(self):
+        if self.use_gfa_taxon or self.kraken_out is not None:
+            return None
         fasta_name = self.out_path + "/" + self.prefix + "_seq_for_kraken.fa"
+        self.kraken_out = self.out_path + "/" + self.prefix + "_kraken_out.txt"
+        shared.graph2fasta(self.graph, fasta_name)
+        return lambda: self._run_kraken(fasta_name)
+        
+    def apply(self, prepared):
         visual_in = self.out_path + "/" + self.prefix + "_input.html"
         visual_typing = self.out_path + "/" + self.prefix + "_typing.html"
         visual_out = self.out_path + "/" + self.prefix + "_output.html"
         gfa_out = self.out_path + "/" + self.prefix + "_output.gfa"
+        bgll_out = self.out_path + "/" + self.prefix + "_bgll_output.gfa"
 
         self._visual_graph(visual_in)
         if not self.use_gfa_taxon:
-            taxon_parse = taxon.TaxonParser(self.names_dmp, self.nodes_dmp)
+            taxon_parse = taxon.load_taxon_parser(self.names_dmp, self.nodes_dmp)
             self._clear_graph_type()
-            if self.kraken_out is None:
-                self.kraken_out = self.out_path + "/" + self.prefix + "_kraken_out.txt"
-                self._run_kraken(fasta_name)
             
-            bs.graph_add_type(self.graph, self.kraken_out, self.taxon_id, taxon_parse)
+            with monitor.stage("add_type"):
+                bs.graph_add_type(self.graph, self.kraken_out, self.taxon_id, taxon_parse)
+            monitor.metrics.count("bytes_read", os.path.getsize(self.kraken_out), kind="kraken_out")
             
-            con_nodes = 0 
-            for node in self.graph.nodes:
-                if self.graph.nodes[node]['TP'] == "contaminate":
-                    con_nodes += 1
+            con_nodes = len(shared.nodes_with_attribute(self.graph, 'TP', "contaminate"))
             print(f"node num {con_nodes}") 
             
             if self.bgll:
                 self.logger.info("Start BGLL")
-                cluster = BGLLCluster(self.graph)
-                cluster.louvain_algorithm()
-                self._output_gfa("/home/cwb/chen/gmw_test/ncov/draw_graph.gfa")
-            con_nodes = 0 
-            for node in self.graph.nodes:
-                if self.graph.nodes[node]['TP'] == "contaminate":
-                    con_nodes += 1
+                with monitor.stage("bgll", self.graph):
+                    cluster = BGLLCluster(self.graph, self.threads)
+                    cluster.louvain_algorithm()
+                self._output_gfa(bgll_out)
+            con_nodes = len(shared.nodes_with_attribute(self.graph, 'TP', "contaminate"))
             print(f"node num {con_nodes}") 
             
             self._visual_graph(visual_typing)
@@ -82,7 +91,6 @@ class TaxonUnfolder(AbstrctUnfolder):
 
     
     def _run_kraken(self, fasta_name):
-        shared.graph2fasta(self.graph, fasta_name)
         if self.threads:
             shared.run_kraken(fasta_name, self.kraken_db, self.kraken_out, threads=self.threads)
         else:
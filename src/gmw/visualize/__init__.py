@@ -3,4 +3,4 @@ Visualization Module - Tools for visualizing genome assembly graphs.
 This package provides methods for converting genome assembly graphs into interactive HTML visualizations for analysis and exploration.
 '''
 
-from .networkToHtml import print_graph
\ No newline at end of file
+from .networkToHtml import print_graph, html_data, write_html
\ No newline at end of file
@@ -50,8 +50,46 @@ def print_dot(graph, file_path, edge_color=config.edge_color, node_shape=config.
         edge_color: Color for graph edges
         node_shape: Shape for graph nodes
     """
+    write_html(file_path, *dot_data(graph, edge_color, node_shape))
+
+def dot_data(graph, edge_color=config.edge_color, node_shape=config.node_shape):
+    """
+    Build the data and options of a dot visualization, see print_dot.
+    
+    Returns:
+        tuple: (data dict, option dict)
+    """
     data_dict = convert_node_json(graph)
     option_dict = {"physics": True, "edges":{"color": edge_color}, "nodes":{"shape": node_shape}}
+    return data_dict, option_dict
+
+def html_data(graph, contig_shape):
+    """
+    Build the data and options of a visualization without writing it.
+    
+    The result does not refer to the graph, so it can be written by
+    write_html while the graph changes.
+    
+    Parameters:
+        graph: NetworkX graph representing the genome assembly
+        contig_shape: Shape of contigs in visualization ('dot' or 'line')
+    
+    Returns:
+        tuple: (data dict, option dict)
+    """
+    if contig_shape == 'dot':
+        return dot_data(graph)
+    return line_data(graph)
+
+def write_html(file_path, data_dict, option_dict):
+    """
+    Write visualization data and options into an HTML file.
+    
+    Parameters:
+        file_path: Path to save the HTML output file
+        data_dict: Nodes and edges of the visualization
+        option_dict: Options of the vis.js network
+    """
     with open(file_path, "w") as file:
         file.write(htmlStr.head)
         file.write(json.dumps(data_dict, indent=None))
@@ -92,17 +130,21 @@ def print_line(graph, file_path, edge_color=config.edge_color, node_shape=config
         edge_color: Color for graph edges
         node_shape: Shape for graph nodes
     """
+    write_html(file_path, *line_data(graph, edge_color, node_shape))
+
+def line_data(graph, edge_color=config.edge_color, node_shape=config.node_shape):
+    """
+    Build the data and options of a line visualization, see print_line.
+    
+    Returns:
+        tuple: (data dict, option dict)
+    """
     data_dict = convert_edge_json(graph)
     option_dict = {"physics": {"enabled": True, "stabilization": True}, 
                    "nodes": {"size": 10, "shape": node_shape, "color": {"background": "rgba(255,255,255,0)", "border": 'rgba(255, 255, 255, 0)'}},
                    "edges":{"color": edge_color,"font": {"size": 14, "align": 'horizontal'}}
                    }
-    with open(file_path, "w") as file:
-        file.write(htmlStr.head)
-        file.write(json.dumps(data_dict, indent=None))
-        file.write(htmlStr.middle)
-        file.write(json.dumps(option_dict, indent=None))
-        file.write(htmlStr.tail)
+    return data_dict, option_dict
 
 def convert_edge_json(graph):
     length_min = None
@@ -0,0 +1,88 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Tests of the native BGLL engine: detecting the communities of every weakly
+connected component on its own gives the partition of a run on the whole graph.
+"""
+
+import random
+
+import networkx as nx
+import pytest
+
+import config
+from unfoldGraph import louvain
+from unfoldGraph.bgll import BGLLCluster
+
+def _assembly_graph(seed):
+    """A ring of cliques, a random graph and 300 short paths with random types."""
+    rng = random.Random(seed)
+    graph = nx.MultiDiGraph()
+    for u, v in nx.ring_of_cliques(12, 4).edges():
+        graph.add_edge(f"r{u}", f"r{v}")
+    for u, v in nx.gnm_random_graph(80, 160, seed=seed).edges():
+        graph.add_edge(f"g{u}", f"g{v}")
+    for path in range(300):
+        for i in range(3):
+            graph.add_edge(f"p{path}_{i}", f"p{path}_{i + 1}")
+    for node in graph.nodes:
+        graph.nodes[node]['TP'] = rng.choice(['-', '-', 'target', 'contaminate'])
+    return graph
+
+def _whole_graph_communities(graph, resolution, seed, leiden):
+    groups = {}
+    for node, community in louvain.best_partition(graph, resolution, seed, leiden).items():
+        groups.setdefault(community, []).append(node)
+    return sorted(sorted(nodes) for nodes in groups.values())
+
+@pytest.fixture
+def bgll_config():
+    saved = (config.resolution, config.bgll_seed, config.leiden_refinement)
+    yield
+    config.resolution, config.bgll_seed, config.leiden_refinement = saved
+
+@pytest.mark.parametrize("graph_seed", [0, 1])
+@pytest.mark.parametrize("resolution", [0.5, 1.0, 2.0])
+@pytest.mark.parametrize("leiden", [False, True])
+@pytest.mark.parametrize("seed", [0, 3])
+def test_components_match_whole_graph(bgll_config, graph_seed, resolution, leiden, seed):
+    graph = _assembly_graph(graph_seed)
+    config.resolution, config.bgll_seed, config.leiden_refinement = resolution, seed, leiden
+    detected = sorted(sorted(nodes) for communities in BGLLCluster(graph).communities() for nodes in communities)
+    members = {node for nodes in detected for node in nodes}
+    whole = [nodes for nodes in _whole_graph_communities(graph, resolution, seed, leiden) if nodes[0] in members]
+    assert detected == whole
+
+def test_resolution_uses_whole_graph_weight(bgll_config):
+    # Normalised by its own weight the ring splits into its 12 cliques
+    graph = _assembly_graph(0)
+    config.resolution, config.bgll_seed, config.leiden_refinement = 2.0, 0, False
+    ring = [nodes for communities in BGLLCluster(graph).communities() for nodes in communities if nodes[0].startswith("r")]
+    whole = [nodes for nodes in _whole_graph_communities(graph, 2.0, 0, False) if nodes[0].startswith("r")]
+    assert len(ring) == len(whole) < 12
+
+def test_process_pool_gives_the_same_partition(bgll_config):
+    graph = _assembly_graph(1)
+    config.resolution, config.bgll_seed, config.leiden_refinement = 1.0, 0, True
+    serial = BGLLCluster(graph).communities()
+    assert BGLLCluster(graph, threads=3).communities() == serial
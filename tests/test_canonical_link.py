@@ -0,0 +1,87 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Randomized checks of gfaLib canonical_link and of the merging of twin and
+duplicate links while a GFA file is parsed.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from gfaLib import GraphFromFile
+from gfaLib.abstractions import Orientation, reverse
+from gfaLib.graphFromFile import canonical_link
+
+ORIENTATIONS = [Orientation.FORWARD, Orientation.REVERSE]
+NODES = ["1", "2", "10", "a", "b"]
+
+def _twin(source, ori_source, sink, ori_sink):
+    return sink, reverse(ori_sink), source, reverse(ori_source)
+
+def _links():
+    return list(itertools.product(NODES, ORIENTATIONS, NODES, ORIENTATIONS))
+
+def test_twins_share_one_key():
+    for link in _links():
+        key = canonical_link(*link)
+        assert key in (link, _twin(*link))
+        assert canonical_link(*_twin(*link)) == key
+        assert canonical_link(*key) == key
+
+def test_other_links_have_other_keys():
+    keys = {}
+    for link in _links():
+        keys.setdefault(canonical_link(*link), set()).add(link)
+    for key, links in keys.items():
+        assert links == {key, _twin(*key)}
+
+@pytest.mark.parametrize("seed", range(5))
+def test_parsing_merges_twin_and_duplicate_links(tmp_path, seed):
+    rng = random.Random(seed)
+    gfa = tmp_path / "graph.gfa"
+    links = []
+    for _ in range(60):
+        link = rng.choice(_links())
+        links.append(link)
+        if rng.random() < 0.4:
+            links.append(_twin(*link) if rng.random() < 0.5 else link)
+    with open(gfa, 'w') as f:
+        f.write("H\tVN:Z:1.0\n")
+        for node in NODES:
+            f.write(f"S\t{node}\t{''.join(rng.choice('ACGT') for _ in range(20))}\n")
+        for source, ori_source, sink, ori_sink in links:
+            f.write(f"L\t{source}\t{ori_source.value}\t{sink}\t{ori_sink.value}\t0M\n")
+    graph = GraphFromFile(str(gfa))
+    
+    # The first of every group of twin or duplicate links is kept in file order
+    expected = {}
+    for link in links:
+        expected.setdefault(canonical_link(*link), link)
+    kept = []
+    for (source, sink, _), datas in graph.lines.items():
+        [(ori_source, ori_sink)] = datas["orientation"]
+        kept.append((source, ori_source, sink, ori_sink))
+    assert sorted(kept, key=str) == sorted(expected.values(), key=str)
+    assert graph.metadata['merged_links'] == len(links) - len(expected)
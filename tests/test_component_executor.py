@@ -0,0 +1,52 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Tests of the component-parallel pipeline: unfolding batches of components in
+worker processes writes the same GFA and FASTA files as a serial run.
+"""
+
+import pytest
+
+import cli as gmw_cli
+from simulate import AssemblySimulator, TARGET_TAXID
+
+@pytest.fixture(scope="module")
+def simulated(tmp_path_factory):
+    path = tmp_path_factory.mktemp("simulated")
+    return AssemblySimulator(segments=3000, seed=0).write(str(path), "graph")
+
+def _unfold(files, outdir, *args):
+    gmw_cli.cli.main(["-g", files["gfa"], "-o", outdir, "-f", "--taxon_db", files["taxonomy"], "--taxon_id", TARGET_TAXID,
+                      "--kraken_out", files["kraken"], "--blast_out", files["blast"], *args], standalone_mode=False)
+    outputs = []
+    for suffix in ("_after_unfold.gfa", "_after_unfold.fasta"):
+        with open(outdir + "/gmw" + suffix) as f:
+            outputs.append(f.read())
+    return outputs
+
+@pytest.mark.parametrize("options", [[], ["--bgll"]], ids=["default", "bgll"])
+def test_parallel_components_match_serial_run(simulated, tmp_path, options):
+    options = options + ["--merge_brother", "--split_parent"]
+    serial = _unfold(simulated, str(tmp_path / "serial"), *options)
+    parallel = _unfold(simulated, str(tmp_path / "parallel"), "-t", "4", "--parallel_components", *options)
+    assert parallel == serial
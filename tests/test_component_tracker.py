@@ -0,0 +1,107 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Randomized checks of gfaLib.ComponentTracker: after any sequence of node,
+edge and annotation changes the tracked components are the weakly connected
+components networkx computes from scratch.
+"""
+
+import random
+
+import networkx as nx
+import pytest
+
+import gfaLib.componentTracker as componentTracker
+from gfaLib import IndexedMultiDiGraph, component_tracker
+
+def _expected(graph):
+    components = sorted(sorted(component) for component in nx.weakly_connected_components(graph))
+    unknown = [component for component in components
+               if not any(graph.nodes[n].get('TP') == 'target' or graph.nodes[n].get('AC', '-') != '-' for n in component)]
+    return components, unknown
+
+def _random_change(graph, rng):
+    nodes = list(graph.nodes)
+    op = rng.random()
+    if op < 0.25 and graph.number_of_edges():
+        graph.remove_edge(*rng.choice(list(graph.edges(keys=True))))
+    elif op < 0.4:
+        graph.add_edge(rng.choice(nodes), rng.choice(nodes))
+    elif op < 0.5:
+        graph.remove_node(rng.choice(nodes))
+    elif op < 0.55:
+        graph.remove_nodes_from(rng.sample(nodes, min(3, len(nodes))))
+    elif op < 0.7:
+        graph.nodes[rng.choice(nodes)]['TP'] = rng.choice(['target', 'unknown'])
+    elif op < 0.8:
+        graph.nodes[rng.choice(nodes)].update(AC=rng.choice(['-', 'y']))
+    elif op < 0.85:
+        graph.add_node(max(nodes) + 1, TP='unknown', AC='-')
+    elif op < 0.87:
+        graph.add_edges_from([(rng.choice(nodes), rng.choice(nodes)) for _ in range(2)])
+    elif op < 0.88:
+        graph.clear_edges()
+    elif op < 0.9:
+        graph.nodes[rng.choice(nodes)].pop('AC', None)
+
+@pytest.fixture(params=["incremental", "recompute"])
+def recompute_share(request, monkeypatch):
+    # A share of 0 never recomputes from scratch, the default one mixes both paths
+    if request.param == "incremental":
+        monkeypatch.setattr(componentTracker, "_RECOMPUTE_SHARE", 0)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_changes(recompute_share, seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        graph = IndexedMultiDiGraph()
+        for i in range(40):
+            graph.add_node(i, TP=rng.choice(['target', 'unknown', 'other']), AC=rng.choice(['-', '-', 'x']))
+        for _ in range(50):
+            graph.add_edge(rng.randrange(40), rng.randrange(40))
+        tracker = component_tracker(graph)
+        for _ in range(60):
+            if not graph.number_of_nodes():
+                break
+            _random_change(graph, rng)
+            if rng.random() < 0.3:
+                components, unknown = _expected(graph)
+                assert sorted(map(sorted, tracker.components())) == components
+                assert sorted(map(sorted, tracker.unknown_components())) == unknown
+
+def test_split_and_join_of_a_path(recompute_share):
+    graph = IndexedMultiDiGraph()
+    for i in range(6):
+        graph.add_node(i, TP='unknown', AC='-')
+    graph.add_edges_from([(i, i + 1) for i in range(5)])
+    tracker = component_tracker(graph)
+    assert sorted(map(sorted, tracker.components())) == [[0, 1, 2, 3, 4, 5]]
+    graph.remove_edge(2, 3)
+    assert sorted(map(sorted, tracker.components())) == [[0, 1, 2], [3, 4, 5]]
+    graph.nodes[4]['TP'] = 'target'
+    assert sorted(map(sorted, tracker.unknown_components())) == [[0, 1, 2]]
+    graph.add_edge(5, 0)
+    assert sorted(map(sorted, tracker.components())) == [[0, 1, 2, 3, 4, 5]]
+    assert tracker.unknown_components() == []
+    graph.remove_node(4)
+    assert sorted(map(sorted, tracker.unknown_components())) == [[0, 1, 2, 5], [3]]
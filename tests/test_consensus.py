@@ -0,0 +1,106 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Randomized checks of create_consensus_sequence: the 4-bit mask kernel gives
+the result of the base by base merge on every alphabet.
+"""
+
+import random
+
+import pytest
+
+from gfaLib import PackedSequence
+from mergeNodes.basicFunction import create_consensus_sequence, get_degenerated_base, IUPAC_CODES
+
+ALPHABETS = {
+    "acgt": "ACGT",
+    "iupac": "".join(IUPAC_CODES),
+    "lower": "acgtn",
+    "mixed_case": "ACGTacgtNn",
+    "invalid": "ACGTX-*.",
+}
+
+def _base_by_base(seq1, seq2):
+    """The merge before the mask kernel, one IUPAC lookup per differing base."""
+    if len(seq1) != len(seq2):
+        raise ValueError("Sequences must be of the same length")
+    consensus = []
+    for base1, base2 in zip(seq1, seq2):
+        if base1 == base2:
+            consensus.append(base1)
+        else:
+            consensus.append(get_degenerated_base(base1, base2))
+    return ''.join(consensus)
+
+def _outcome(merge, seq1, seq2):
+    """Result of a merge, or the type of the exception it raised."""
+    try:
+        return merge(seq1, seq2)
+    except (TypeError, ValueError) as e:
+        return type(e)
+
+def _pairs(rng, alphabet, count=200):
+    """Random sequences and mutated copies, including identical and empty pairs."""
+    pairs = [("", "")]
+    for _ in range(count):
+        seq = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 300)))
+        mutated = list(seq)
+        for _ in range(rng.randint(0, len(seq))):
+            mutated[rng.randrange(len(seq))] = rng.choice(alphabet)
+        pairs.append((seq, "".join(mutated)))
+    return pairs
+
+@pytest.mark.parametrize("alphabet", ALPHABETS)
+def test_mask_kernel_matches_base_by_base(alphabet):
+    rng = random.Random(alphabet)
+    for seq1, seq2 in _pairs(rng, ALPHABETS[alphabet]):
+        assert _outcome(create_consensus_sequence, seq1, seq2) == _outcome(_base_by_base, seq1, seq2)
+
+@pytest.mark.parametrize("alphabet", ["acgt", "iupac"])
+def test_packed_sequences_merge_like_strings(alphabet):
+    rng = random.Random(alphabet)
+    for seq1, seq2 in _pairs(rng, ALPHABETS[alphabet], 50):
+        assert create_consensus_sequence(PackedSequence(seq1), PackedSequence(seq2)) == _base_by_base(seq1, seq2)
+
+@pytest.mark.parametrize("invalid", ["X-", "*.", "ac", "gt"])
+def test_differing_invalid_characters_raise_type_error(invalid):
+    # No IUPAC code covers two differing characters without IUPAC code, joining None fails
+    rng = random.Random(invalid)
+    for _ in range(20):
+        seq = "".join(rng.choice("ACGT") for _ in range(rng.randint(1, 100)))
+        position = rng.randrange(len(seq))
+        seq, other = (seq[:position] + base + seq[position + 1:] for base in invalid)
+        with pytest.raises(TypeError):
+            _base_by_base(seq, other)
+        with pytest.raises(TypeError):
+            create_consensus_sequence(seq, other)
+
+def test_invalid_characters_merge_like_base_by_base():
+    # An invalid character differing from a valid base gives the base
+    assert create_consensus_sequence("AC-X", "AC-X") == _base_by_base("AC-X", "AC-X") == "AC-X"
+    assert create_consensus_sequence("AC-XA", "AC-XG") == _base_by_base("AC-XA", "AC-XG") == "AC-XR"
+    assert create_consensus_sequence("ACGT", "AC.T") == _base_by_base("ACGT", "AC.T") == "ACGT"
+
+def test_different_lengths_raise_value_error():
+    with pytest.raises(ValueError):
+        create_consensus_sequence("ACGT", "ACG")
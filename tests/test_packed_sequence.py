@@ -0,0 +1,101 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Randomized checks of gfaLib.PackedSequence: packed sequences, their slices
+and reverse complement views behave like the strings they were built from.
+"""
+
+import random
+
+import pytest
+
+from gfaLib import PackedSequence
+
+ALPHABETS = {2: "ACGT", 4: "ACGTMRWSYKVHDBN", 0: "ACGTacgtnN"}
+_COMPLEMENT = str.maketrans("ACGTMKRYWSBVHDNacgtmkrywsbvhdn", "TGCAKMYRWSVBDHNtgcakmyrwsvbdhn")
+
+def _reverse_complement(seq):
+    return seq.translate(_COMPLEMENT)[::-1]
+
+def _sequences(bits, count=100):
+    rng = random.Random(bits)
+    alphabet = ALPHABETS[bits]
+    return [""] + ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 70))) for _ in range(count)]
+
+def _views(seq, rng):
+    """Random chains of slices and reverse complements of seq, with the matching strings."""
+    packed, text = PackedSequence(seq), seq
+    yield packed, text
+    for _ in range(6):
+        if rng.random() < 0.3:
+            packed, text = packed.reverse_complement(), _reverse_complement(text)
+        else:
+            start = rng.randint(-len(text) - 2, len(text) + 2)
+            stop = rng.randint(-len(text) - 2, len(text) + 2)
+            packed, text = packed[start:stop], text[start:stop]
+        yield packed, text
+
+@pytest.mark.parametrize("bits", ALPHABETS)
+def test_storage(bits):
+    for seq in _sequences(bits):
+        packed = PackedSequence(seq)
+        assert str(packed) == seq and len(packed) == len(seq)
+        expected = 2 if set(seq) <= set(ALPHABETS[2]) else 4 if set(seq) <= set(ALPHABETS[4]) else 0
+        assert packed.bits == expected
+
+@pytest.mark.parametrize("bits", ALPHABETS)
+def test_views_match_strings(bits):
+    rng = random.Random(bits)
+    for seq in _sequences(bits):
+        for packed, text in _views(seq, rng):
+            assert str(packed) == text
+            assert len(packed) == len(text)
+            assert packed == text and packed == PackedSequence(text)
+            assert hash(packed) == hash(text)
+            assert list(packed) == list(text)
+            assert packed.gc_count() == text.upper().count("G") + text.upper().count("C")
+            assert packed.count("A") == text.count("A")
+            if text:
+                index = rng.randrange(-len(text), len(text))
+                assert packed[index] == text[index]
+                assert str(packed[::-1]) == text[::-1]
+
+@pytest.mark.parametrize("bits", ALPHABETS)
+def test_concatenation(bits):
+    sequences = _sequences(bits, 20)
+    for left, right in zip(sequences, reversed(sequences)):
+        assert str(PackedSequence(left) + PackedSequence(right)) == left + right
+        assert str(left + PackedSequence(right)) == left + right
+        assert str(PackedSequence(left) + right) == left + right
+
+def test_index_out_of_range():
+    packed = PackedSequence("ACGT")
+    with pytest.raises(IndexError):
+        packed[4]
+    with pytest.raises(IndexError):
+        packed[1:3][-3]
+
+def test_text_without_complement():
+    with pytest.raises(ValueError):
+        PackedSequence("ACGX").reverse_complement()
+    assert str(PackedSequence("ACGX")[:3].reverse_complement()) == "CGT"
@@ -0,0 +1,78 @@
+""" 
+GMW: Genomic Microbe-Wise - hybrid assembly and contamination removal tool 
+
+Copyright (C) 2025 Wenbing Chen 
+www.github.com/trainrun/gmw 
+
+License: 
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.   
+See the GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program. If not, see <https://www.gnu.org/licenses/>. 
+"""
+
+"""
+Function Description: 
+Randomized checks of the Hamming kernel scoring brother candidates: exact
+distances without a budget, exact or over-budget distances with one.
+"""
+
+import random
+
+import pytest
+
+from gfaLib import PackedSequence
+from mergeNodes.basicFunction import hamming_distance, calculate_similarity
+
+def _naive(seq1, seq2):
+    return sum(base1 != base2 for base1, base2 in zip(seq1, seq2))
+
+def _pairs(seed, count=300):
+    rng = random.Random(seed)
+    for _ in range(count):
+        seq = "".join(rng.choice("ACGT") for _ in range(rng.choice([rng.randint(1, 200), rng.randint(1, 9000)])))
+        other = list(seq)
+        for _ in range(rng.choice([0, 1, 5, len(seq) // 10, len(seq)])):
+            other[rng.randrange(len(seq))] = rng.choice("ACGTN")
+        yield seq, "".join(other)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_distance_without_budget_is_exact(seed):
+    for seq1, seq2 in _pairs(seed):
+        assert hamming_distance(seq1, seq2) == _naive(seq1, seq2)
+        assert hamming_distance(PackedSequence(seq1), seq2) == _naive(seq1, seq2)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_budget_only_cuts_distances_above_it(seed):
+    rng = random.Random(seed)
+    for seq1, seq2 in _pairs(seed):
+        exact = _naive(seq1, seq2)
+        budget = rng.randint(0, max(1, exact * 2))
+        distance = hamming_distance(seq1, seq2, budget)
+        if exact <= budget:
+            assert distance == exact
+        else:
+            assert budget < distance <= exact
+
+def test_short_sequences_stop_early():
+    # 300 unrelated bases exceed a budget of 10 in the first chunk
+    rng = random.Random(0)
+    seq1 = "".join(rng.choice("AC") for _ in range(300))
+    seq2 = seq1.translate(str.maketrans("AC", "GT"))
+    assert 10 < hamming_distance(seq1, seq2, 10) < 300
+
+@pytest.mark.parametrize("min_score", [80.0, 95.0, 99.5])
+def test_similarity_threshold_decision(min_score):
+    for seq1, seq2 in _pairs(min_score, 200):
+        if len(seq1) != len(seq2):
+            continue
+        exact = (1 - _naive(seq1, seq2) / len(seq1)) * 100
+        assert (calculate_similarity(seq1, seq2, min_score) >= min_score) == (exact >= min_score)